@@ -0,0 +1,457 @@
+# dashboard/analytes.py
+"""
+Structured lab results and per-analyte time series.
+
+Each numeric value in a test result is a ``Measurement`` row holding the
+test code, value, unit and reference range. These rows are the source of
+truth. For charting, each (patient, code) pair also has one
+``AnalyteSeries`` row. It packs the pair's measurements in time order,
+one binary column each for times, values and the reference range bounds.
+A whole series is therefore one row read, with no parsing of
+``result_data``.
+
+``series(patient_id, code)`` returns a ``Series``. Its columns are
+``array`` objects. It computes the trend (least-squares slope in units per
+day), the rolling mean and out-of-range flags with NumPy, directly on those
+buffers, when NumPy is installed. NumPy is optional: without it the same
+results come from pure-Python loops over the columns. ``Series.to_numpy()``
+exposes the buffers as NumPy arrays without copying them.
+
+``LabFeedImporter`` bulk-loads lab feeds (CSV or JSON Lines, one
+measurement per row) with a few queries per batch. Series are refreshed
+after each batch. Signals in signals.py refresh them when single
+measurements or test results change. ``rebuild()`` recomputes every
+series, and ``extract_from_text()`` backfills measurements from legacy
+"Name: value unit" text.
+"""
+import math
+import re
+import sys
+from array import array
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+from functools import partial
+from itertools import islice
+
+from django.db import connection, transaction
+from django.db.models import TextField, Value
+from django.db.models.functions import Concat
+from django.utils import timezone
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .forms import LabResultImportRowForm
+from .importers import ImportResult, iter_rows
+from .models import AnalyteSeries, Measurement, MedicalProfessional, Patient, TestResult
+from . import dashboard_cache, search, statistics
+
+NAN = float('nan')
+SERIES_FIELDS = ['unit', 'count', 'times', 'values', 'lows', 'highs', 'updated_at']
+
+
+def _pack(typecode, items):
+    column = array(typecode, items)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def _unpack(typecode, data):
+    column = array(typecode)
+    column.frombytes(bytes(data))
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column
+
+
+def _to_array(typecode, ndarray):
+    column = array(typecode)
+    column.frombytes(ndarray.tobytes())
+    return column
+
+
+def _optional(number):
+    return None if number is None or math.isnan(number) else number
+
+
+class Series:
+    """One patient's measurements of one analyte, oldest first."""
+    def __init__(self, code, unit, times, values, lows, highs):
+        self.code = code
+        self.unit = unit
+        self.times = times      # array('q'), epoch seconds
+        self.values = values    # array('d')
+        self.lows = lows        # array('d'), NaN where there is no lower bound
+        self.highs = highs      # array('d'), NaN where there is no upper bound
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row.code, row.unit, _unpack('q', row.times), _unpack('d', row.values),
+                   _unpack('d', row.lows), _unpack('d', row.highs))
+
+    def __len__(self):
+        return len(self.values)
+
+    def datetimes(self):
+        return [datetime.fromtimestamp(t, tz=dt_timezone.utc) for t in self.times]
+
+    def trend(self):
+        """Least-squares slope in units per day; None with fewer than two distinct times."""
+        n = len(self)
+        if n < 2:
+            return None
+        if np is not None:
+            columns = self.to_numpy()
+            times = columns['times'] - columns['times'].mean()
+            sxx = times @ times
+            if not sxx:
+                return None
+            return float(times @ (columns['values'] - columns['values'].mean()) / sxx * 86400)
+        mean_t = sum(self.times) / n
+        mean_v = sum(self.values) / n
+        sxx = sum((t - mean_t) ** 2 for t in self.times)
+        if not sxx:
+            return None
+        sxy = sum((t - mean_t) * (v - mean_v) for t, v in zip(self.times, self.values))
+        return sxy / sxx * 86400
+
+    def rolling_mean(self, window=3):
+        """Mean of each value and the ``window - 1`` before it (fewer at the start)."""
+        if np is not None:
+            sums = np.concatenate(([0.0], np.cumsum(self.to_numpy()['values'])))
+            ends = np.arange(1, len(self) + 1)
+            starts = np.maximum(ends - window, 0)
+            return _to_array('d', (sums[ends] - sums[starts]) / (ends - starts))
+        means = array('d')
+        total = 0.0
+        for i, value in enumerate(self.values):
+            total += value
+            if i >= window:
+                total -= self.values[i - window]
+            means.append(total / min(i + 1, window))
+        return means
+
+    def out_of_range(self):
+        """Per value: -1 below its reference range, 1 above it, 0 inside it or without one."""
+        # Comparisons with NaN are false, so a missing bound never flags.
+        if np is not None:
+            columns = self.to_numpy()
+            flags = (columns['values'] > columns['highs']).astype(np.int8)
+            flags[columns['values'] < columns['lows']] = -1
+            return _to_array('b', flags)
+        return array('b', (-1 if v < lo else 1 if v > hi else 0
+                           for v, lo, hi in zip(self.values, self.lows, self.highs)))
+
+    def to_numpy(self):
+        """The columns as NumPy arrays sharing this series' buffers. Requires NumPy."""
+        if np is None:
+            raise ImportError("Series.to_numpy() requires NumPy.")
+        return {
+            'times': np.frombuffer(self.times, dtype=np.int64),
+            'values': np.frombuffer(self.values, dtype=np.float64),
+            'lows': np.frombuffer(self.lows, dtype=np.float64),
+            'highs': np.frombuffer(self.highs, dtype=np.float64),
+        }
+
+    def as_dict(self, window=3):
+        means = self.rolling_mean(window)
+        flags = self.out_of_range()
+        return {
+            'code': self.code,
+            'unit': self.unit,
+            'trend_per_day': self.trend(),
+            'window': window,
+            'points': [
+                {'time': when.isoformat(), 'value': value, 'low': _optional(low), 'high': _optional(high),
+                 'rolling_mean': mean, 'flag': flag}
+                for when, value, low, high, mean, flag in zip(
+                    self.datetimes(), self.values, self.lows, self.highs, means, flags)
+            ],
+        }
+
+
+def series(patient_id, code):
+    """The patient's ``Series`` for ``code``, or None if there are no measurements."""
+    row = AnalyteSeries.objects.filter(patient_id=patient_id, code=code.strip().upper()).first()
+    return Series.from_row(row) if row else None
+
+
+def codes(patient_id):
+    """``[{'code', 'unit', 'count', 'latest'}]`` for every analyte the patient has, by code."""
+    rows = AnalyteSeries.objects.filter(patient_id=patient_id).order_by('code').values_list(
+        'code', 'unit', 'count', 'values')
+    return [{'code': code, 'unit': unit, 'count': count, 'latest': _unpack('d', values)[-1]}
+            for code, unit, count, values in rows]
+
+
+# --- Maintenance ----------------------------------------------------------
+
+def _columns(rows):
+    """AnalyteSeries fields from ``(observed_at, value, unit, low, high)`` rows in time order."""
+    return {
+        'unit': rows[-1][2],
+        'count': len(rows),
+        'times': _pack('q', (int(observed_at.timestamp()) for observed_at, *_ in rows)),
+        'values': _pack('d', (value for _, value, *_ in rows)),
+        'lows': _pack('d', (NAN if low is None else low for *_, low, _ in rows)),
+        'highs': _pack('d', (NAN if high is None else high for *_, high in rows)),
+    }
+
+
+def refresh(pairs):
+    """Recompute the series of ``(patient_id, code)`` pairs from their measurements."""
+    pairs = set(pairs)
+    if not pairs:
+        return
+    patient_ids = {patient_id for patient_id, _ in pairs}
+    codes_ = {code for _, code in pairs}
+    with transaction.atomic():
+        existing = {(s.patient_id, s.code): s for s in AnalyteSeries.objects.select_for_update().filter(
+            patient_id__in=patient_ids, code__in=codes_)}
+        grouped = defaultdict(list)
+        rows = Measurement.objects.filter(patient_id__in=patient_ids, code__in=codes_).order_by(
+            'patient_id', 'code', 'observed_at', 'id').values_list(
+            'patient_id', 'code', 'observed_at', 'value', 'unit', 'reference_low', 'reference_high')
+        for patient_id, code, *row in rows:
+            if (patient_id, code) in pairs:
+                grouped[patient_id, code].append(row)
+
+        now = timezone.now()
+        created, updated, emptied = [], [], []
+        for pair in pairs:
+            current = existing.get(pair)
+            if pair not in grouped:
+                if current is not None:
+                    emptied.append(current.pk)
+                continue
+            fields = _columns(grouped[pair])
+            if current is None:
+                created.append(AnalyteSeries(patient_id=pair[0], code=pair[1], **fields))
+            else:
+                for name, value in fields.items():
+                    setattr(current, name, value)
+                current.updated_at = now
+                updated.append(current)
+        AnalyteSeries.objects.filter(pk__in=emptied).delete()
+        AnalyteSeries.objects.bulk_update(updated, SERIES_FIELDS, batch_size=500)
+        # A concurrent refresh may have created the same pair; its rows are as current as ours.
+        AnalyteSeries.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+
+
+def refresh_later(pairs):
+    """``refresh()`` once the current transaction commits."""
+    pairs = set(pairs)
+    if pairs:
+        transaction.on_commit(partial(refresh, pairs))
+
+
+@transaction.atomic
+def rebuild(batch_size=2000):
+    """Recompute every series from the measurements. Returns the number of series."""
+    AnalyteSeries.objects.all().delete()
+    rows = Measurement.objects.order_by('patient_id', 'code', 'observed_at', 'id').values_list(
+        'patient_id', 'code', 'observed_at', 'value', 'unit', 'reference_low', 'reference_high')
+    pending, current, points, total = [], None, [], 0
+
+    def flush_series():
+        if points:
+            pending.append(AnalyteSeries(patient_id=current[0], code=current[1], **_columns(points)))
+
+    for patient_id, code, *row in rows.iterator(chunk_size=batch_size):
+        if (patient_id, code) != current:
+            flush_series()
+            current, points = (patient_id, code), []
+            if len(pending) >= batch_size:
+                AnalyteSeries.objects.bulk_create(pending)
+                total += len(pending)
+                pending = []
+        points.append(row)
+    flush_series()
+    AnalyteSeries.objects.bulk_create(pending)
+    return total + len(pending)
+
+
+_LEGACY_LINE = re.compile(r"^\s*(?P<name>[A-Za-z][\w ()/-]*?)\s*[:=]\s*(?P<value>-?\d+(?:\.\d+)?)\s*(?P<unit>\S*)")
+
+
+def parse_legacy(text):
+    """``[(code, value, unit)]`` from free-text "Name: value unit" lines; other lines are ignored."""
+    found = []
+    for line in (text or '').splitlines():
+        match = _LEGACY_LINE.match(line)
+        if match:
+            code = re.sub(r"\W+", '_', match['name'].strip()).upper()[:32]
+            found.append((code, float(match['value']), match['unit'][:32]))
+    return found
+
+
+def extract_from_text(batch_size=2000):
+    """
+    Create measurements from the ``result_data`` text of test results that
+    have none yet, then rebuild the series. Returns the number created.
+    """
+    created = 0
+    results = TestResult.objects.filter(measurements__isnull=True).values_list(
+        'pk', 'patient_id', 'test_date', 'result_data')
+    pending = []
+    for pk, patient_id, test_date, text in results.iterator(chunk_size=batch_size):
+        pending.extend(
+            Measurement(test_result_id=pk, patient_id=patient_id, observed_at=test_date,
+                        code=code, value=value, unit=unit)
+            for code, value, unit in parse_legacy(text)
+        )
+        if len(pending) >= batch_size:
+            created += len(Measurement.objects.bulk_create(pending))
+            pending = []
+    created += len(Measurement.objects.bulk_create(pending))
+    rebuild(batch_size=batch_size)
+    return created
+
+
+# --- Lab feed ingestion ---------------------------------------------------
+
+def _line(data):
+    unit = f" {data['unit']}" if data['unit'] else ''
+    return f"{data['code']}: {data['value']:g}{unit}"
+
+
+class LabFeedImporter:
+    """
+    ``LabFeedImporter(batch_size=2000).run(stream, 'csv')``
+
+    One row per measurement, with columns patient (id), test_date, code
+    and value, plus optional unit, reference_low, reference_high, doctor
+    (id), accession and description. Rows that share a patient and an
+    accession number become one TestResult, even across batches of the
+    same run. A row without an accession becomes a TestResult of its own.
+    Each batch is validated with one query for patients and one for
+    doctors, then written in one transaction. Bad rows are reported and
+    skipped.
+    """
+    def __init__(self, batch_size=2000, on_error=None, on_progress=None):
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.on_progress = on_progress
+        # (patient_id, accession): test result id, for accessions split across batches
+        self._accessions = {}
+
+    def run(self, stream, fmt):
+        result = ImportResult()
+        rows = iter_rows(stream, fmt)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            self._import_batch(batch, result)
+            if self.on_progress:
+                self.on_progress(result)
+        return result
+
+    def _error(self, result, line_number, message):
+        result.add_error(line_number, message)
+        if self.on_error:
+            self.on_error(line_number, message)
+
+    def _validate(self, batch, result):
+        valid = []
+        for line_number, row in batch:
+            if isinstance(row, str):
+                self._error(result, line_number, row)
+                continue
+            form = LabResultImportRowForm({k: (v if v is not None else '') for k, v in row.items()})
+            if not form.is_valid():
+                message = '; '.join(f"{field}: {' '.join(errs)}" for field, errs in form.errors.items())
+                self._error(result, line_number, message)
+                continue
+            valid.append((line_number, form.cleaned_data))
+
+        patients = set(Patient.objects.filter(
+            pk__in={data['patient'] for _, data in valid}).values_list('pk', flat=True))
+        doctors = set(MedicalProfessional.objects.filter(
+            pk__in={data['doctor'] for _, data in valid if data['doctor']}).values_list('pk', flat=True))
+        accepted = []
+        for line_number, data in valid:
+            if data['patient'] not in patients:
+                self._error(result, line_number, f"patient: {data['patient']} does not exist.")
+            elif data['doctor'] and data['doctor'] not in doctors:
+                self._error(result, line_number, f"doctor: {data['doctor']} does not exist.")
+            else:
+                accepted.append((line_number, data))
+        return accepted
+
+    def _import_batch(self, batch, result):
+        rows = self._validate(batch, result)
+        if not rows:
+            return
+        # Group rows into test results, in feed order.
+        groups = {}
+        for line_number, data in rows:
+            key = (data['patient'], data['accession']) if data['accession'] else (data['patient'], None, line_number)
+            groups.setdefault(key, []).append(data)
+
+        with transaction.atomic():
+            new = {key: members for key, members in groups.items() if key not in self._accessions}
+            results = [
+                TestResult(
+                    patient_id=members[0]['patient'], medical_professional_id=members[0]['doctor'],
+                    test_date=members[0]['test_date'],
+                    description=members[0]['description'] or ', '.join(dict.fromkeys(d['code'] for d in members)),
+                    result_data='\n'.join(_line(d) for d in members),
+                )
+                for members in new.values()
+            ]
+            unindexed = self._insert(results)
+            ids = {key: test_result.pk for key, test_result in zip(new, results)}
+            self._accessions.update((key, pk) for key, pk in ids.items() if len(key) == 2)
+            continued = []
+            for key, members in groups.items():
+                if key not in new:
+                    # The accession started in an earlier batch: extend its text.
+                    ids[key] = self._accessions[key]
+                    continued.append(ids[key])
+                    TestResult.objects.filter(pk=ids[key]).update(
+                        result_data=Concat('result_data', Value('\n' + '\n'.join(_line(d) for d in members)),
+                                           output_field=TextField()))
+            for test_result in TestResult.objects.filter(pk__in=continued):
+                search.index_document(test_result)
+
+            measurements = [
+                Measurement(test_result_id=ids[key], patient_id=data['patient'], observed_at=data['test_date'],
+                            code=data['code'], value=data['value'], unit=data['unit'] or '',
+                            reference_low=data['reference_low'], reference_high=data['reference_high'])
+                for key, members in groups.items() for data in members
+            ]
+            Measurement.objects.bulk_create(measurements, batch_size=self.batch_size)
+            search.index_new_documents(unindexed)
+            self._changed(groups)
+        result.created += len(measurements)
+
+    def _insert(self, results):
+        """Insert ``results``, setting their primary keys. Returns those still to be indexed."""
+        if connection.features.can_return_rows_from_bulk_insert:
+            TestResult.objects.bulk_create(results, batch_size=self.batch_size)
+            return results
+        # The measurements need the primary keys, so insert one at a time; save() indexes them.
+        for test_result in results:
+            test_result.save()
+        return []
+
+    def _changed(self, groups):
+        # bulk_create skips the signals that keep dashboards and series current.
+        rows = [data for members in groups.values() for data in members]
+        patients = {data['patient'] for data in rows}
+        doctors = {data['doctor'] for data in rows if data['doctor']}
+        for role, ids in (('patient', patients), ('doctor', doctors)):
+            for profile_id in ids:
+                statistics.bump(statistics.changes_key(role, profile_id))
+        refresh_later((data['patient'], data['code']) for data in rows)
+
+        def invalidate():
+            dashboard_cache.invalidate_model('dashboard.testresult')
+            for role, ids in (('patient', patients), ('doctor', doctors)):
+                for profile_id in ids:
+                    dashboard_cache.invalidate(role, profile_id)
+        transaction.on_commit(invalidate)
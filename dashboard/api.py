@@ -0,0 +1,181 @@
+# dashboard/api.py
+"""
+Versioned JSON dashboards for polling clients (mobile apps, kiosks).
+
+Every appointment, prescription, report or test result change bumps the
+owner's change counter (``statistics.changes_key``, see signals.py), so
+one Statistic row versions a user's whole dashboard. The ETag is built
+from that counter, the local date and the query parameters, and
+``updated_at`` is the Last-Modified. A client that sends ``If-None-Match``
+or ``If-Modified-Since`` gets ``304 Not Modified`` after that single
+lookup, before any detail table is read.
+
+Query parameters:
+
+* ``include=appointments,reports`` picks sections (default: all);
+* ``fields[appointments]=date,doctor`` picks fields (default: all);
+* ``page_size=`` limits rows per section (see pagination.get_page_size).
+
+Appointments are listed from the start of the current day, rather than
+from now, so that the response (and its ETag) only changes when the data
+or the day does. Clients hide those that have already passed.
+
+Everything is read from the primary: a replica behind the counter would
+hand out a new ETag for old data, which the client would then keep.
+Names of the other party are as of the last change to the user's records.
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import datetime, time
+
+from django.http import JsonResponse
+from django.utils import timezone
+
+from .models import Appointment, Prescription, Report, Statistic
+from .pagination import get_page_size
+from . import statistics
+
+VERSION = 1
+
+DOCTOR_NAME = ('medical_professional__user__first_name', 'medical_professional__user__last_name')
+PATIENT_NAME = ('patient__user__first_name', 'patient__user__last_name')
+
+
+@dataclass(frozen=True)
+class Section:
+    model: type
+    owner_field: str
+    ordering: tuple
+    # field name in the response: column path, or a tuple of paths joined by spaces
+    fields: dict
+    date_field: str = None   # rows on or after the start of today only
+
+    def rows(self, profile_id, names, today, limit):
+        lookups = {self.owner_field: profile_id}
+        if self.date_field:
+            lookups[f'{self.date_field}__gte'] = today
+        paths = self.fields
+        columns = {path for name in names for path in
+                   (paths[name] if isinstance(paths[name], tuple) else (paths[name],))}
+        qs = self.model.objects.filter(**lookups).order_by(*self.ordering).values(*columns)
+        return [{name: self._value(row, paths[name]) for name in names} for row in qs[:limit]]
+
+    @staticmethod
+    def _value(row, path):
+        if isinstance(path, tuple):
+            return ' '.join(filter(None, (row[p] for p in path)))
+        return row[path]
+
+
+SECTIONS = {
+    'patient': {
+        'appointments': Section(Appointment, 'patient_id', ('appointment_date', 'id'), {
+            'id': 'id', 'date': 'appointment_date', 'end': 'appointment_end',
+            'duration_minutes': 'duration_minutes', 'reason': 'reason',
+            'doctor': DOCTOR_NAME, 'specialization': 'medical_professional__specialization',
+        }, date_field='appointment_date'),
+        'prescriptions': Section(Prescription, 'patient_id', ('-created_at', '-id'), {
+            'id': 'id', 'medication': 'medication_name', 'description': 'description',
+            'created_at': 'created_at', 'doctor': DOCTOR_NAME,
+        }),
+        'reports': Section(Report, 'patient_id', ('-date', '-id'), {
+            'id': 'id', 'title': 'title', 'summary': 'summary', 'date': 'date', 'doctor': DOCTOR_NAME,
+        }),
+    },
+    'doctor': {
+        'appointments': Section(Appointment, 'medical_professional_id', ('appointment_date', 'id'), {
+            'id': 'id', 'date': 'appointment_date', 'end': 'appointment_end',
+            'duration_minutes': 'duration_minutes', 'reason': 'reason',
+            'patient': PATIENT_NAME, 'patient_id': 'patient_id',
+        }, date_field='appointment_date'),
+        'prescriptions': Section(Prescription, 'medical_professional_id', ('-created_at', '-id'), {
+            'id': 'id', 'medication': 'medication_name', 'description': 'description',
+            'created_at': 'created_at', 'patient': PATIENT_NAME, 'patient_id': 'patient_id',
+        }),
+        'reports': Section(Report, 'medical_professional_id', ('-date', '-id'), {
+            'id': 'id', 'title': 'title', 'summary': 'summary', 'date': 'date',
+            'patient': PATIENT_NAME, 'patient_id': 'patient_id',
+        }),
+    },
+}
+
+
+class InvalidQuery(ValueError):
+    pass
+
+
+def _split(value):
+    return [part for part in (p.strip() for p in value.split(',')) if part]
+
+
+def parse(request, role):
+    """``({section: [field, ...]}, limit)`` from the query string; raises InvalidQuery."""
+    sections = SECTIONS[role]
+    include = _split(request.GET.get('include', '')) or list(sections)
+    unknown = [name for name in include if name not in sections]
+    if unknown:
+        raise InvalidQuery(f"Unknown section(s): {', '.join(unknown)}. Choose from {', '.join(sections)}.")
+
+    selected = {}
+    for name in include:
+        available = sections[name].fields
+        fields = _split(request.GET.get(f'fields[{name}]', '')) or list(available)
+        unknown = [field for field in fields if field not in available]
+        if unknown:
+            raise InvalidQuery(f"Unknown field(s) for {name}: {', '.join(unknown)}.")
+        selected[name] = list(dict.fromkeys(fields))
+    return selected, get_page_size(request)
+
+
+def _today():
+    return timezone.make_aware(datetime.combine(timezone.localdate(), time.min))
+
+
+class _Version:
+    def __init__(self, request, role, profile_id):
+        self.role = role
+        self.profile_id = profile_id
+        try:
+            self.query = parse(request, role)
+            self.error = None
+        except InvalidQuery as e:
+            self.query, self.error = None, str(e)
+        row = Statistic.objects.filter(name=statistics.changes_key(role, profile_id)).values_list(
+            'value', 'updated_at').first()
+        self.counter, changed = row or (0, None)
+        self.today = timezone.localdate()
+        # The appointment window moves at midnight, so the data is never older than today.
+        self.last_modified = max(changed, _today()) if changed else None
+
+    @property
+    def etag(self):
+        if self.error:
+            return None
+        params = hashlib.sha1(repr(self.query).encode()).hexdigest()[:12]
+        return f"v{VERSION}-{self.role}-{self.profile_id}-{self.counter}-{self.today.isoformat()}-{params}"
+
+
+def version(request, role, profile_id):
+    """The request's dashboard version, looked up once per request."""
+    if getattr(request, '_dashboard_api_version', None) is None:
+        request._dashboard_api_version = _Version(request, role, profile_id)
+    return request._dashboard_api_version
+
+
+def response(request, role, profile_id):
+    current = version(request, role, profile_id)
+    if current.error:
+        return JsonResponse({'error': current.error}, status=400)
+    selected, limit = current.query
+    today = _today()
+    sections = SECTIONS[role]
+    data = {
+        'version': VERSION,
+        'role': role,
+        'changes': current.counter,
+        **{name: sections[name].rows(profile_id, fields, today, limit) for name, fields in selected.items()},
+    }
+    result = JsonResponse(data, json_dumps_params={'separators': (',', ':')})
+    # Revalidate on every poll; the 304 is what keeps polling cheap.
+    result['Cache-Control'] = 'private, no-cache'
+    return result
@@ -0,0 +1,147 @@
+# dashboard/availability.py
+import heapq
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db.models import Case, IntegerField, Q, When
+from django.utils import timezone
+
+from .models import Appointment, MedicalProfessional, MAX_APPOINTMENT_MINUTES
+
+
+def overlapping(start, end, doctor=None, patient=None, exclude_pk=None):
+    """
+    Appointments for ``doctor`` or ``patient`` that overlap ``[start, end)``.
+
+    Uses a single query. The lower bound on ``appointment_date`` keeps it an
+    index range scan on (doctor, start) / (patient, start), because nothing
+    that starts more than MAX_APPOINTMENT_MINUTES earlier can still be running.
+    """
+    who = Q()
+    if doctor is not None:
+        who |= Q(medical_professional=doctor)
+    if patient is not None:
+        who |= Q(patient=patient)
+    qs = Appointment.objects.filter(
+        who,
+        appointment_date__lt=end,
+        appointment_date__gt=start - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+        appointment_end__gt=start,
+    )
+    if exclude_pk is not None:
+        qs = qs.exclude(pk=exclude_pk)
+    return qs
+
+
+def find_conflict(start, duration_minutes, doctor, patient, exclude_pk=None):
+    """
+    Return ``'doctor'``, ``'patient'`` or ``None`` for a proposed booking,
+    checking both sides in one round trip.
+    """
+    end = start + timedelta(minutes=duration_minutes)
+    doctor_id = getattr(doctor, 'pk', doctor)
+    # Doctor-side clashes sort first, so one row answers the question.
+    clash = overlapping(start, end, doctor=doctor, patient=patient, exclude_pk=exclude_pk).annotate(
+        doctor_first=Case(When(medical_professional_id=doctor_id, then=0), default=1, output_field=IntegerField())
+    ).order_by('doctor_first').values_list('medical_professional_id', flat=True).first()
+    if clash is None:
+        return None
+    return 'doctor' if clash == doctor_id else 'patient'
+
+
+def _working_hours():
+    opening, closing = getattr(settings, 'CLINIC_HOURS', (9, 17))
+    days = getattr(settings, 'CLINIC_DAYS', (0, 1, 2, 3, 4))  # Monday-Friday
+    return time(opening), time(closing), set(days)
+
+
+def _aligned(moment, grid_minutes):
+    """Round ``moment`` up to the next multiple of ``grid_minutes`` past the hour."""
+    rounded = moment.replace(second=0, microsecond=0)
+    if rounded < moment:
+        rounded += timedelta(minutes=1)
+    return rounded + timedelta(minutes=-rounded.minute % grid_minutes)
+
+
+def _candidate_starts(after, until, duration, grid_minutes):
+    """Slot starts on the grid, inside working hours, in ``[after, until)``."""
+    opening, closing, days = _working_hours()
+    tz = timezone.get_current_timezone()
+    day = timezone.localtime(after, tz).date()
+    last_day = timezone.localtime(until, tz).date()
+    step = timedelta(minutes=grid_minutes)
+    while day <= last_day:
+        if day.weekday() in days:
+            slot = timezone.make_aware(datetime.combine(day, opening), tz)
+            close = timezone.make_aware(datetime.combine(day, closing), tz)
+            if slot < after:
+                slot = _aligned(timezone.localtime(after, tz), grid_minutes)
+            while slot + duration <= close and slot < until:
+                yield slot
+                slot += step
+        day += timedelta(days=1)
+
+
+def _free_slots_for(doctor_id, busy, after, until, duration, grid_minutes):
+    """Sweep one doctor's sorted busy intervals against the slot grid."""
+    i = 0
+    for start in _candidate_starts(after, until, duration, grid_minutes):
+        end = start + duration
+        # Drop busy intervals that finished before this slot starts.
+        while i < len(busy) and busy[i][1] <= start:
+            i += 1
+        j = i
+        clash = False
+        while j < len(busy) and busy[j][0] < end:
+            if busy[j][1] > start:
+                clash = True
+                break
+            j += 1
+        if not clash:
+            yield start, doctor_id, end
+
+
+def next_free_slots(doctors, count=5, after=None, duration_minutes=30, horizon_days=None, grid_minutes=None):
+    """
+    The next ``count`` open slots across ``doctors`` (ids or instances), as
+    ``[{'doctor_id', 'start', 'end'}, ...]`` in chronological order.
+
+    All busy intervals in the search window are read with one query over the
+    (doctor, start) index, then each doctor's day is swept in memory and the
+    per-doctor streams are merged lazily.
+    """
+    after = after or timezone.now()
+    horizon_days = horizon_days or getattr(settings, 'AVAILABILITY_HORIZON_DAYS', 28)
+    grid_minutes = grid_minutes or getattr(settings, 'AVAILABILITY_GRID_MINUTES', 15)
+    duration = timedelta(minutes=duration_minutes)
+    until = after + timedelta(days=horizon_days)
+    doctor_ids = [getattr(d, 'pk', d) for d in doctors]
+    if not doctor_ids:
+        return []
+
+    busy = {doctor_id: [] for doctor_id in doctor_ids}
+    rows = Appointment.objects.filter(
+        medical_professional_id__in=doctor_ids,
+        appointment_date__lt=until,
+        appointment_date__gt=after - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+        appointment_end__gt=after,
+    ).order_by('medical_professional_id', 'appointment_date').values_list(
+        'medical_professional_id', 'appointment_date', 'appointment_end'
+    )
+    for doctor_id, start, end in rows:
+        busy[doctor_id].append((start, end))
+
+    streams = [
+        _free_slots_for(doctor_id, intervals, after, until, duration, grid_minutes)
+        for doctor_id, intervals in busy.items()
+    ]
+    slots = []
+    for start, doctor_id, end in heapq.merge(*streams):
+        slots.append({'doctor_id': doctor_id, 'start': start, 'end': end})
+        if len(slots) >= count:
+            break
+    return slots
+
+
+def doctors_for_specialization(specialization):
+    return MedicalProfessional.objects.filter(specialization__iexact=specialization).values_list('id', flat=True)
@@ -0,0 +1,215 @@
+# dashboard/dashboard_cache.py
+"""
+Per-user caching of the patient and doctor dashboard data.
+
+Entries are stored in the Django cache named by ``DASHBOARD_CACHE_ALIAS``
+(default ``'default'``). Use a shared backend such as Redis or Memcached
+when running several processes, so that an invalidation made in one
+process is seen by all of them.
+
+Each user has a generation number. A cache key includes it, so
+``invalidate()`` only needs to bump the number. A reader that computed
+its data before the bump then writes under the old key, which nobody
+reads again, and stale data is never served. Signals in signals.py call
+``invalidate()`` for the affected patient and doctor whenever an
+appointment, prescription, report or test result changes.
+``DASHBOARD_CACHE_TTL`` (seconds, default 300) bounds how long an unused
+entry stays in the cache.
+
+``fragment()`` (the ``{% fragment %}`` tag in templatetags/fragments.py)
+caches rendered template fragments the same way. The key includes the
+generation of each patient or doctor the fragment varies on, and the
+version of each model it names (``'dashboard.report'``), which signals
+bump on every save or delete of that model. Names shown from related
+rows, such as the other party's name, may stay stale for up to the TTL.
+"""
+import hashlib
+import random
+import threading
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Model
+from django.utils import timezone
+
+from .instrumentation import current_metrics
+from .models import Appointment, Prescription, Patient, MedicalProfessional
+from .routers import primary_reads
+
+DEFAULT_TTL = 300
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _generation_key(role, profile_id):
+    return f"dashboard:gen:{role}:{profile_id}"
+
+
+def _model_version_key(label):
+    return f"dashboard:modelver:{label.lower()}"
+
+
+def _fresh_version():
+    # Never a value an earlier, evicted version could have had: entries
+    # keyed on that version may still be in the cache. A clock reading can
+    # repeat (or meet a version bumped up to it); 62 random bits will not.
+    return random.getrandbits(62)
+
+
+def _current(cache, key):
+    return cache.get_or_set(key, _fresh_version, timeout=None)
+
+
+def _bump(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # No version stored yet (or it was evicted): start from a fresh one.
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics = current_metrics()
+        if metrics is not None:
+            metrics.record_cache(hit)
+
+    def invalidated(self):
+        with self._lock:
+            self.invalidations += 1
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+stats = _Stats()
+
+
+def invalidate(role, profile_id):
+    """Drop every cached dashboard entry for one patient or doctor."""
+    if profile_id is None:
+        return
+    _bump(_cache(), _generation_key(role, profile_id))
+    stats.invalidated()
+
+
+def invalidate_model(label):
+    """Drop every cached fragment that varies on the model ``label`` (``'app_label.model'``)."""
+    _bump(_cache(), _model_version_key(label))
+
+
+def cached(role, profile_id, name, compute):
+    """``compute()``, cached per user until ``invalidate(role, profile_id)``."""
+    cache = _cache()
+    generation = _current(cache, _generation_key(role, profile_id))
+    key = f"dashboard:{name}:{role}:{profile_id}:{generation}"
+    value = cache.get(key)
+    if value is not None:
+        stats.record(hit=True)
+        return value
+    stats.record(hit=False)
+    # Computed from the primary: a lagging replica would otherwise pin stale
+    # rows in the cache until the next invalidation.
+    with primary_reads():
+        value = compute()
+    cache.set(key, value, timeout=getattr(settings, 'DASHBOARD_CACHE_TTL', DEFAULT_TTL))
+    return value
+
+
+PROFILE_ROLES = {Patient: 'patient', MedicalProfessional: 'doctor'}
+
+
+def _version_key(value):
+    """The cache key of the version ``value`` varies by, or None to vary by the value itself."""
+    # isinstance, not type(): request.user.patient is a SimpleLazyObject under RoleMiddleware.
+    for model, role in PROFILE_ROLES.items():
+        if isinstance(value, model):
+            return _generation_key(role, value.pk)
+    if isinstance(value, str):
+        try:
+            apps.get_model(value)
+        except (LookupError, ValueError):
+            return None
+        return _model_version_key(value)
+    return None
+
+
+def _vary_part(cache, value):
+    key = _version_key(value)
+    if key:
+        return f"{key}={_current(cache, key)}"
+    if isinstance(value, Model):
+        # Any other record: itself, until its model changes. Never repr(),
+        # which is a display string and can be shared by different rows.
+        label = value._meta.label_lower
+        return f"{label}:{value.pk}@{_current(cache, _model_version_key(label))}"
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return repr(value)
+    raise TypeError(f"Cannot vary a cached fragment on {type(value).__name__}.")
+
+
+def fragment(name, vary_on, render):
+    """
+    ``render()`` (a template fragment), cached until something in
+    ``vary_on`` changes. Patients and doctors vary by their generation,
+    ``'app_label.model'`` strings by that model's version, other model
+    instances by their primary key and model version, and plain values
+    (e.g. a page number) by themselves.
+    """
+    cache = _cache()
+    parts = [_vary_part(cache, value) for value in vary_on]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    key = f"dashboard:fragment:{name}:{digest}"
+    value = cache.get(key)
+    if value is not None:
+        stats.record(hit=True)
+        return value
+    stats.record(hit=False)
+    with primary_reads():
+        value = render()
+    cache.set(key, value, timeout=getattr(settings, 'DASHBOARD_CACHE_TTL', DEFAULT_TTL))
+    return value
+
+
+def _upcoming(appointments, now=None):
+    # The cached list was upcoming when it was built; drop what has started since.
+    now = now or timezone.now()
+    return [a for a in appointments if a.appointment_date >= now]
+
+
+def patient_context(patient):
+    data = cached('patient', patient.pk, 'patient', lambda: {
+        'upcoming_appointments': list(Appointment.objects.filter(
+            patient=patient, appointment_date__gte=timezone.now()
+        ).select_related('medical_professional__user').order_by('appointment_date')),
+        'prescriptions': list(Prescription.objects.filter(patient=patient).order_by('-created_at')),
+    })
+    return {**data, 'upcoming_appointments': _upcoming(data['upcoming_appointments'])}
+
+
+def doctor_context(doctor):
+    appointments = cached('doctor', doctor.pk, 'doctor', lambda: list(Appointment.objects.filter(
+        medical_professional=doctor, appointment_date__gte=timezone.now()
+    ).select_related('patient__user').order_by('appointment_date')))
+    return {'upcoming_appointments': _upcoming(appointments)}
@@ -0,0 +1,198 @@
+# dashboard/deletion.py
+"""
+Soft delete and batched purge for patients and doctors.
+
+``soft_delete()`` is instant. It stamps ``deleted_at``, which hides the
+profile from ``objects`` (see ActiveProfileManager), and deactivates the
+user so they can no longer log in.
+
+``purge()`` then removes the person's records. It works one table at a
+time, in batches of ids, with a set-based DELETE per batch
+(``QuerySet._raw_delete``), so Django's deletion collector never loads
+years of history into memory. Because raw deletes fire no signals, each
+batch keeps the denormalized state (dashboard counters, search index,
+rosters, schedule bitmaps and dashboard caches) current itself. Every
+batch commits on its own. An interrupted purge can simply be run again
+and continues with whatever is left.
+"""
+from collections import Counter
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Patient, MedicalProfessional, Appointment, Prescription, Report, TestResult, RosterEntry,
+    MedicalProfessionalPatient, SearchPosting, Reminder, Measurement,
+)
+from . import statistics, search, dashboard_cache, schedule
+
+DEFAULT_BATCH_SIZE = 1000
+
+PROFILE_MODELS = {'patient': Patient, 'doctor': MedicalProfessional}
+# role: (field naming the person on clinical rows, field naming the counterpart)
+OWNER_FIELDS = {
+    'patient': ('patient_id', 'medical_professional_id'),
+    'doctor': ('medical_professional_id', 'patient_id'),
+}
+COUNTERPART_ROLE = {'patient': 'doctor', 'doctor': 'patient'}
+
+
+def role_of(profile):
+    for role, model in PROFILE_MODELS.items():
+        if isinstance(profile, model):
+            return role
+    raise ValueError(f"{type(profile).__name__} cannot be soft-deleted")
+
+
+@transaction.atomic
+def soft_delete(profile):
+    """Hide a patient or doctor immediately. Returns False if already deleted."""
+    role = role_of(profile)
+    hidden = PROFILE_MODELS[role].objects.filter(pk=profile.pk).update(deleted_at=timezone.now())
+    if not hidden:
+        return False
+    User.objects.filter(pk=profile.user_id).update(is_active=False)
+    statistics.bump(statistics.count_key(role), -1)
+    transaction.on_commit(lambda: dashboard_cache.invalidate(role, profile.pk))
+    return True
+
+
+class Purge:
+    """
+    Delete everything belonging to one soft-deleted profile, batch by batch.
+    ``on_progress(dict)`` is called after every batch with running totals.
+    """
+    def __init__(self, role, profile_id, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+        if role not in PROFILE_MODELS:
+            raise ValueError(f"Unknown role: {role}")
+        self.role = role
+        self.profile_id = profile_id
+        self.batch_size = batch_size
+        self.on_progress = on_progress
+        self.owner_field, self.counterpart_field = OWNER_FIELDS[role]
+        self.deleted = Counter()
+        self.step = None
+
+    def run(self):
+        profile = PROFILE_MODELS[self.role].all_objects.filter(pk=self.profile_id).values(
+            'user_id', 'deleted_at').first()
+        if profile is None:
+            return self.progress(done=True)
+        if profile['deleted_at'] is None:
+            raise ValueError(f"{self.role} {self.profile_id} is not soft-deleted; call soft_delete() first.")
+
+        self._purge(Appointment, self._appointments_deleted)
+        self._purge(Prescription)
+        self._purge(Report, self._reports_deleted)
+        if self.role == 'doctor':
+            # Test results outlive their doctor (on_delete=SET_NULL).
+            self._detach_test_results()
+        else:
+            self._purge(TestResult, self._test_results_deleted)
+        self._purge(MedicalProfessionalPatient, counterparts=False)
+        self._purge(RosterEntry, counterparts=False, before=self._roster_deleted)
+
+        # Only the profile and user rows remain, so the ORM delete is cheap now.
+        self.step = 'user'
+        with transaction.atomic():
+            self.deleted['user'] += User.objects.filter(pk=profile['user_id']).delete()[0]
+        dashboard_cache.invalidate(self.role, self.profile_id)
+        return self.progress(done=True)
+
+    def progress(self, done=False):
+        data = {'role': self.role, 'profile_id': self.profile_id, 'step': self.step,
+                'deleted': dict(self.deleted), 'done': done}
+        if self.on_progress:
+            self.on_progress(data)
+        return data
+
+    def _purge(self, model, before=None, counterparts=True):
+        self.step = model._meta.model_name
+        qs = model.objects.filter(**{self.owner_field: self.profile_id})
+        fields = ['pk', self.counterpart_field] if counterparts else ['pk']
+        while True:
+            with transaction.atomic():
+                rows = list(qs.values(*fields)[:self.batch_size])
+                if not rows:
+                    return
+                ids = [row['pk'] for row in rows]
+                if counterparts:
+                    self._touch_counterparts(row[self.counterpart_field] for row in rows)
+                if before:
+                    before(ids)
+                batch = model.objects.filter(pk__in=ids)
+                self.deleted[self.step] += batch._raw_delete(batch.db)
+            self.progress()
+
+    def _appointments_deleted(self, ids):
+        rows = list(Appointment.objects.filter(pk__in=ids).values_list(
+            'medical_professional_id', 'appointment_date', 'appointment_end'))
+        days = Counter(statistics.appointments_day_key(start) for _, start, _ in rows)
+        statistics.bump(statistics.count_key('appointment'), -len(ids))
+        for key, n in days.items():
+            statistics.bump(key, -n)
+        if self.role == 'patient':
+            # A purged doctor's bitmaps go with the doctor row (on_delete=CASCADE).
+            schedule.refresh_many_later(rows)
+        # Raw deletes skip the ORM cascade, so the reminders must go first.
+        reminders = Reminder.objects.filter(appointment_id__in=ids)
+        reminders._raw_delete(reminders.db)
+
+    def _reports_deleted(self, ids):
+        weeks = Counter(
+            statistics.reports_week_key(date)
+            for date in Report.objects.filter(pk__in=ids).values_list('date', flat=True)
+        )
+        statistics.bump(statistics.count_key('report'), -len(ids))
+        for key, n in weeks.items():
+            statistics.bump(key, -n)
+        self._unindex('report', ids)
+
+    def _test_results_deleted(self, ids):
+        self._unindex('test_result', ids)
+        # Only patients' test results are purged; their analyte series go with the patient row.
+        measurements = Measurement.objects.filter(test_result_id__in=ids)
+        measurements._raw_delete(measurements.db)
+
+    def _unindex(self, doc_type, ids):
+        postings = SearchPosting.objects.filter(doc_type=doc_type, doc_id__in=ids)
+        documents = postings.values('doc_id').distinct().count()
+        postings._raw_delete(postings.db)
+        statistics.bump(search.DOCUMENT_COUNT_KEY, -documents)
+
+    def _roster_deleted(self, ids):
+        self._touch_counterparts(RosterEntry.objects.filter(pk__in=ids).values_list(
+            self.counterpart_field, flat=True))
+
+    def _detach_test_results(self):
+        self.step = 'testresult'
+        qs = TestResult.objects.filter(medical_professional_id=self.profile_id)
+        while True:
+            with transaction.atomic():
+                ids = list(qs.values_list('pk', flat=True)[:self.batch_size])
+                if not ids:
+                    break
+                self._touch_counterparts(TestResult.objects.filter(pk__in=ids).values_list('patient_id', flat=True))
+                self.deleted['testresult_detached'] += TestResult.objects.filter(pk__in=ids).update(
+                    medical_professional=None)
+                SearchPosting.objects.filter(doc_type='test_result', doc_id__in=ids).update(
+                    medical_professional_id=None)
+            self.progress()
+
+    def _touch_counterparts(self, ids):
+        # Per batch, in the batch's transaction: an interrupted purge cannot
+        # see these rows again on retry, so their owners are told now.
+        role = COUNTERPART_ROLE[self.role]
+        ids = {i for i in ids if i is not None}
+        for counterpart_id in ids:
+            statistics.bump(statistics.changes_key(role, counterpart_id))
+
+        def invalidate():
+            for counterpart_id in ids:
+                dashboard_cache.invalidate(role, counterpart_id)
+        transaction.on_commit(invalidate)
+
+
+def purge(role, profile_id, batch_size=DEFAULT_BATCH_SIZE, on_progress=None):
+    return Purge(role, profile_id, batch_size, on_progress).run()
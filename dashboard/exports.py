@@ -0,0 +1,101 @@
+# dashboard/exports.py
+"""
+Streaming record export.
+
+Each record type is read with ``values().iterator(chunk_size=...)``, which
+uses a server-side cursor where the database supports one. Rows are
+serialized one at a time, so memory stays flat however large the export is,
+and the header goes out before the first query finishes.
+"""
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Patient, Appointment, Prescription, Report, TestResult
+
+CHUNK_SIZE = 2000
+
+COLUMNS = ['record_type', 'id', 'patient_id', 'medical_professional_id', 'date', 'title', 'body',
+           'duration_minutes', 'address', 'phone_number']
+
+
+def _live(model):
+    # Records of soft-deleted patients and doctors are awaiting purge, so they are not exported.
+    # A record without a doctor passes: isnull across a nullable relation is a left join.
+    return model.objects.filter(patient__deleted_at__isnull=True, medical_professional__deleted_at__isnull=True)
+
+
+# record_type: (queryset factory, {export column: model field})
+RECORD_SOURCES = {
+    'patient': (lambda: Patient.objects.all(), {
+        'id': 'id', 'patient_id': 'id', 'date': 'date_of_birth', 'first_name': 'user__first_name',
+        'last_name': 'user__last_name', 'body': 'user__email', 'address': 'address',
+        'phone_number': 'phone_number',
+    }),
+    'appointment': (lambda: _live(Appointment), {
+        'id': 'id', 'patient_id': 'patient_id', 'medical_professional_id': 'medical_professional_id',
+        'date': 'appointment_date', 'body': 'reason', 'duration_minutes': 'duration_minutes',
+    }),
+    'prescription': (lambda: _live(Prescription), {
+        'id': 'id', 'patient_id': 'patient_id', 'medical_professional_id': 'medical_professional_id',
+        'date': 'created_at', 'title': 'medication_name', 'body': 'description',
+    }),
+    'report': (lambda: _live(Report), {
+        'id': 'id', 'patient_id': 'patient_id', 'medical_professional_id': 'medical_professional_id',
+        'date': 'date', 'title': 'title', 'body': 'summary',
+    }),
+    'test_result': (lambda: _live(TestResult), {
+        'id': 'id', 'patient_id': 'patient_id', 'medical_professional_id': 'medical_professional_id',
+        'date': 'test_date', 'title': 'description', 'body': 'result_data',
+    }),
+}
+
+
+def iter_records(patient_id=None, record_types=None, chunk_size=CHUNK_SIZE):
+    """
+    Yield one dict per record, grouped by type and ordered by id within a
+    type. ``patient_id`` limits the export to one patient's record.
+    """
+    for record_type, (queryset, mapping) in RECORD_SOURCES.items():
+        if record_types and record_type not in record_types:
+            continue
+        qs = queryset()
+        if patient_id is not None:
+            qs = qs.filter(pk=patient_id) if record_type == 'patient' else qs.filter(patient_id=patient_id)
+        fields = list(dict.fromkeys(mapping.values()))
+        for row in qs.order_by('pk').values(*fields).iterator(chunk_size=chunk_size):
+            record = {'record_type': record_type}
+            for column, field in mapping.items():
+                record[column] = row[field]
+            if record_type == 'patient':
+                record['title'] = f"{record.pop('first_name')} {record.pop('last_name')}".strip()
+            yield record
+
+
+class _Echo:
+    """File-like object whose write() just returns the value, for csv.writer."""
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def stream_csv(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for record in records:
+        yield writer.writerow([_cell(record.get(column)) for column in COLUMNS])
+
+
+def stream_ndjson(records):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for record in records:
+        yield encoder.encode(record) + '\n'
+
+
+FORMATS = {
+    'csv': (stream_csv, 'text/csv', 'csv'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson', 'ndjson'),
+}
@@ -11,13 +11,24 @@ class UserProfileFactory(BaseFactory):
     A factory that creates the right profile (Patient / MedicalProfessional
     / Admin) for a freshly‑created User.
     """
-    def create(self, user: User, role: str, **extra):
-        # role: "patient" | "doctor" | "admin"
-        if role == "patient":
-            return Patient.objects.create(user=user, **extra)
-        elif role == "doctor":
-            return MedicalProfessional.objects.create(user=user, **extra)
-        elif role == "admin":
-            return HealthcareFacilityAdministrator.objects.create(user=user, **extra)
-        else:
+    # role: "patient" | "doctor" | "admin"
+    ROLE_MODELS = {
+        "patient": Patient,
+        "doctor": MedicalProfessional,
+        "admin": HealthcareFacilityAdministrator,
+    }
+
+    def model_for(self, role: str):
+        try:
+            return self.ROLE_MODELS[role]
+        except KeyError:
             raise ValueError(f"Unknown role: {role}")
+
+    def build(self, user: User, role: str, **extra):
+        """Unsaved profile instance, for callers that bulk_create many at once."""
+        return self.model_for(role)(user=user, **extra)
+
+    def create(self, user: User, role: str, **extra):
+        profile = self.build(user, role, **extra)
+        profile.save(force_insert=True)
+        return profile
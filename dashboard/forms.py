@@ -4,6 +4,8 @@ from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from django.contrib.auth.models import User
 from .models import Appointment, Report, Prescription, Patient
 from django.utils import timezone
+from .availability import find_conflict
+from . import roster
 
 
 class PatientSignUpForm(UserCreationForm):
@@ -44,20 +46,11 @@ class ReportForm(forms.ModelForm):
 
         # Show all patients if no doctor is provided
         if self.medical_professional:
-            # Try to get patients from appointments first
-            patients_with_appointments = Patient.objects.filter(
-                appointment__medical_professional=self.medical_professional
-            ).distinct()
-
-            # If no patients have appointments, try to get from the M2M relationship
-            if not patients_with_appointments.exists():
-                patients_with_appointments = self.medical_professional.patients.all()
-
-            # If still no patients, show all patients as a fallback
-            if not patients_with_appointments.exists():
+            # Assigned patients plus anyone with an appointment, from the precomputed roster
+            if not roster.patient_ids(self.medical_professional.pk):
                 self.fields['patient'].help_text = "No patients are associated with you. Showing all patients."
             else:
-                self.fields['patient'].queryset = patients_with_appointments
+                self.fields['patient'].queryset = roster.patients(self.medical_professional.pk)
 
 
 class MedicalProfessionalSignUpForm(UserCreationForm):
@@ -83,7 +76,7 @@ class AppointmentForm(forms.ModelForm):
     )
     class Meta:
         model = Appointment
-        fields = ['patient', 'medical_professional', 'appointment_date', 'reason']
+        fields = ['patient', 'medical_professional', 'appointment_date', 'duration_minutes', 'reason']
 
 class PatientAppointmentForm(forms.ModelForm):
     appointment_date = forms.DateTimeField(
@@ -94,7 +87,7 @@ class PatientAppointmentForm(forms.ModelForm):
     class Meta:
         model = Appointment
         # Exclude patient because it will be set from the logged-in user
-        fields = ['medical_professional', 'appointment_date', 'reason']
+        fields = ['medical_professional', 'appointment_date', 'duration_minutes', 'reason']
 
     def __init__(self, *args, **kwargs):
         # Expect the current patient instance to be passed in
@@ -110,20 +103,15 @@ class PatientAppointmentForm(forms.ModelForm):
     def clean(self):
         cleaned_data = super().clean()
         appointment_date = cleaned_data.get('appointment_date')
+        duration = cleaned_data.get('duration_minutes')
         doctor = cleaned_data.get('medical_professional')
-        if appointment_date and doctor and self.patient:
-            # Check if the doctor already has an appointment at that time
-            if Appointment.objects.filter(
-                    medical_professional=doctor,
-                    appointment_date=appointment_date
-            ).exists():
+        if appointment_date and duration and doctor and self.patient:
+            # One range query covers both the doctor's and the patient's calendar,
+            # and catches partial overlaps, not just identical start times.
+            conflict = find_conflict(appointment_date, duration, doctor, self.patient, exclude_pk=self.instance.pk)
+            if conflict == 'doctor':
                 raise forms.ValidationError("This doctor is not available at that time.")
-
-            # Check if the patient already has an appointment at that time
-            if Appointment.objects.filter(
-                    patient=self.patient,
-                    appointment_date=appointment_date
-            ).exists():
+            if conflict == 'patient':
                 raise forms.ValidationError("You already have an appointment at that time.")
         return cleaned_data
 
@@ -138,7 +126,7 @@ class DoctorAppointmentForm(forms.ModelForm):
         model = Appointment
         # The form includes the patient, appointment_date, and reason.
         # The medical_professional field will be set in the view.
-        fields = ['patient', 'appointment_date', 'reason']
+        fields = ['patient', 'appointment_date', 'duration_minutes', 'reason']
 
     def __init__(self, *args, **kwargs):
         # Expect the current medical professional to be passed in.
@@ -154,19 +142,15 @@ class DoctorAppointmentForm(forms.ModelForm):
     def clean(self):
         cleaned_data = super().clean()
         appointment_date = cleaned_data.get('appointment_date')
+        duration = cleaned_data.get('duration_minutes')
         patient = cleaned_data.get('patient')
-        if appointment_date and patient and self.medical_professional:
-            # Check if the doctor already has an appointment at that time.
-            if Appointment.objects.filter(
-                    medical_professional=self.medical_professional,
-                    appointment_date=appointment_date
-            ).exists():
+        if appointment_date and duration and patient and self.medical_professional:
+            conflict = find_conflict(
+                appointment_date, duration, self.medical_professional, patient, exclude_pk=self.instance.pk
+            )
+            if conflict == 'doctor':
                 raise forms.ValidationError("You already have an appointment at that time.")
-            # Check if the selected patient already has an appointment at that time.
-            if Appointment.objects.filter(
-                    patient=patient,
-                    appointment_date=appointment_date
-            ).exists():
+            if conflict == 'patient':
                 raise forms.ValidationError("This patient already has an appointment at that time.")
         return cleaned_data
 
@@ -268,4 +252,56 @@ class MedicalProfessionalEditForm(UserChangeForm):
         super().__init__(*args, **kwargs)
         # Remove the password field from the form
         if 'password' in self.fields:
-            self.fields.pop('password')
\ No newline at end of file
+            self.fields.pop('password')
+
+class PatientImportRowForm(forms.Form):
+    # Validates one row of a bulk patient import (see dashboard/importers.py)
+    username = forms.CharField(max_length=150)
+    email = forms.EmailField(required=False)
+    first_name = forms.CharField(max_length=150, required=False)
+    last_name = forms.CharField(max_length=150, required=False)
+    password = forms.CharField(required=False)
+    date_of_birth = forms.DateField(required=False)
+    address = forms.CharField(max_length=255, required=False)
+    phone_number = forms.CharField(max_length=20, required=False)
+
+    def clean_username(self):
+        username = self.cleaned_data['username'].strip()
+        User.username_validator(username)
+        return username
+
+
+class LabResultImportRowForm(forms.Form):
+    # Validates one measurement row of a lab feed (see dashboard/analytes.py)
+    patient = forms.IntegerField(min_value=1)
+    test_date = forms.DateTimeField()
+    code = forms.CharField(max_length=32)
+    value = forms.FloatField()
+    unit = forms.CharField(max_length=32, required=False)
+    reference_low = forms.FloatField(required=False)
+    reference_high = forms.FloatField(required=False)
+    doctor = forms.IntegerField(min_value=1, required=False)
+    accession = forms.CharField(max_length=64, required=False)
+    description = forms.CharField(required=False)
+
+    def clean_code(self):
+        return self.cleaned_data['code'].strip().upper()
+
+    def clean(self):
+        cleaned = super().clean()
+        low, high = cleaned.get('reference_low'), cleaned.get('reference_high')
+        if low is not None and high is not None and low > high:
+            raise forms.ValidationError("reference_low is above reference_high.")
+        return cleaned
+
+
+class PatientImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV with a header row, or JSON Lines (one object per line).")
+    format = forms.ChoiceField(
+        choices=[('auto', 'Detect from file name'), ('csv', 'CSV'), ('jsonl', 'JSON Lines')],
+        initial='auto'
+    )
+    hash_passwords = forms.BooleanField(
+        required=False,
+        help_text="Hash the password column. Otherwise accounts get unusable passwords and must be reset."
+    )
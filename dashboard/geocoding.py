@@ -0,0 +1,187 @@
+# dashboard/geocoding.py
+import hashlib
+import logging
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .instrumentation import track_http
+from .caching import LRUCache, SingleFlight
+from .singletons import SingletonMeta
+from .transport import build_session
+
+logger = logging.getLogger(__name__)
+
+# Half-width of the pharmacy search box in degrees, as the map page always used.
+SEARCH_RADIUS_DEG = 0.15
+# Centers are rounded to this many decimals (~1 km) so nearby searches share a cache entry.
+BBOX_PRECISION = 2
+
+
+def normalize_address(address: str) -> str:
+    """Cache key for an address: case-folded, punctuation-light, whitespace-collapsed."""
+    address = re.sub(r"[\s,]+", " ", address.casefold()).strip()
+    return address[:255]
+
+
+def bbox_key(lat: float, lon: float, radius: float = SEARCH_RADIUS_DEG):
+    """Round a center to BBOX_PRECISION and return ``(key, (left, top, right, bottom))``."""
+    lat, lon = round(lat, BBOX_PRECISION), round(lon, BBOX_PRECISION)
+    key = f"{lat:.{BBOX_PRECISION}f}:{lon:.{BBOX_PRECISION}f}:{radius}"
+    return key, (lon - radius, lat + radius, lon + radius, lat - radius)
+
+
+class GeocoderBackend:
+    """
+    Interface for geocoding backends. Pharmacies are returned as dicts with
+    ``display_name``, ``lat`` and ``lon``, the same shape Nominatim uses.
+    """
+    def geocode(self, address: str):
+        raise NotImplementedError("Must implement geocode()")
+
+    def search_pharmacies(self, bbox):
+        raise NotImplementedError("Must implement search_pharmacies()")
+
+
+class NominatimBackend(GeocoderBackend):
+    base_url = "https://nominatim.openstreetmap.org/search"
+
+    def __init__(self):
+        self.base_url = getattr(settings, 'NOMINATIM_URL', self.base_url)
+        self.session = build_session(pool_size=4)
+        self.session.headers.update({
+            'User-Agent': getattr(settings, 'GEOCODER_USER_AGENT', 'HealthLink/1.0'),
+            'Accept-Language': 'en-US,en',
+        })
+        self.timeout = (3.05, getattr(settings, 'GEOCODER_TIMEOUT', 10))
+
+    def _search(self, **params):
+        with track_http():
+            resp = self.session.get(self.base_url, params={'format': 'json', **params}, timeout=self.timeout)
+        resp.raise_for_status()
+        return resp.json()
+
+    def geocode(self, address):
+        data = self._search(q=address, limit=1)
+        if not data:
+            return None
+        return float(data[0]['lat']), float(data[0]['lon'])
+
+    def search_pharmacies(self, bbox):
+        data = self._search(q='pharmacy', limit=50, viewbox=','.join(str(v) for v in bbox), bounded=1)
+        return [
+            {'display_name': row['display_name'], 'lat': float(row['lat']), 'lon': float(row['lon'])}
+            for row in data
+        ]
+
+
+class LocalGeocoderBackend(GeocoderBackend):
+    """
+    Offline stand-in: deterministic coordinates derived from the address and a
+    fixed handful of pharmacies inside each box. For development and tests.
+    """
+    def geocode(self, address):
+        digest = hashlib.sha256(normalize_address(address).encode()).digest()
+        lat = int.from_bytes(digest[:4], 'big') / 2 ** 32 * 120 - 60
+        lon = int.from_bytes(digest[4:8], 'big') / 2 ** 32 * 360 - 180
+        return round(lat, 6), round(lon, 6)
+
+    def search_pharmacies(self, bbox):
+        left, top, right, bottom = bbox
+        center_lat, center_lon = (top + bottom) / 2, (left + right) / 2
+        pharmacies = []
+        for i in range(5):
+            angle = i * 2 * math.pi / 5
+            lat = center_lat + (top - bottom) / 4 * math.sin(angle)
+            lon = center_lon + (right - left) / 4 * math.cos(angle)
+            pharmacies.append({
+                'display_name': f"Local Pharmacy {i + 1}, {lat:.4f}, {lon:.4f}",
+                'lat': round(lat, 6),
+                'lon': round(lon, 6),
+            })
+        return pharmacies
+
+
+class GeocodingService(metaclass=SingletonMeta):
+    """
+    Caching proxy in front of the configured ``GEOCODER_BACKEND``.
+
+    Geocodes are cached by normalized address and pharmacy searches by rounded
+    bounding box, each in an in-process LRU backed by a table, so repeated
+    lookups never reach the public API.
+    """
+    def __init__(self):
+        backend_path = getattr(settings, 'GEOCODER_BACKEND', 'dashboard.geocoding.NominatimBackend')
+        self.backend = import_string(backend_path)()
+        self.geocode_ttl = timedelta(seconds=getattr(settings, 'GEOCODE_CACHE_TTL', 90 * 24 * 60 * 60))
+        self.pharmacy_ttl = timedelta(seconds=getattr(settings, 'PHARMACY_CACHE_TTL', 7 * 24 * 60 * 60))
+        self.geocodes = LRUCache(maxsize=getattr(settings, 'GEOCODE_MEMORY_CACHE_SIZE', 4096),
+                                 ttl=self.geocode_ttl.total_seconds())
+        self.searches = LRUCache(maxsize=getattr(settings, 'PHARMACY_MEMORY_CACHE_SIZE', 1024),
+                                 ttl=self.pharmacy_ttl.total_seconds())
+        self._inflight = SingleFlight()
+        self._prefetch_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='geocode-prefetch')
+
+    def geocode(self, address: str):
+        """``(lat, lon)`` for an address, or ``None`` if the backend can't place it."""
+        key = normalize_address(address)
+        if not key:
+            return None
+        cached = self.geocodes.get(key)
+        if cached is not None:
+            return cached or None
+        return self._inflight.do(('geocode', key), self._load_geocode, key, address) or None
+
+    def find_pharmacies(self, lat: float, lon: float):
+        key, bbox = bbox_key(lat, lon)
+        cached = self.searches.get(key)
+        if cached is not None:
+            return cached
+        return self._inflight.do(('pharmacies', key), self._load_pharmacies, key, bbox)
+
+    def prefetch(self, address: str):
+        """Geocode ``address`` in the background so the first search is a cache hit."""
+        def run():
+            try:
+                self.geocode(address)
+            except Exception:
+                logger.exception("Background geocode failed.")
+            finally:
+                connection.close()
+        self._prefetch_pool.submit(run)
+
+    def _load_geocode(self, key, address):
+        from .models import GeocodedAddress
+
+        row = GeocodedAddress.objects.filter(
+            normalized_address=key, updated_at__gte=timezone.now() - self.geocode_ttl
+        ).values_list('latitude', 'longitude').first()
+        if row is None:
+            coords = self.backend.geocode(address)
+            lat, lon = coords if coords else (None, None)
+            GeocodedAddress.objects.update_or_create(
+                normalized_address=key, defaults={'latitude': lat, 'longitude': lon}
+            )
+            row = (lat, lon)
+        # An empty tuple marks a known miss so it isn't looked up again.
+        value = row if row[0] is not None else ()
+        self.geocodes.set(key, value)
+        return value
+
+    def _load_pharmacies(self, key, bbox):
+        from .models import PharmacySearchResult
+
+        results = PharmacySearchResult.objects.filter(
+            bbox_key=key, updated_at__gte=timezone.now() - self.pharmacy_ttl
+        ).values_list('results', flat=True).first()
+        if results is None:
+            results = self.backend.search_pharmacies(bbox)
+            PharmacySearchResult.objects.update_or_create(bbox_key=key, defaults={'results': results})
+        self.searches.set(key, results)
+        return results
@@ -0,0 +1,189 @@
+# dashboard/importers.py
+"""
+Streaming bulk patient import.
+
+Rows are read lazily from CSV or JSON Lines, validated a batch at a time
+with ``PatientImportRowForm``, and written with ``bulk_create`` in one
+transaction per batch, so memory use is bounded by the batch size rather
+than the file size. Bad rows are reported through a callback and skipped;
+they never abort the run.
+"""
+import csv
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
+
+from .factories import UserProfileFactory
+from .forms import PatientImportRowForm
+from . import statistics
+
+logger = logging.getLogger(__name__)
+
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def iter_rows(stream, fmt):
+    """Yield ``(line_number, row_dict_or_error)`` from a text stream without reading it all."""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield line_number, f"Invalid JSON: {e}"
+                continue
+            yield line_number, row if isinstance(row, dict) else "Each line must be a JSON object."
+    else:
+        raise ValueError(f"Unknown format: {fmt}")
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []  # first MAX_REPORTED_ERRORS (line_number, message) pairs
+
+    def add_error(self, line_number, message):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line_number, message))
+
+
+class PatientImporter:
+    """
+    ``PatientImporter(batch_size=1000).run(stream, 'csv')``
+
+    Without ``hash_passwords`` every account gets an unusable password (the
+    cheap path; users go through password reset). With it, the ``password``
+    column is hashed on a thread pool of ``hash_workers`` threads; the
+    PBKDF2 hasher releases the GIL, so this parallelises.
+    """
+    role = "patient"
+
+    def __init__(self, batch_size=1000, hash_passwords=False, hash_workers=4, on_error=None, on_progress=None):
+        self.batch_size = batch_size
+        self.hash_passwords = hash_passwords
+        self.hash_workers = hash_workers
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.factory = UserProfileFactory()
+        self.unusable_password = make_password(None)
+
+    def run(self, stream, fmt):
+        result = ImportResult()
+        rows = iter_rows(stream, fmt)
+        pool = ThreadPoolExecutor(max_workers=self.hash_workers) if self.hash_passwords else None
+        try:
+            while True:
+                batch = list(islice(rows, self.batch_size))
+                if not batch:
+                    break
+                self._import_batch(batch, result, pool)
+                if self.on_progress:
+                    self.on_progress(result)
+        finally:
+            if pool:
+                pool.shutdown()
+        if result.created:
+            # bulk_create skips the post_save counters, so bump once per run.
+            statistics.bump(statistics.count_key(self.role), result.created)
+        return result
+
+    def _error(self, result, line_number, message):
+        result.add_error(line_number, message)
+        if self.on_error:
+            self.on_error(line_number, message)
+
+    def _validate(self, batch, result):
+        valid = []
+        seen = set()
+        for line_number, row in batch:
+            if isinstance(row, str):
+                self._error(result, line_number, row)
+                continue
+            form = PatientImportRowForm({k: (v if v is not None else '') for k, v in row.items()})
+            if not form.is_valid():
+                message = '; '.join(f"{field}: {' '.join(errs)}" for field, errs in form.errors.items())
+                self._error(result, line_number, message)
+                continue
+            data = form.cleaned_data
+            if data['username'] in seen:
+                self._error(result, line_number, f"username: duplicate of an earlier row ({data['username']}).")
+                continue
+            seen.add(data['username'])
+            valid.append((line_number, data))
+
+        # One query per batch for usernames that are already taken.
+        taken = set(User.objects.filter(
+            username__in=[data['username'] for _, data in valid]
+        ).values_list('username', flat=True))
+        accepted = []
+        for line_number, data in valid:
+            if data['username'] in taken:
+                self._error(result, line_number, f"username: {data['username']} already exists.")
+            else:
+                accepted.append((line_number, data))
+        return accepted
+
+    def _passwords(self, rows, pool):
+        if pool is None:
+            return [self.unusable_password] * len(rows)
+        return list(pool.map(
+            lambda data: make_password(data['password']) if data['password'] else self.unusable_password,
+            (data for _, data in rows),
+        ))
+
+    def _build(self, data, password):
+        user = User(username=data['username'], email=data['email'] or '',
+                    first_name=data['first_name'] or '', last_name=data['last_name'] or '',
+                    password=password)
+        profile_fields = {
+            'date_of_birth': data['date_of_birth'],
+            'address': data['address'] or '',
+            'phone_number': data['phone_number'] or '',
+        }
+        return user, profile_fields
+
+    def _import_batch(self, batch, result, pool):
+        rows = self._validate(batch, result)
+        if not rows:
+            return
+        built = [self._build(data, password) for (_, data), password in zip(rows, self._passwords(rows, pool))]
+        try:
+            with transaction.atomic():
+                self._insert(built)
+            result.created += len(built)
+        except IntegrityError:
+            # Something raced us (e.g. a signup took a username); isolate the bad rows.
+            for (line_number, _), item in zip(rows, built):
+                item[0].pk = None  # may have been assigned by the rolled-back insert
+                try:
+                    with transaction.atomic():
+                        self._insert([item])
+                    result.created += 1
+                except IntegrityError as e:
+                    self._error(result, line_number, f"Database error: {e}")
+
+    def _insert(self, built):
+        users = [user for user, _ in built]
+        User.objects.bulk_create(users)
+        # Not every backend returns primary keys from bulk_create, so re-read them.
+        by_name = User.objects.in_bulk([u.username for u in users], field_name='username')
+        model = self.factory.model_for(self.role)
+        model.objects.bulk_create([
+            self.factory.build(by_name[user.username], self.role, **fields) for user, fields in built
+        ])
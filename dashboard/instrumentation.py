@@ -0,0 +1,280 @@
+# dashboard/instrumentation.py
+"""
+Per-request performance instrumentation.
+
+Add ``'dashboard.instrumentation.RequestMetricsMiddleware'`` to MIDDLEWARE to
+record, for every request: SQL query count and time, duplicate query
+fingerprints (the usual N+1 signature), template render time and outbound
+HTTP time, and dashboard cache hits and misses. Each request is logged as one JSON line on the
+``dashboard.instrumentation`` logger. With DEBUG on, the numbers are also
+returned in ``Server-Timing`` and ``X-Query-Count`` response headers. The
+middleware runs natively under both WSGI and ASGI, so async views are not
+pushed onto a thread and back.
+
+Render time is also broken down per template (self time, excluding the
+templates it extends or includes) and per ``{% block %}`` (inclusive), so
+the log shows which template and block the time goes to. This needs hooks in
+Django's template engine, which ``DashboardConfig.ready()`` installs only when
+the middleware is in MIDDLEWARE or ``TEMPLATE_PROFILING = True``; set it to
+False to keep the hooks out even with the middleware.
+
+Views can declare an expected ceiling with ``@query_budget(n)``; going over
+it logs a warning here and fails ``dashboard.testing.assert_within_query_budget``.
+"""
+import contextvars
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack, asynccontextmanager, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+from django.template.loader_tags import BlockNode
+
+logger = logging.getLogger(__name__)
+
+MIDDLEWARE_PATH = 'dashboard.instrumentation.RequestMetricsMiddleware'
+
+_current = contextvars.ContextVar('dashboard_request_metrics', default=None)
+
+
+def query_budget(max_queries):
+    """Declare the most SQL queries a view should need per request."""
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)")
+
+
+def fingerprint(sql):
+    """Normalize a statement so queries differing only in literals compare equal."""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _IN_LIST.sub('(?)', sql)
+    return ' '.join(sql.split())
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.fingerprints = Counter()
+        self.template_time = 0.0
+        self.http_time = 0.0
+        self.http_calls = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # name: [renders, seconds]; self time for templates, inclusive for blocks
+        self.templates = {}
+        self.blocks = {}
+        # Time spent in nested templates, one entry per template being rendered
+        self._template_stack = []
+
+    def duplicates(self):
+        return {sql: n for sql, n in self.fingerprints.items() if n > 1}
+
+    def as_dict(self):
+        duplicates = self.duplicates()
+        return {
+            'queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'duplicate_queries': sum(duplicates.values()) - len(duplicates),
+            'duplicate_fingerprints': sorted(duplicates, key=duplicates.get, reverse=True)[:5],
+            'template_ms': round(self.template_time * 1000, 2),
+            'http_ms': round(self.http_time * 1000, 2),
+            'http_calls': self.http_calls,
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            'templates': _slowest(self.templates),
+            'blocks': _slowest(self.blocks),
+        }
+
+    def record_cache(self, hit):
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def _record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+
+def _slowest(timings, limit=5):
+    ranked = sorted(timings.items(), key=lambda item: item[1][1], reverse=True)[:limit]
+    return {name: {'renders': renders, 'ms': round(seconds * 1000, 2)} for name, (renders, seconds) in ranked}
+
+
+def _add_timing(timings, name, seconds):
+    entry = timings.setdefault(name, [0, 0.0])
+    entry[0] += 1
+    entry[1] += seconds
+
+
+def _template_name(node_or_template):
+    origin = getattr(node_or_template, 'origin', None)
+    return getattr(origin, 'template_name', None) or getattr(node_or_template, 'name', None) or '<string>'
+
+
+def current_metrics():
+    return _current.get()
+
+
+def _wrap_connections(stack, metrics):
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(metrics._record_query))
+
+
+@contextmanager
+def collect_metrics():
+    """Record metrics for the enclosed block on every configured connection."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            _wrap_connections(stack, metrics)
+            yield metrics
+    finally:
+        _current.reset(token)
+
+
+@asynccontextmanager
+async def acollect_metrics():
+    """
+    ``collect_metrics()`` for async code. Connections are per thread, so the
+    query wrappers go on the ones of the thread sync_to_async runs ORM calls in.
+    """
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    stack = ExitStack()
+    try:
+        await sync_to_async(_wrap_connections)(stack, metrics)
+        yield metrics
+    finally:
+        await sync_to_async(stack.close)()
+        _current.reset(token)
+
+
+@contextmanager
+def track_http():
+    """Wrap an outbound HTTP call so its time is attributed to the current request."""
+    metrics = _current.get()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.http_time += time.perf_counter() - start
+            metrics.http_calls += 1
+
+
+_original_template_render = Template._render
+_original_block_render = BlockNode.render
+
+
+def _timed_template_render(self, context):
+    metrics = _current.get()
+    if metrics is None:
+        return _original_template_render(self, context)
+    stack = metrics._template_stack
+    stack.append(0.0)
+    start = time.perf_counter()
+    try:
+        return _original_template_render(self, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        nested = stack.pop()
+        _add_timing(metrics.templates, _template_name(self), elapsed - nested)
+        if stack:
+            stack[-1] += elapsed
+        else:
+            # Only the outermost template counts towards the total; extends/include nest inside it.
+            metrics.template_time += elapsed
+
+
+def _timed_block_render(self, context):
+    metrics = _current.get()
+    if metrics is None:
+        return _original_block_render(self, context)
+    start = time.perf_counter()
+    try:
+        return _original_block_render(self, context)
+    finally:
+        # Keyed by block name: the node rendering is the parent's, the content may be a child's override.
+        _add_timing(metrics.blocks, self.name, time.perf_counter() - start)
+
+
+def template_profiling_enabled():
+    return getattr(settings, 'TEMPLATE_PROFILING', MIDDLEWARE_PATH in settings.MIDDLEWARE)
+
+
+def install_template_profiling():
+    """Hook template and block rendering so collect_metrics() sees it; safe to call more than once."""
+    if Template._render is not _timed_template_render:
+        Template._render = _timed_template_render
+    if BlockNode.render is not _timed_block_render:
+        BlockNode.render = _timed_block_render
+
+
+class RequestMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        start = time.perf_counter()
+        with collect_metrics() as metrics:
+            response = self.get_response(request)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        start = time.perf_counter()
+        async with acollect_metrics() as metrics:
+            response = await self.get_response(request)
+        return self._report(request, response, metrics, time.perf_counter() - start)
+
+    def _report(self, request, response, metrics, elapsed):
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else None
+        data = {'view': view, 'method': request.method, 'path': request.path,
+                'status': response.status_code, 'total_ms': round(elapsed * 1000, 2),
+                **metrics.as_dict()}
+
+        budget = getattr(match.func, 'query_budget', None) if match else None
+        if budget is not None and metrics.queries > budget:
+            data['query_budget'] = budget
+            logger.warning(json.dumps(data))
+        else:
+            logger.info(json.dumps(data))
+
+        if settings.DEBUG:
+            response['X-Query-Count'] = str(metrics.queries)
+            response['Server-Timing'] = ', '.join([
+                f"db;dur={data['db_ms']}",
+                f"tpl;dur={data['template_ms']}",
+                *(f'tpl{i};desc="{name}";dur={timing["ms"]}'
+                  for i, (name, timing) in enumerate(list(data['templates'].items())[:3], 1)),
+                f"http;dur={data['http_ms']}",
+                f"total;dur={data['total_ms']}",
+            ])
+        return response
@@ -0,0 +1,236 @@
+# dashboard/jobs.py
+"""
+A small database-backed job queue for slow side effects.
+
+No broker is involved: jobs are ``Job`` rows, so the queue works on one
+machine, on SQLite, and inside tests. The pieces are:
+
+* ``@task('name')`` registers a function as a job type. Payloads are JSON,
+  passed to the function as keyword arguments, and the JSON-serializable
+  return value is stored as the job's result.
+* ``enqueue()`` adds a job. A job with an idempotency key is created at
+  most once; enqueueing the same key again returns the existing job.
+* The ``run_jobs`` management command starts a pool of worker threads.
+  Workers claim due jobs with a conditional UPDATE, highest priority
+  first. A failed job is retried with exponential backoff until it has
+  used ``max_attempts``.
+* ``JOBS_RUN_INLINE = True`` makes ``enqueue()`` run each job right after
+  the surrounding transaction commits instead of queueing it, which is
+  handy in tests. ``run_pending()`` drains the queue synchronously.
+
+A worker that dies mid-job leaves it ``running``. After
+``JOBS_LEASE_SECONDS`` (default 600) another worker puts it back on the
+queue. Tasks should therefore be safe to run twice. Long tasks should
+call ``report_progress()`` regularly, which also renews the lease.
+"""
+import contextvars
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 600
+RETRY_BASE_SECONDS = 5
+RETRY_CAP_SECONDS = 15 * 60
+
+_registry = {}
+_current_job = contextvars.ContextVar('dashboard_current_job', default=None)
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+def task(name, max_attempts=3):
+    """Register the decorated function as the job type ``name``."""
+    def decorator(func):
+        _registry[name] = (func, max_attempts)
+        func.task_name = name
+        return func
+    return decorator
+
+
+def _load_tasks():
+    # Task modules register themselves on import.
+    from . import tasks  # noqa: F401
+
+
+def enqueue(name, payload=None, priority=0, idempotency_key=None, run_at=None, max_attempts=None,
+            created_by=None):
+    """Queue a job and return its ``Job`` row (the existing one for a repeated idempotency key)."""
+    _load_tasks()
+    if name not in _registry:
+        raise UnknownTask(name)
+    fields = {
+        'name': name, 'payload': payload or {}, 'priority': priority,
+        'run_at': run_at or timezone.now(), 'idempotency_key': idempotency_key,
+        'max_attempts': max_attempts or _registry[name][1],
+        'created_by': created_by if created_by is not None and created_by.is_authenticated else None,
+    }
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(**fields)
+    except IntegrityError:
+        if idempotency_key is None:
+            raise
+        return Job.objects.get(idempotency_key=idempotency_key)
+
+    if getattr(settings, 'JOBS_RUN_INLINE', False):
+        transaction.on_commit(lambda: Worker('inline').run_one(job.pk))
+    return job
+
+
+def report_progress(progress):
+    """
+    Record ``progress`` (any JSON value) on the job running in this thread,
+    so it shows up when the job is polled. A no-op outside a job.
+    """
+    job = _current_job.get()
+    if job is not None:
+        job.progress = progress
+        Job.objects.filter(pk=job.pk).update(progress=progress, locked_at=timezone.now())
+
+
+def _retry_delay(attempt):
+    return timedelta(seconds=min(RETRY_CAP_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempt - 1)))
+
+
+def requeue_stale(now=None):
+    """
+    Put back jobs that have been running for longer than the lease (their
+    worker is presumed dead), or fail them if they have used all their
+    attempts. Returns how many were requeued.
+    """
+    now = now or timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'JOBS_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - lease)
+    stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, locked_by='', locked_at=None, finished_at=now, error="Worker lease expired.",
+    )
+    return stale.update(status=Job.QUEUED, locked_by='', locked_at=None, run_at=now)
+
+
+class Worker:
+    def __init__(self, name=None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        _load_tasks()
+
+    def claim(self):
+        """Atomically take the best due job, or return None."""
+        now = timezone.now()
+        candidates = Job.objects.filter(status=Job.QUEUED, run_at__lte=now).order_by(
+            '-priority', 'run_at', 'id'
+        ).values_list('id', flat=True)[:10]
+        for job_id in candidates:
+            # Only one worker's conditional update can move it out of QUEUED.
+            if self._take(job_id, now):
+                return Job.objects.get(pk=job_id)
+        return None
+
+    def _take(self, job_id, now):
+        # The attempt is counted at claim time, so a job whose worker dies still uses it up.
+        return Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=self.name, locked_at=now, attempts=F('attempts') + 1,
+        )
+
+    def run_one(self, job_id=None):
+        """Claim (or, given ``job_id``, take that queued job) and run it. Returns the job or None."""
+        if job_id is None:
+            job = self.claim()
+        elif self._take(job_id, timezone.now()):
+            job = Job.objects.get(pk=job_id)
+        else:
+            job = None
+        if job is not None:
+            self.execute(job)
+        return job
+
+    def execute(self, job):
+        entry = _registry.get(job.name)
+        token = _current_job.set(job)
+        try:
+            if entry is None:
+                raise UnknownTask(job.name)
+            result = entry[0](**job.payload)
+        except Exception:
+            job.error = traceback.format_exc(limit=20)
+            if entry is not None and job.attempts < job.max_attempts:
+                job.status = Job.QUEUED
+                job.run_at = timezone.now() + _retry_delay(job.attempts)
+                logger.warning("Job %s (%s) failed, attempt %s/%s; retrying at %s",
+                               job.pk, job.name, job.attempts, job.max_attempts, job.run_at)
+            else:
+                job.status = Job.FAILED
+                job.finished_at = timezone.now()
+                logger.error("Job %s (%s) failed permanently:\n%s", job.pk, job.name, job.error)
+        else:
+            job.status = Job.SUCCEEDED
+            job.result = result
+            job.error = ''
+            job.finished_at = timezone.now()
+        finally:
+            _current_job.reset(token)
+        job.locked_by = ''
+        job.locked_at = None
+        # Only while the claim is still ours: if the lease ran out, requeue_stale()
+        # may have handed the job to another worker whose outcome must not be overwritten.
+        written = Job.objects.filter(pk=job.pk, locked_by=self.name).update(
+            status=job.status, run_at=job.run_at, result=job.result, error=job.error,
+            finished_at=job.finished_at, locked_by='', locked_at=None,
+        )
+        if not written:
+            logger.warning("Job %s (%s) lost its claim while running; dropping this outcome (%s)",
+                           job.pk, job.name, job.status)
+
+    def run(self, stop, poll_interval=1.0, burst=False):
+        """Process jobs until ``stop`` (a threading.Event) is set, or the queue is empty if ``burst``."""
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = self.claim()
+                if job is not None:
+                    self.execute(job)
+                    continue
+            except Exception:
+                logger.exception("Job worker %s hit an error; continuing", self.name)
+            if burst:
+                return
+            stop.wait(poll_interval)
+
+
+def run_pending(limit=None):
+    """Run due jobs in this thread until the queue is empty. Returns how many ran."""
+    worker = Worker('sync')
+    ran = 0
+    while limit is None or ran < limit:
+        if worker.run_one() is None:
+            break
+        ran += 1
+    return ran
+
+
+def status(job):
+    """JSON-friendly view of a job for polling endpoints."""
+    return {
+        'id': job.pk,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'progress': job.progress,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
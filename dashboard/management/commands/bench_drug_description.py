@@ -0,0 +1,86 @@
+# dashboard/management/commands/bench_drug_description.py
+import asyncio
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from dashboard.singletons import GeminiClient
+from .gemini_stub import make_server
+
+
+def _summary(latencies, elapsed):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Compare concurrent throughput of GeminiClient's sync (thread pool) and "
+            "async (event loop) upstream paths against a local Gemini stub.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=200,
+                            help="In-flight requests for the async path.")
+        parser.add_argument('--threads', type=int, default=16,
+                            help="Worker threads for the sync path, i.e. WSGI threads available.")
+        parser.add_argument('--latency', type=float, default=0.2,
+                            help="Simulated Gemini latency in seconds.")
+
+    def handle(self, *args, **options):
+        server = make_server(latency=options['latency'], backlog=options['concurrency'] + options['threads'])
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address[:2]
+
+        client = GeminiClient()
+        original_url = client.base_url
+        client.base_url = f"http://{host}:{port}/"
+        # The cache would hide the transport, so both paths call upstream directly.
+        names = [f"benchmed-{i}" for i in range(options['requests'])]
+        try:
+            results = {
+                'sync': self._run_sync(client, names, options['threads']),
+                'async': asyncio.run(self._run_async(client, names, options['concurrency'])),
+                'config': {k: options[k] for k in ('requests', 'concurrency', 'threads', 'latency')},
+            }
+        finally:
+            client.base_url = original_url
+            server.shutdown()
+            server.server_close()
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def _run_sync(self, client, names, threads):
+        def timed(name):
+            start = time.perf_counter()
+            client._fetch_description(name)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(timed, names))
+        return _summary(latencies, time.perf_counter() - start)
+
+    async def _run_async(self, client, names, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed(name):
+            async with semaphore:
+                start = time.perf_counter()
+                await client._afetch_description(name)
+                return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed(name) for name in names))
+        elapsed = time.perf_counter() - start
+        await client._async_client().aclose()
+        client._async_clients.clear()
+        return _summary(latencies, elapsed)
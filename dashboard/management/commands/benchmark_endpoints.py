@@ -0,0 +1,161 @@
+# dashboard/management/commands/benchmark_endpoints.py
+import json
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from dashboard.instrumentation import collect_metrics, install_template_profiling
+from dashboard.models import Appointment, HealthcareFacilityAdministrator, MedicalProfessional, Patient, Report
+
+# Views that would end the benchmark session.
+SKIPPED = {'logout'}
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class Command(BaseCommand):
+    help = ("Request every named URL in the project as a patient, a doctor and an admin and "
+            "report p50/p95/p99 latency, query counts and peak memory per endpoint as JSON. "
+            "Run it against a seeded database (see seed_data), never production.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--roles', default='patient,doctor,admin')
+        parser.add_argument('--only', help="Comma-separated URL names to benchmark.")
+        parser.add_argument('--output', help="Write results to this JSON file.")
+        parser.add_argument('--compare', help="Baseline JSON from an earlier run to diff against.")
+
+    def handle(self, *args, **options):
+        # The per-template breakdown needs the render hooks even without the middleware.
+        install_template_profiling()
+        actors = self.actors()
+        roles = [r for r in options['roles'].split(',') if r]
+        only = set(options['only'].split(',')) if options['only'] else None
+        missing = [r for r in roles if actors.get(r) is None]
+        if missing:
+            raise CommandError(f"No user found for role(s): {', '.join(missing)}. Run seed_data first.")
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            for role in roles:
+                client = Client()
+                client.force_login(actors[role]['user'])
+                for name, url in self.urls(actors[role]['ids']):
+                    if only and name not in only:
+                        continue
+                    result = results[f"{role} {name}"] = self.measure(
+                        client, url, options['iterations'], options['warmup']
+                    )
+                    self.stderr.write(f"  {role:8} {name:36} p50={result['p50_ms']}ms queries={result['queries']}")
+
+        report = {'iterations': options['iterations'], 'endpoints': results}
+        if options['compare']:
+            with open(options['compare']) as fh:
+                report['comparison'] = self.compare(json.load(fh)['endpoints'], results)
+        output = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w') as fh:
+                fh.write(output)
+        else:
+            self.stdout.write(output)
+
+    def actors(self):
+        """One user per role plus ids that role is allowed to look at."""
+        actors = {}
+        patient = Patient.objects.select_related('user').filter(appointment__isnull=False).first()
+        if patient:
+            appointment = patient.appointment_set.order_by('id').first()
+            report = patient.reports.order_by('id').first()
+            actors['patient'] = {'user': patient.user, 'ids': {
+                'patient_id': patient.id, 'appointment_id': appointment.id,
+                'report_id': report.id if report else 0,
+            }}
+        doctor = MedicalProfessional.objects.select_related('user').filter(patients__isnull=False).first()
+        if doctor:
+            report = Report.objects.filter(medical_professional=doctor).order_by('id').first()
+            actors['doctor'] = {'user': doctor.user, 'ids': {
+                'patient_id': doctor.patients.order_by('id').values_list('id', flat=True).first(),
+                'doctor_id': doctor.id, 'report_id': report.id if report else 0,
+                'appointment_id': doctor.appointment_set.order_by('id').values_list('id', flat=True).first() or 0,
+            }}
+        admin = HealthcareFacilityAdministrator.objects.select_related('user').first()
+        if admin:
+            actors['admin'] = {'user': admin.user, 'ids': {
+                'patient_id': Patient.objects.order_by('id').values_list('id', flat=True).first() or 0,
+                'doctor_id': MedicalProfessional.objects.order_by('id').values_list('id', flat=True).first() or 0,
+                'appointment_id': Appointment.objects.order_by('id').values_list('id', flat=True).first() or 0,
+                'report_id': Report.objects.order_by('id').values_list('id', flat=True).first() or 0,
+            }}
+        return actors
+
+    def urls(self, ids):
+        """(name, path) for every named top-level pattern, with ids filled in."""
+        seen = set()
+        for pattern in get_resolver().url_patterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            if pattern.name in SKIPPED or pattern.name in seen:
+                continue
+            seen.add(pattern.name)
+            kwargs = {key: ids.get(key) or 0 for key in pattern.pattern.converters}
+            yield pattern.name, reverse(pattern.name, kwargs=kwargs)
+
+    def measure(self, client, url, iterations, warmup):
+        for _ in range(warmup):
+            client.get(url)
+
+        latencies, queries, statuses = [], [], set()
+        for _ in range(iterations):
+            with collect_metrics() as metrics:
+                start = time.perf_counter()
+                response = client.get(url)
+                latencies.append((time.perf_counter() - start) * 1000)
+            queries.append(metrics.queries)
+            statuses.add(response.status_code)
+        breakdown = metrics.as_dict()
+
+        # tracemalloc slows everything down, so peak memory gets its own request.
+        tracemalloc.start()
+        try:
+            client.get(url)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        latencies.sort()
+        return {
+            'url': url,
+            'status': sorted(statuses),
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'queries': max(queries),
+            'peak_kb': round(peak / 1024, 1),
+            # Where render time went on the last iteration (template self time, block inclusive)
+            'templates': breakdown['templates'],
+            'blocks': breakdown['blocks'],
+        }
+
+    def compare(self, baseline, current):
+        diff = {}
+        for key, now in current.items():
+            before = baseline.get(key)
+            if not before:
+                continue
+            diff[key] = {
+                metric: round(now[metric] - before[metric], 2)
+                for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'queries', 'peak_kb')
+            }
+        return diff
@@ -0,0 +1,32 @@
+# dashboard/management/commands/export_records.py
+import sys
+
+from django.core.management.base import BaseCommand
+
+from dashboard import exports
+
+
+class Command(BaseCommand):
+    help = ("Stream patient records (demographics, appointments, prescriptions, reports and test "
+            "results) as CSV or NDJSON, for one patient or the whole facility.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patient', type=int, help="Only export this patient's record.")
+        parser.add_argument('--format', choices=list(exports.FORMATS), default='ndjson')
+        parser.add_argument('--types', help="Comma-separated record types, e.g. appointment,report.")
+        parser.add_argument('--output', help="Write to this file instead of stdout.")
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        serialize = exports.FORMATS[options['format']][0]
+        record_types = set(options['types'].split(',')) if options['types'] else None
+        records = exports.iter_records(
+            patient_id=options['patient'], record_types=record_types, chunk_size=options['chunk_size']
+        )
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            for chunk in serialize(records):
+                out.write(chunk)
+        finally:
+            if out is not sys.stdout:
+                out.close()
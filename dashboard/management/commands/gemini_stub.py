@@ -0,0 +1,85 @@
+# dashboard/management/commands/gemini_stub.py
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+
+
+def make_handler(latency=0.0, failure_rate=0.0):
+    """Request handler that answers like Gemini's generateContent endpoint."""
+    class GeminiStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+            if latency:
+                time.sleep(latency)
+            if failure_rate and random.random() < failure_rate:
+                self._send(503, {'error': {'code': 503, 'message': 'stub failure'}})
+                return
+            prompt = body.get('contents', [{}])[0].get('parts', [{}])[0].get('text', '')
+            text = f"Stub description for prompt: {prompt}"
+            self._send(200, {'candidates': [{'content': {'parts': [{'text': text}]}}]})
+
+        def _send(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return GeminiStubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The default listen backlog (5) resets connections under benchmark concurrency.
+    request_queue_size = 1024
+
+
+def make_server(host='127.0.0.1', port=0, latency=0.0, failure_rate=0.0, backlog=None):
+    """
+    Build (but do not start) a stub server; ``port=0`` picks a free port.
+    ``backlog`` should be at least the number of concurrent clients.
+    """
+    server = StubServer((host, port), make_handler(latency, failure_rate), bind_and_activate=False)
+    if backlog:
+        server.request_queue_size = max(backlog, StubServer.request_queue_size)
+    try:
+        server.server_bind()
+        server.server_activate()
+    except Exception:
+        server.server_close()
+        raise
+    return server
+
+
+class Command(BaseCommand):
+    help = ("Run a local stand-in for the Gemini generateContent API. "
+            "Point GEMINI_API_URL at it to exercise GeminiClient offline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help="Seconds to wait before answering each request.")
+        parser.add_argument('--failure-rate', type=float, default=0.0,
+                            help="Fraction of requests answered with HTTP 503.")
+
+    def handle(self, *args, **options):
+        server = make_server(options['host'], options['port'], options['latency'], options['failure_rate'])
+        host, port = server.server_address[:2]
+        self.stdout.write(f"Gemini stub listening on http://{host}:{port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
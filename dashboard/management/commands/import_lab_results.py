@@ -0,0 +1,52 @@
+# dashboard/management/commands/import_lab_results.py
+import csv
+import sys
+
+from django.core.management.base import BaseCommand
+
+from dashboard.analytes import LabFeedImporter
+from dashboard.importers import detect_format
+
+
+class Command(BaseCommand):
+    help = ("Stream a lab feed from a CSV or JSON Lines file into TestResult and Measurement rows in batches. "
+            "One row per measurement. Columns: patient, test_date, code, value, unit, reference_low, "
+            "reference_high, doctor, accession, description. Rows sharing a patient and accession form one "
+            "test result.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--errors', help="Write rejected rows (line, message) to this CSV file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(['line', 'error'])
+
+        def on_error(line_number, message):
+            if error_writer:
+                error_writer.writerow([line_number, message])
+
+        def on_progress(result):
+            self.stderr.write(f"  imported {result.created}, rejected {result.failed}")
+
+        importer = LabFeedImporter(batch_size=options['batch_size'], on_error=on_error, on_progress=on_progress)
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = importer.run(stream, fmt)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if error_file:
+                error_file.close()
+
+        for line_number, message in result.errors[:10]:
+            self.stderr.write(f"  line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} measurements; rejected {result.failed} rows."))
@@ -0,0 +1,57 @@
+# dashboard/management/commands/import_patients.py
+import csv
+import sys
+
+from django.core.management.base import BaseCommand
+
+from dashboard.importers import PatientImporter, detect_format
+
+
+class Command(BaseCommand):
+    help = ("Stream patients from a CSV or JSON Lines file into User/Patient rows in batches. "
+            "Columns: username, email, first_name, last_name, password, date_of_birth, address, phone_number.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or - for stdin.")
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help="Defaults to the file extension.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--hash-passwords', action='store_true',
+                            help="Hash the password column instead of setting unusable passwords.")
+        parser.add_argument('--workers', type=int, default=4, help="Password hashing threads.")
+        parser.add_argument('--errors', help="Write rejected rows (line, message) to this CSV file.")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+
+        error_file = open(options['errors'], 'w', newline='') if options['errors'] else None
+        error_writer = csv.writer(error_file) if error_file else None
+        if error_writer:
+            error_writer.writerow(['line', 'error'])
+
+        def on_error(line_number, message):
+            if error_writer:
+                error_writer.writerow([line_number, message])
+
+        def on_progress(result):
+            self.stderr.write(f"  created {result.created}, rejected {result.failed}")
+
+        importer = PatientImporter(
+            batch_size=options['batch_size'],
+            hash_passwords=options['hash_passwords'],
+            hash_workers=options['workers'],
+            on_error=on_error,
+            on_progress=on_progress,
+        )
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8-sig')
+        try:
+            result = importer.run(stream, fmt)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if error_file:
+                error_file.close()
+
+        for line_number, message in result.errors[:10]:
+            self.stderr.write(f"  line {line_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(f"Imported {result.created} patients; rejected {result.failed} rows."))
@@ -0,0 +1,37 @@
+# dashboard/management/commands/purge_deleted.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from dashboard import deletion
+
+
+class Command(BaseCommand):
+    help = ("Purge the records of soft-deleted patients and doctors in batches. Safe to interrupt "
+            "and re-run; each run continues where the last one stopped.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', choices=sorted(deletion.PROFILE_MODELS), help="Only this role.")
+        parser.add_argument('--older-than', type=int, default=0, metavar='MINUTES',
+                            help="Only profiles soft-deleted at least this long ago.")
+        parser.add_argument('--batch-size', type=int, default=deletion.DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(minutes=options['older_than'])
+        purged = 0
+        for role, model in deletion.PROFILE_MODELS.items():
+            if options['role'] and role != options['role']:
+                continue
+            ids = model.all_objects.filter(deleted_at__lte=cutoff).values_list('id', flat=True)
+            for profile_id in list(ids):
+                self.stderr.write(f"Purging {role} {profile_id}")
+                result = deletion.purge(role, profile_id, batch_size=options['batch_size'],
+                                        on_progress=self.report)
+                self.stderr.write(f"  done: {result['deleted']}")
+                purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} profiles."))
+
+    def report(self, progress):
+        if not progress['done']:
+            self.stderr.write(f"  {progress['step']}: {progress['deleted'].get(progress['step'], 0)}")
@@ -0,0 +1,21 @@
+# dashboard/management/commands/rebuild_analyte_series.py
+from django.core.management.base import BaseCommand
+
+from dashboard import analytes
+
+
+class Command(BaseCommand):
+    help = ("Recompute every patient's packed analyte series from their measurements. "
+            "With --from-text, first create measurements from the result_data of test results that have none.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--from-text', action='store_true',
+                            help="Parse 'Name: value unit' lines of legacy test results into measurements.")
+
+    def handle(self, *args, **options):
+        if options['from_text']:
+            created = analytes.extract_from_text(batch_size=options['batch_size'])
+            self.stdout.write(f"Created {created} measurements from result text.")
+        series = analytes.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {series} analyte series."))
@@ -0,0 +1,16 @@
+# dashboard/management/commands/rebuild_rosters.py
+from django.core.management.base import BaseCommand
+
+from dashboard import roster
+
+
+class Command(BaseCommand):
+    help = ("Recompute every doctor's patient roster from assignments and appointments. "
+            "Needed after bulk loads that skip model signals.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        entries = roster.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {entries} roster entries."))
@@ -0,0 +1,16 @@
+# dashboard/management/commands/rebuild_schedules.py
+from django.core.management.base import BaseCommand
+
+from dashboard import schedule
+
+
+class Command(BaseCommand):
+    help = ("Recompute every doctor's schedule bitmaps from their appointments. "
+            "Needed after bulk loads that skip model signals, or after changing SCHEDULE_SLOT_MINUTES.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        days = schedule.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {days} doctor-day schedules."))
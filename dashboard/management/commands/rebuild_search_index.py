@@ -0,0 +1,16 @@
+# dashboard/management/commands/rebuild_search_index.py
+from django.core.management.base import BaseCommand
+
+from dashboard import search
+
+
+class Command(BaseCommand):
+    help = ("Rebuild the report and test result search index from scratch. Needed after "
+            "bulk loads that skip model signals.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        documents = search.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {documents} documents."))
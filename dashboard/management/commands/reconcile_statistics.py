@@ -0,0 +1,12 @@
+# dashboard/management/commands/reconcile_statistics.py
+from django.core.management.base import BaseCommand
+
+from dashboard import statistics
+
+
+class Command(BaseCommand):
+    help = "Rebuild the admin dashboard counters from the source tables."
+
+    def handle(self, *args, **options):
+        written = statistics.reconcile()
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {written} counters."))
@@ -0,0 +1,52 @@
+# dashboard/management/commands/run_jobs.py
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard import jobs
+
+
+class Command(BaseCommand):
+    help = ("Run background jobs from the database queue with a pool of worker threads. "
+            "Stops cleanly on SIGINT/SIGTERM after the jobs in progress finish.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help="Seconds an idle worker waits before checking the queue again.")
+        parser.add_argument('--burst', action='store_true', help="Exit once the queue is empty.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        requeued = jobs.requeue_stale()
+        if requeued:
+            self.stderr.write(f"  requeued {requeued} stale jobs")
+
+        def work(index):
+            try:
+                jobs.Worker().run(stop, poll_interval=options['poll_interval'], burst=options['burst'])
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=work, args=(i,), name=f"job-worker-{i}", daemon=True)
+                   for i in range(options['workers'])]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"Started {len(threads)} job workers.")
+
+        # The main thread reclaims jobs from workers that died elsewhere, once a minute.
+        idle = 0.0
+        while any(thread.is_alive() for thread in threads) and not stop.wait(options['poll_interval']):
+            idle += options['poll_interval']
+            if idle >= 60:
+                idle = 0.0
+                jobs.requeue_stale()
+        for thread in threads:
+            thread.join()
+        connections.close_all()
+        self.stdout.write(self.style.SUCCESS("Job workers stopped."))
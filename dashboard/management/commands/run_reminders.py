@@ -0,0 +1,37 @@
+# dashboard/management/commands/run_reminders.py
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from dashboard import reminders
+
+
+class Command(BaseCommand):
+    help = ("Send appointment reminders as they fall due. Several processes may run at once; "
+            "each reminder is claimed by only one. Stops cleanly on SIGINT/SIGTERM.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--poll-interval', type=float, default=30.0,
+                            help="Seconds between scans of the reminder index for newly due reminders.")
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--backfill', action='store_true',
+                            help="First create missing reminders for upcoming appointments.")
+        parser.add_argument('--burst', action='store_true', help="Exit once nothing is due.")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stop.set())
+
+        if options['backfill']:
+            self.stdout.write(f"Scheduled {reminders.backfill()} missing reminders.")
+
+        scheduler = reminders.Scheduler(batch_size=options['batch_size'])
+        self.stdout.write(f"Reminder scheduler {scheduler.name} started.")
+        try:
+            scheduler.run(stop, poll_interval=options['poll_interval'], burst=options['burst'])
+        finally:
+            connections.close_all()
+        self.stdout.write(self.style.SUCCESS("Reminder scheduler stopped."))
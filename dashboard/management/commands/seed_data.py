@@ -0,0 +1,158 @@
+# dashboard/management/commands/seed_data.py
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard import analytes, reminders, roster, schedule, search, statistics
+from dashboard.factories import UserProfileFactory
+from dashboard.models import (
+    Appointment, MedicalProfessionalPatient, Prescription, Report, TestResult,
+)
+
+SPECIALIZATIONS = ['Cardiology', 'Dermatology', 'Endocrinology', 'Family Medicine', 'Neurology',
+                   'Oncology', 'Pediatrics', 'Psychiatry']
+MEDICATIONS = ['Metformin', 'Lisinopril', 'Atorvastatin', 'Amoxicillin', 'Levothyroxine',
+               'Omeprazole', 'Amlodipine', 'Sertraline', 'Ibuprofen', 'Albuterol']
+TESTS = ['HbA1c', 'Creatinine', 'LDL cholesterol', 'TSH', 'Hemoglobin', 'Potassium']
+
+
+def chunks(n, size):
+    for start in range(0, n, size):
+        yield range(start, min(start + size, n))
+
+
+class Command(BaseCommand):
+    help = ("Seed a large synthetic dataset with bulk_create: users and role profiles, "
+            "doctor-patient rosters, appointments, prescriptions, reports and test results. "
+            "Every seeded user gets the same password, so benchmarks can log in as any role.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--patients', type=int, default=10000)
+        parser.add_argument('--doctors', type=int, default=200)
+        parser.add_argument('--admins', type=int, default=5)
+        parser.add_argument('--appointments', type=int, default=8, help="Per patient.")
+        parser.add_argument('--prescriptions', type=int, default=3, help="Per patient.")
+        parser.add_argument('--reports', type=int, default=2, help="Per patient.")
+        parser.add_argument('--test-results', type=int, default=4, help="Per patient.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--prefix', default='seed', help="Username prefix; must be unused.")
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--random-seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['random_seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = options['prefix']
+        self.factory = UserProfileFactory()
+        # Hash once and share it; hashing per user would dominate the run.
+        self.password = make_password(options['password'])
+        self.now = timezone.now()
+
+        if User.objects.filter(username__startswith=f"{self.prefix}_").exists():
+            self.stderr.write(f"Users with prefix '{self.prefix}_' already exist; pick another --prefix.")
+            return
+
+        doctor_ids = self.seed_role('doctor', options['doctors'], lambda i: {
+            'specialization': SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+            'phone_number': f"555{i:07d}",
+        })
+        self.seed_role('admin', options['admins'], lambda i: {
+            'facility_name': f"Facility {i % 3 + 1}",
+        })
+        patient_ids = self.seed_role('patient', options['patients'], lambda i: {
+            'date_of_birth': (self.now - timedelta(days=self.rng.randint(365, 90 * 365))).date(),
+            'address': f"{self.rng.randint(1, 9999)} Main St",
+            'phone_number': f"556{i:07d}",
+        })
+        if doctor_ids and patient_ids:
+            self.seed_clinical(patient_ids, doctor_ids, options)
+
+        # bulk_create skips signals, so rebuild rosters, schedules, reminders, measurements, the search
+        # index and counters afterwards.
+        roster.rebuild(batch_size=self.batch_size)
+        schedule.rebuild(batch_size=self.batch_size)
+        reminders.backfill(batch_size=self.batch_size)
+        analytes.extract_from_text(batch_size=self.batch_size)
+        search.rebuild(batch_size=self.batch_size)
+        written = statistics.reconcile()
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(patient_ids)} patients, {len(doctor_ids)} doctors; reconciled {written} counters."
+        ))
+
+    def seed_role(self, role, count, extra):
+        """bulk_create ``count`` users plus their profiles via UserProfileFactory."""
+        model = self.factory.model_for(role)
+        profile_ids = []
+        for batch in chunks(count, self.batch_size):
+            with transaction.atomic():
+                users = [
+                    User(username=f"{self.prefix}_{role}_{i}", email=f"{self.prefix}_{role}_{i}@example.com",
+                         first_name=role.capitalize(), last_name=str(i), password=self.password)
+                    for i in batch
+                ]
+                User.objects.bulk_create(users)
+                # Not every backend returns primary keys from bulk_create, so re-read them.
+                by_name = User.objects.in_bulk([u.username for u in users], field_name='username')
+                profiles = [self.factory.build(by_name[u.username], role, **extra(i)) for i, u in zip(batch, users)]
+                model.objects.bulk_create(profiles)
+                profile_ids.extend(model.objects.filter(
+                    user__username__in=[u.username for u in users]
+                ).values_list('id', flat=True))
+            self.stdout.write(f"  {role}s: {len(profile_ids)}/{count}")
+        return profile_ids
+
+    def random_slot(self):
+        # Weekday clinic hours on a 15-minute grid, six months either side of now.
+        day = self.now + timedelta(days=self.rng.randint(-180, 180))
+        while day.weekday() >= 5:
+            day += timedelta(days=1)
+        return day.replace(hour=self.rng.randint(9, 16), minute=self.rng.choice((0, 15, 30, 45)),
+                           second=0, microsecond=0)
+
+    def seed_clinical(self, patient_ids, doctor_ids, options):
+        # Appointments are random and may overlap; that is fine for load testing.
+        for n, batch in enumerate(chunks(len(patient_ids), self.batch_size)):
+            roster, appointments, prescriptions, reports, results = [], [], [], [], []
+            for idx in batch:
+                patient_id = patient_ids[idx]
+                doctors = self.rng.sample(doctor_ids, k=min(2, len(doctor_ids)))
+                roster.extend(MedicalProfessionalPatient(medical_professional_id=d, patient_id=patient_id)
+                              for d in doctors)
+                for _ in range(options['appointments']):
+                    start = self.random_slot()
+                    duration = self.rng.choice((15, 30, 45, 60))
+                    appointments.append(Appointment(
+                        patient_id=patient_id, medical_professional_id=self.rng.choice(doctors),
+                        appointment_date=start, duration_minutes=duration,
+                        appointment_end=start + timedelta(minutes=duration), reason="Routine visit",
+                    ))
+                for _ in range(options['prescriptions']):
+                    medication = self.rng.choice(MEDICATIONS)
+                    prescriptions.append(Prescription(
+                        patient_id=patient_id, medical_professional_id=self.rng.choice(doctors),
+                        medication_name=medication, description=f"{medication} as directed.",
+                    ))
+                for _ in range(options['reports']):
+                    reports.append(Report(
+                        patient_id=patient_id, medical_professional_id=self.rng.choice(doctors),
+                        title="Follow-up note", summary="Patient stable; continue current plan.",
+                    ))
+                for _ in range(options['test_results']):
+                    test = self.rng.choice(TESTS)
+                    results.append(TestResult(
+                        patient_id=patient_id, medical_professional_id=self.rng.choice(doctors),
+                        test_date=self.now - timedelta(days=self.rng.randint(0, 365)),
+                        description=test, result_data=f"{test}: {self.rng.uniform(0.5, 12):.1f}",
+                    ))
+            with transaction.atomic():
+                MedicalProfessionalPatient.objects.bulk_create(roster, ignore_conflicts=True)
+                Appointment.objects.bulk_create(appointments, batch_size=self.batch_size)
+                Prescription.objects.bulk_create(prescriptions, batch_size=self.batch_size)
+                Report.objects.bulk_create(reports, batch_size=self.batch_size)
+                TestResult.objects.bulk_create(results, batch_size=self.batch_size)
+            self.stdout.write(f"  clinical records: batch {n + 1} done")
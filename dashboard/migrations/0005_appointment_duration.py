@@ -0,0 +1,51 @@
+from datetime import timedelta
+
+import django.core.validators
+from django.db import migrations, models
+
+
+def fill_appointment_end(apps, schema_editor):
+    Appointment = apps.get_model('dashboard', 'Appointment')
+    batch = []
+    for appointment in Appointment.objects.only('id', 'appointment_date', 'duration_minutes').iterator(chunk_size=2000):
+        appointment.appointment_end = appointment.appointment_date + timedelta(minutes=appointment.duration_minutes)
+        batch.append(appointment)
+        if len(batch) >= 2000:
+            Appointment.objects.bulk_update(batch, ['appointment_end'])
+            batch = []
+    if batch:
+        Appointment.objects.bulk_update(batch, ['appointment_end'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_geocoding_cache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(480)]),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='appointment_end',
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_appointment_end, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='appointment',
+            name='appointment_end',
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['medical_professional', 'appointment_date'], name='appointment_doctor_start_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_start_idx'),
+        ),
+    ]
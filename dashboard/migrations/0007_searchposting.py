@@ -0,0 +1,29 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0006_statistic'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('doc_type', models.CharField(max_length=16)),
+                ('doc_id', models.BigIntegerField()),
+                ('patient_id', models.BigIntegerField(null=True)),
+                ('medical_professional_id', models.BigIntegerField(null=True)),
+                ('frequency', models.PositiveIntegerField()),
+            ],
+            options={
+                'indexes': [
+                    models.Index(fields=['term', 'patient_id'], name='searchposting_term_patient_idx'),
+                    models.Index(fields=['doc_type', 'doc_id'], name='searchposting_doc_idx'),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_rosters(apps, schema_editor):
+    RosterEntry = apps.get_model('dashboard', 'RosterEntry')
+    MedicalProfessionalPatient = apps.get_model('dashboard', 'MedicalProfessionalPatient')
+    Appointment = apps.get_model('dashboard', 'Appointment')
+
+    entries = {}
+    for doctor_id, patient_id in MedicalProfessionalPatient.objects.values_list(
+            'medical_professional_id', 'patient_id').iterator(chunk_size=2000):
+        entries[doctor_id, patient_id] = RosterEntry(
+            medical_professional_id=doctor_id, patient_id=patient_id, assigned=True)
+    shared = Appointment.objects.values('medical_professional_id', 'patient_id').annotate(n=Count('id'))
+    for row in shared.iterator(chunk_size=2000):
+        key = row['medical_professional_id'], row['patient_id']
+        entry = entries.setdefault(key, RosterEntry(medical_professional_id=key[0], patient_id=key[1]))
+        entry.appointment_count = row['n']
+    RosterEntry.objects.bulk_create(entries.values(), batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0008_timeline_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assigned', models.BooleanField(default=False)),
+                ('appointment_count', models.PositiveIntegerField(default=0)),
+                ('medical_professional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                           related_name='roster_entries',
+                                                           to='dashboard.medicalprofessional')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='roster_entries', to='dashboard.patient')),
+            ],
+            options={
+                'unique_together': {('medical_professional', 'patient')},
+            },
+        ),
+        migrations.RunPython(build_rosters, migrations.RunPython.noop),
+    ]
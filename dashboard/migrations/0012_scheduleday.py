@@ -0,0 +1,42 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_schedules(apps, schema_editor):
+    from dashboard.schedule import bitmaps, encode
+
+    ScheduleDay = apps.get_model('dashboard', 'ScheduleDay')
+    Appointment = apps.get_model('dashboard', 'Appointment')
+
+    rows = Appointment.objects.values_list('medical_professional_id', 'appointment_date', 'appointment_end')
+    maps = bitmaps(rows.iterator(chunk_size=2000))
+    ScheduleDay.objects.bulk_create(
+        [ScheduleDay(medical_professional_id=doctor_id, day=day, busy=encode(bits))
+         for (doctor_id, day), bits in maps.items()],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0011_soft_delete'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('busy', models.BinaryField()),
+                ('medical_professional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                           related_name='schedule_days',
+                                                           to='dashboard.medicalprofessional')),
+            ],
+            options={
+                'unique_together': {('medical_professional', 'day')},
+            },
+        ),
+        migrations.RunPython(build_schedules, migrations.RunPython.noop),
+    ]
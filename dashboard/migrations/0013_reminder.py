@@ -0,0 +1,59 @@
+import django.db.models.deletion
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copy of reminders.DEFAULT_LEAD_MINUTES, so the backfill does not change with app code.
+LEAD_MINUTES = (24 * 60, 60)
+
+
+def schedule_reminders(apps, schema_editor):
+    Reminder = apps.get_model('dashboard', 'Reminder')
+    Appointment = apps.get_model('dashboard', 'Appointment')
+
+    leads = tuple(getattr(settings, 'REMINDER_LEAD_MINUTES', LEAD_MINUTES))
+    now = timezone.now()
+    pending = []
+    for appointment_id, start in Appointment.objects.filter(appointment_date__gt=now).values_list(
+            'id', 'appointment_date').iterator(chunk_size=2000):
+        pending.extend(
+            Reminder(appointment_id=appointment_id, lead_minutes=lead, due_at=start - timedelta(minutes=lead))
+            for lead in leads if start - timedelta(minutes=lead) > now
+        )
+    Reminder.objects.bulk_create(pending, batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0012_scheduleday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Reminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lead_minutes', models.PositiveIntegerField()),
+                ('due_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sending', 'Sending'),
+                                                     ('sent', 'Sent'), ('failed', 'Failed'),
+                                                     ('skipped', 'Skipped')],
+                                            default='pending', max_length=10)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('locked_by', models.CharField(blank=True, max_length=150)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+                ('error', models.TextField(blank=True)),
+                ('appointment', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                  related_name='reminders', to='dashboard.appointment')),
+            ],
+            options={
+                'unique_together': {('appointment', 'lead_minutes')},
+                'indexes': [models.Index(fields=['status', 'due_at'], name='reminder_due_idx')],
+            },
+        ),
+        migrations.RunPython(schedule_reminders, migrations.RunPython.noop),
+    ]
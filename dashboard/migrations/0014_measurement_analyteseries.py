@@ -0,0 +1,50 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0013_reminder'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Measurement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('observed_at', models.DateTimeField()),
+                ('code', models.CharField(max_length=32)),
+                ('value', models.FloatField()),
+                ('unit', models.CharField(blank=True, max_length=32)),
+                ('reference_low', models.FloatField(blank=True, null=True)),
+                ('reference_high', models.FloatField(blank=True, null=True)),
+                ('test_result', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                                  related_name='measurements', to='dashboard.testresult')),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='measurements', to='dashboard.patient')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['patient', 'code', 'observed_at'], name='measurement_series_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AnalyteSeries',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=32)),
+                ('unit', models.CharField(blank=True, max_length=32)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('times', models.BinaryField()),
+                ('values', models.BinaryField()),
+                ('lows', models.BinaryField()),
+                ('highs', models.BinaryField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                              related_name='analyte_series', to='dashboard.patient')),
+            ],
+            options={
+                'unique_together': {('patient', 'code')},
+            },
+        ),
+    ]
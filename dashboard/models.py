@@ -1,5 +1,10 @@
+from datetime import timedelta
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.validators import MinValueValidator, MaxValueValidator
+
+# Longest bookable appointment. Overlap queries use it to bound their index range scan.
+MAX_APPOINTMENT_MINUTES = 8 * 60
 
 class Report(models.Model):
     title = models.CharField(max_length=255)
@@ -10,6 +15,14 @@ class Report(models.Model):
     medical_professional = models.ForeignKey('MedicalProfessional', on_delete=models.CASCADE,
                                              related_name='authored_reports', null=True)
 
+    class Meta:
+        indexes = [
+            # Supports keyset pagination ordered by (date, id)
+            models.Index(fields=['date', 'id'], name='report_date_id_idx'),
+            # Per-patient timeline, newest first
+            models.Index(fields=['patient', 'date', 'id'], name='report_patient_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -26,11 +39,21 @@ class MedicalProfessionalPatient(models.Model):
     def __str__(self):
         return f"{self.medical_professional} - {self.patient}"
 
+class ActiveProfileManager(models.Manager):
+    # Hides soft-deleted profiles; use all_objects to include them (see dashboard/deletion.py)
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
 class Patient(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     date_of_birth = models.DateField(null=True, blank=True)
     address = models.CharField(max_length=255, blank=True)
     phone_number = models.CharField(max_length=20, blank=True)
+    # Set when soft-deleted; the row and its records are purged in the background
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = ActiveProfileManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} (Patient)"
@@ -43,6 +66,11 @@ class MedicalProfessional(models.Model):
     patients = models.ManyToManyField('Patient', blank=True,
                                       related_name='assigned_doctors',
                                       through='MedicalProfessionalPatient')
+    # Set when soft-deleted; the row and its records are purged in the background
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = ActiveProfileManager()
+    all_objects = models.Manager()
 
     def __str__(self):
         return f"{self.user.first_name} {self.user.last_name} (Doctor)"
@@ -59,8 +87,30 @@ class Appointment(models.Model):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE)
     medical_professional = models.ForeignKey(MedicalProfessional, on_delete=models.CASCADE)
     appointment_date = models.DateTimeField()
+    duration_minutes = models.PositiveIntegerField(
+        default=30, validators=[MinValueValidator(5), MaxValueValidator(MAX_APPOINTMENT_MINUTES)]
+    )
+    # Denormalized appointment_date + duration, kept in sync by save(), so overlap
+    # checks are plain range comparisons. Set it yourself when using bulk_create/update().
+    appointment_end = models.DateTimeField(editable=False)
     reason = models.TextField()
 
+    class Meta:
+        indexes = [
+            # Supports keyset pagination ordered by (appointment_date, id)
+            models.Index(fields=['appointment_date', 'id'], name='appointment_date_id_idx'),
+            # Per-doctor / per-patient range scans for the availability engine
+            models.Index(fields=['medical_professional', 'appointment_date'], name='appointment_doctor_start_idx'),
+            models.Index(fields=['patient', 'appointment_date'], name='appointment_patient_start_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.appointment_end = self.appointment_date + timedelta(minutes=self.duration_minutes)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'appointment_date', 'duration_minutes'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {'appointment_end'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"Appointment on {self.appointment_date} for {self.patient}"
 
@@ -71,6 +121,10 @@ class TestResult(models.Model):
     description = models.TextField()
     result_data = models.TextField()
 
+    class Meta:
+        # Per-patient timeline, newest first
+        indexes = [models.Index(fields=['patient', 'test_date', 'id'], name='testresult_patient_date_idx')]
+
     def __str__(self):
         return f"TestResult for {self.patient} on {self.test_date}"
 
@@ -81,5 +135,191 @@ class Prescription(models.Model):
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Per-patient timeline, newest first
+        indexes = [models.Index(fields=['patient', 'created_at', 'id'], name='prescription_patient_date_idx')]
+
     def __str__(self):
         return f"Prescription for {self.patient} - {self.medication_name}"
+
+class MedicationDescription(models.Model):
+    # Persistent tier of the Gemini description cache, keyed on the normalized name
+    normalized_name = models.CharField(max_length=255, unique=True)
+    description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.normalized_name
+
+class GeocodedAddress(models.Model):
+    # Server-side geocode cache; latitude/longitude are null when the address wasn't found
+    normalized_address = models.CharField(max_length=255, unique=True)
+    latitude = models.FloatField(null=True)
+    longitude = models.FloatField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.normalized_address
+
+class PharmacySearchResult(models.Model):
+    # Cached pharmacy search, keyed by a rounded bounding box
+    bbox_key = models.CharField(max_length=64, unique=True)
+    results = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.bbox_key
+
+class Statistic(models.Model):
+    # Incrementally maintained counter (see dashboard/statistics.py)
+    name = models.CharField(max_length=64, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+class SearchPosting(models.Model):
+    # One row per (term, document) in the report/test-result search index (see dashboard/search.py)
+    term = models.CharField(max_length=64)
+    doc_type = models.CharField(max_length=16)
+    doc_id = models.BigIntegerField()
+    # Denormalized so searches can be permission-filtered without joins
+    patient_id = models.BigIntegerField(null=True)
+    medical_professional_id = models.BigIntegerField(null=True)
+    frequency = models.PositiveIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'patient_id'], name='searchposting_term_patient_idx'),
+            models.Index(fields=['doc_type', 'doc_id'], name='searchposting_doc_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} -> {self.doc_type}:{self.doc_id}"
+
+class RosterEntry(models.Model):
+    # Precomputed doctor-patient roster (see dashboard/roster.py): a patient is on a
+    # doctor's roster while assigned to them or while they share any appointment
+    medical_professional = models.ForeignKey(MedicalProfessional, on_delete=models.CASCADE,
+                                             related_name='roster_entries')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='roster_entries')
+    assigned = models.BooleanField(default=False)
+    appointment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('medical_professional', 'patient')
+
+    def __str__(self):
+        return f"{self.medical_professional_id} -> {self.patient_id}"
+
+class Job(models.Model):
+    # Background job queue row (see dashboard/jobs.py)
+    QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    # Higher runs first
+    priority = models.IntegerField(default=0)
+    run_at = models.DateTimeField()
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    idempotency_key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    # Latest progress report from a running job (jobs.report_progress)
+    progress = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim query: queued jobs that are due, best priority first
+            models.Index(fields=['status', '-priority', 'run_at'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+class ScheduleDay(models.Model):
+    # One doctor's booked slots on one local day, as a bitset (see dashboard/schedule.py)
+    medical_professional = models.ForeignKey(MedicalProfessional, on_delete=models.CASCADE,
+                                             related_name='schedule_days')
+    day = models.DateField()
+    busy = models.BinaryField()
+
+    class Meta:
+        unique_together = ('medical_professional', 'day')
+
+    def __str__(self):
+        return f"{self.medical_professional_id} on {self.day}"
+
+class Reminder(models.Model):
+    # One upcoming-appointment reminder per lead time (see dashboard/reminders.py)
+    PENDING, SENDING, SENT, FAILED, SKIPPED = 'pending', 'sending', 'sent', 'failed', 'skipped'
+    STATUS_CHOICES = [(PENDING, 'Pending'), (SENDING, 'Sending'), (SENT, 'Sent'), (FAILED, 'Failed'),
+                      (SKIPPED, 'Skipped')]
+
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='reminders')
+    lead_minutes = models.PositiveIntegerField()
+    due_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Claim token of the scheduler sending it
+    locked_by = models.CharField(max_length=150, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        unique_together = ('appointment', 'lead_minutes')
+        indexes = [
+            # Scheduler scan: pending reminders in due order
+            models.Index(fields=['status', 'due_at'], name='reminder_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"Reminder {self.lead_minutes}m before appointment {self.appointment_id} ({self.status})"
+
+class Measurement(models.Model):
+    # One numeric analyte value from a test result (see dashboard/analytes.py)
+    test_result = models.ForeignKey(TestResult, on_delete=models.CASCADE, related_name='measurements')
+    # Copied from the test result so a series is one index range scan
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='measurements')
+    observed_at = models.DateTimeField()
+    # Lab test code, e.g. 'HBA1C' or a LOINC code; stored upper-case
+    code = models.CharField(max_length=32)
+    value = models.FloatField()
+    unit = models.CharField(max_length=32, blank=True)
+    reference_low = models.FloatField(null=True, blank=True)
+    reference_high = models.FloatField(null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['patient', 'code', 'observed_at'], name='measurement_series_idx')]
+
+    def __str__(self):
+        return f"{self.code} = {self.value} {self.unit}".strip()
+
+class AnalyteSeries(models.Model):
+    # A patient's measurements of one analyte, packed column by column in time order
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='analyte_series')
+    code = models.CharField(max_length=32)
+    unit = models.CharField(max_length=32, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    # Little-endian int64 epoch seconds and float64 values; NaN where a range bound is missing
+    times = models.BinaryField()
+    values = models.BinaryField()
+    lows = models.BinaryField()
+    highs = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('patient', 'code')
+
+    def __str__(self):
+        return f"{self.code} series for patient {self.patient_id} ({self.count} points)"
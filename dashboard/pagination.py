@@ -0,0 +1,159 @@
+# dashboard/pagination.py
+import base64
+import binascii
+import json
+from functools import reduce
+import operator
+
+from django.conf import settings
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def get_page_size(request):
+    """
+    Page size for a list view: ``?page_size=`` if given, otherwise
+    ``settings.ADMIN_LIST_PAGE_SIZE``, capped at ``settings.ADMIN_LIST_MAX_PAGE_SIZE``.
+    """
+    default = getattr(settings, 'ADMIN_LIST_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+    maximum = getattr(settings, 'ADMIN_LIST_MAX_PAGE_SIZE', MAX_PAGE_SIZE)
+    try:
+        size = int(request.GET.get('page_size', default))
+    except (TypeError, ValueError):
+        size = default
+    return max(1, min(size, maximum))
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor, previous_cursor, page_size):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.page_size = page_size
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor (keyset) pagination over a queryset with a stable ordering.
+
+    Instead of OFFSET, each page is fetched with a ``WHERE (a, b) > (x, y)``
+    style filter built from the last row of the previous page, so the cost of
+    a page depends only on its size. The ordering must end with a unique field
+    (normally ``id``) so that ties are broken deterministically.
+    """
+    def __init__(self, queryset, ordering, page_size=DEFAULT_PAGE_SIZE):
+        if not ordering:
+            raise ValueError("Keyset pagination needs an explicit ordering.")
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.page_size = page_size
+        self.fields = [name.lstrip('-') for name in self.ordering]
+        self.descending = [name.startswith('-') for name in self.ordering]
+
+    def page(self, cursor=None):
+        direction, values = ('n', None) if not cursor else self.decode_cursor(cursor)
+        backwards = direction == 'p'
+
+        ordering = self.ordering if not backwards else self._reversed_ordering()
+        qs = self.queryset.order_by(*ordering)
+        if values is not None:
+            qs = qs.filter(self._keyset_filter(values, backwards))
+
+        # Fetch one extra row to find out whether there is another page.
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = self.encode_cursor(rows[-1], 'n')
+            if (has_more and backwards) or (values is not None and not backwards):
+                previous_cursor = self.encode_cursor(rows[0], 'p')
+        return KeysetPage(rows, next_cursor, previous_cursor, self.page_size)
+
+    def _reversed_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    def _keyset_filter(self, values, backwards):
+        # (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ... with the comparison flipped
+        # for descending fields and again when walking backwards.
+        clauses = []
+        for i, field in enumerate(self.fields):
+            equal = {f: v for f, v in zip(self.fields[:i], values[:i])}
+            lookup = 'lt' if self.descending[i] != backwards else 'gt'
+            clauses.append(Q(**equal, **{f'{field}__{lookup}': values[i]}))
+        return reduce(operator.or_, clauses)
+
+    def _field_value(self, obj, path):
+        return reduce(getattr, path.split('__'), obj)
+
+    def encode_cursor(self, obj, direction):
+        values = []
+        for path in self.fields:
+            value = self._field_value(obj, path)
+            values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        raw = json.dumps({'d': direction, 'v': values}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            direction, raw_values = data['d'], data['v']
+        except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+            raise InvalidCursor("Malformed pagination cursor.")
+        if direction not in ('n', 'p') or len(raw_values) != len(self.fields):
+            raise InvalidCursor("Malformed pagination cursor.")
+
+        values = []
+        for path, raw in zip(self.fields, raw_values):
+            field = self._resolve_field(path)
+            try:
+                values.append(field.to_python(raw))
+            except Exception:
+                raise InvalidCursor("Malformed pagination cursor.")
+        return direction, values
+
+    def _resolve_field(self, path):
+        model = self.queryset.model
+        parts = path.split('__')
+        for part in parts[:-1]:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(parts[-1])
+
+
+def paginate(request, queryset, ordering):
+    """
+    Convenience wrapper used by the list views: reads ``?cursor=`` and
+    ``?page_size=`` from the request and returns a ``KeysetPage``.
+    An invalid cursor falls back to the first page.
+    """
+    paginator = KeysetPaginator(queryset, ordering, page_size=get_page_size(request))
+    try:
+        return paginator.page(request.GET.get('cursor'))
+    except InvalidCursor:
+        return paginator.page()
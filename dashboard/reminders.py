@@ -0,0 +1,301 @@
+# dashboard/reminders.py
+"""
+Appointment reminders.
+
+Every upcoming appointment gets one ``Reminder`` row per lead time in
+``REMINDER_LEAD_MINUTES`` (default 24 hours and 1 hour), due at the
+appointment time minus the lead. Signals in signals.py create the rows
+when an appointment is booked and move them when it is rescheduled.
+Cancelling an appointment deletes its reminders along with it. Lead times
+that have already passed at booking time are skipped.
+
+The ``run_reminders`` command runs a ``Scheduler``. It never reads the
+appointment table to find work. Instead, each poll loads the pending
+reminders due before the next poll, through the (status, due_at) index,
+into a heap, and the scheduler sleeps until the earliest one is due. Due
+reminders are claimed in batches by one conditional UPDATE that stamps a
+unique claim token, so with several scheduler processes each reminder is
+claimed and sent by exactly one of them.
+
+A process that dies after claiming leaves its reminders ``sending``.
+After ``REMINDER_LEASE_SECONDS`` (default 300) they go back to pending.
+Each send first renews its reminder's lease with an UPDATE conditional on
+the claim token, so a reminder whose lease ran out during a slow batch,
+and was requeued, is left to whichever scheduler claimed it next.
+Delivery backends get the reminder's id as an idempotency key, so a
+backend that deduplicates on it can make that one retry harmless.
+
+Delivery goes through ``REMINDER_BACKEND``:
+
+* ``ConsoleBackend`` (default) writes to stdout;
+* ``FileBackend`` appends JSON lines to ``REMINDER_FILE_PATH``;
+* ``EmailBackend`` uses Django's ``send_mail``.
+"""
+import heapq
+import json
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Appointment, Reminder
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEAD_MINUTES = (24 * 60, 60)
+DEFAULT_LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+RETRY_SECONDS = 60
+
+
+def lead_times():
+    return tuple(getattr(settings, 'REMINDER_LEAD_MINUTES', DEFAULT_LEAD_MINUTES))
+
+
+def schedule(appointment, now=None):
+    """Create or move ``appointment``'s reminders to match its current time."""
+    now = now or timezone.now()
+    existing = {r.lead_minutes: r for r in Reminder.objects.filter(appointment_id=appointment.pk)}
+    for lead in lead_times():
+        due_at = appointment.appointment_date - timedelta(minutes=lead)
+        reminder = existing.get(lead)
+        if due_at <= now:
+            # Too late for this one; drop it if the appointment moved closer.
+            if reminder is not None and reminder.status == Reminder.PENDING:
+                reminder.delete()
+        elif reminder is None:
+            Reminder.objects.get_or_create(appointment_id=appointment.pk, lead_minutes=lead,
+                                           defaults={'due_at': due_at})
+        elif reminder.due_at != due_at:
+            # Rescheduled: remind again for the new time, even if the old one went out.
+            Reminder.objects.filter(pk=reminder.pk).update(
+                due_at=due_at, status=Reminder.PENDING, attempts=0, locked_by='', locked_at=None,
+                sent_at=None, error='',
+            )
+
+
+def backfill(now=None, batch_size=2000):
+    """
+    Create missing reminders for every upcoming appointment, e.g. after bulk
+    loads that skip signals. Reads only future appointments (an index range
+    scan). Returns the number created.
+    """
+    now = now or timezone.now()
+    leads = lead_times()
+    pending = []
+    created = 0
+    for appointment_id, start in Appointment.objects.filter(appointment_date__gt=now).values_list(
+            'id', 'appointment_date').iterator(chunk_size=batch_size):
+        pending.extend(
+            Reminder(appointment_id=appointment_id, lead_minutes=lead, due_at=start - timedelta(minutes=lead))
+            for lead in leads if start - timedelta(minutes=lead) > now
+        )
+        if len(pending) >= batch_size:
+            created += len(Reminder.objects.bulk_create(pending, ignore_conflicts=True))
+            pending = []
+    created += len(Reminder.objects.bulk_create(pending, ignore_conflicts=True))
+    return created
+
+
+# --- Delivery -------------------------------------------------------------
+
+@dataclass
+class ReminderMessage:
+    key: str
+    recipient: str
+    subject: str
+    body: str
+
+
+def message_for(reminder):
+    appointment = reminder.appointment
+    patient, doctor = appointment.patient.user, appointment.medical_professional.user
+    when = timezone.localtime(appointment.appointment_date)
+    return ReminderMessage(
+        key=f"reminder:{reminder.pk}",
+        recipient=patient.email,
+        subject=f"Reminder: appointment on {when:%b %d} at {when:%H:%M}",
+        body=(
+            f"Hello {patient.first_name or patient.username},\n\n"
+            f"This is a reminder of your appointment with Dr. {doctor.first_name} {doctor.last_name} "
+            f"on {when:%A, %B %d} at {when:%H:%M} ({appointment.duration_minutes} minutes).\n"
+            f"Reason: {appointment.reason}\n"
+        ),
+    )
+
+
+class ReminderBackend:
+    """Interface for delivery backends; ``send()`` raises to signal failure."""
+    def send(self, message):
+        raise NotImplementedError("Must implement send()")
+
+
+class ConsoleBackend(ReminderBackend):
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        with self._lock:
+            self.stream.write(f"To: {message.recipient}\nSubject: {message.subject}\n"
+                              f"Key: {message.key}\n\n{message.body}\n{'-' * 40}\n")
+            self.stream.flush()
+
+
+class FileBackend(ReminderBackend):
+    def __init__(self, path=None):
+        self.path = path or getattr(settings, 'REMINDER_FILE_PATH', 'reminders.jsonl')
+        self._lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps({**asdict(message), 'sent_at': timezone.now().isoformat()})
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class EmailBackend(ReminderBackend):
+    def send(self, message):
+        if not message.recipient:
+            raise ValueError("Patient has no email address.")
+        send_mail(message.subject, message.body, None, [message.recipient])
+
+
+def get_backend():
+    return import_string(getattr(settings, 'REMINDER_BACKEND', 'dashboard.reminders.ConsoleBackend'))()
+
+
+# --- Scheduler ------------------------------------------------------------
+
+def requeue_stale(now=None):
+    """Put reminders whose scheduler died mid-send back on the queue. Returns how many."""
+    now = now or timezone.now()
+    lease = timedelta(seconds=getattr(settings, 'REMINDER_LEASE_SECONDS', DEFAULT_LEASE_SECONDS))
+    return Reminder.objects.filter(status=Reminder.SENDING, locked_at__lt=now - lease).update(
+        status=Reminder.PENDING, locked_by='', locked_at=None,
+    )
+
+
+class Scheduler:
+    def __init__(self, name=None, batch_size=100, backend=None):
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.batch_size = batch_size
+        self.backend = backend or get_backend()
+        self._heap = []       # (due_at, reminder id)
+        self._queued = set()
+
+    def refill(self, horizon):
+        """Load pending reminders due by ``horizon`` into the heap, earliest first."""
+        rows = Reminder.objects.filter(status=Reminder.PENDING, due_at__lte=horizon).order_by(
+            'due_at').values_list('due_at', 'id')[:self.batch_size * 10]
+        for due_at, pk in rows:
+            if pk not in self._queued:
+                self._queued.add(pk)
+                heapq.heappush(self._heap, (due_at, pk))
+
+    def next_due(self):
+        return self._heap[0][0] if self._heap else None
+
+    def claim(self, now=None):
+        """Claim up to ``batch_size`` due reminders from the heap. Returns the ones this process won."""
+        now = now or timezone.now()
+        ids = []
+        while self._heap and self._heap[0][0] <= now and len(ids) < self.batch_size:
+            _, pk = heapq.heappop(self._heap)
+            self._queued.discard(pk)
+            ids.append(pk)
+        if not ids:
+            return []
+        token = f"{self.name}:{uuid.uuid4().hex}"
+        # The due_at check skips reminders rescheduled since they were loaded.
+        claimed = Reminder.objects.filter(pk__in=ids, status=Reminder.PENDING, due_at__lte=now).update(
+            status=Reminder.SENDING, locked_by=token, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if not claimed:
+            return []
+        return list(Reminder.objects.filter(locked_by=token, status=Reminder.SENDING).select_related(
+            'appointment__patient__user', 'appointment__medical_professional__user'))
+
+    def deliver(self, reminder):
+        """Send one claimed reminder and record the outcome. Returns the new status, or None if the claim was lost."""
+        now = timezone.now()
+        # Renew the lease just before sending, and only while the claim is still
+        # ours: a slow batch may have outlived it and been requeued elsewhere.
+        if not Reminder.objects.filter(pk=reminder.pk, locked_by=reminder.locked_by,
+                                       status=Reminder.SENDING).update(locked_at=now):
+            logger.info("Reminder %s was reclaimed by another scheduler; not sending", reminder.pk)
+            return None
+        if reminder.appointment.appointment_date <= now:
+            update = {'status': Reminder.SKIPPED, 'error': "Appointment already started."}
+        else:
+            try:
+                self.backend.send(message_for(reminder))
+            except Exception:
+                error = traceback.format_exc(limit=20)
+                logger.warning("Reminder %s failed (attempt %s/%s)", reminder.pk, reminder.attempts, MAX_ATTEMPTS)
+                if reminder.attempts < MAX_ATTEMPTS:
+                    update = {'status': Reminder.PENDING, 'error': error,
+                              'due_at': now + timedelta(seconds=RETRY_SECONDS * reminder.attempts)}
+                else:
+                    update = {'status': Reminder.FAILED, 'error': error}
+            else:
+                update = {'status': Reminder.SENT, 'sent_at': timezone.now(), 'error': ''}
+        # Only while still ours: after a lease expiry another scheduler may own it.
+        Reminder.objects.filter(pk=reminder.pk, locked_by=reminder.locked_by).update(
+            locked_by='', locked_at=None, **update)
+        return update['status']
+
+    def run(self, stop, poll_interval=30.0, burst=False):
+        """
+        Send reminders as they fall due until ``stop`` (a threading.Event) is
+        set, or until nothing is due if ``burst``.
+        """
+        next_poll = 0.0
+        while not stop.is_set():
+            close_old_connections()
+            batch = []
+            try:
+                if burst or time.monotonic() >= next_poll:
+                    requeue_stale()
+                    self.refill(timezone.now() + timedelta(seconds=0 if burst else poll_interval))
+                    next_poll = time.monotonic() + poll_interval
+                batch = self.claim()
+                for reminder in batch:
+                    self.deliver(reminder)
+            except Exception:
+                logger.exception("Reminder scheduler %s hit an error; continuing", self.name)
+            if batch:
+                continue
+            if burst:
+                return
+            wait = next_poll - time.monotonic()
+            due = self.next_due()
+            if due is not None:
+                wait = min(wait, (due - timezone.now()).total_seconds())
+            stop.wait(max(wait, 0.05))
+
+
+def send_due():
+    """Send every reminder that is due now, in this thread. Returns how many were claimed."""
+    scheduler = Scheduler('sync')
+    sent = 0
+    while True:
+        scheduler.refill(timezone.now())
+        batch = scheduler.claim()
+        if not batch:
+            return sent
+        for reminder in batch:
+            scheduler.deliver(reminder)
+        sent += len(batch)
@@ -0,0 +1,175 @@
+# dashboard/roles.py
+"""
+Per-session role resolution.
+
+A user's role ("patient", "doctor" or "admin", as in UserProfileFactory)
+and profile primary key are resolved with one query at login and kept in
+the session. ``RoleMiddleware`` then gives each request:
+
+* ``request.role``: the role string, or None for anonymous users and users
+  without a profile;
+* ``request.profile``: the profile instance, loaded lazily on first access;
+* ``request.profile_id``: its primary key, available without loading it.
+
+The middleware also fills the user's cached one-to-one relations: the
+roles the user does not have are cached as missing, and the one they have
+is cached as the lazy profile. Existing ``hasattr(request.user, 'patient')``
+checks therefore cost no queries either way.
+
+The middleware runs natively under both WSGI and ASGI. Install it after
+AuthenticationMiddleware::
+
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'dashboard.roles.RoleMiddleware',
+"""
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib import messages
+from django.contrib.auth import get_user_model
+from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.utils.functional import SimpleLazyObject
+
+from .factories import UserProfileFactory
+
+SESSION_ROLE_KEY = '_dashboard_role'
+
+ROLE_MODELS = UserProfileFactory.ROLE_MODELS
+# role: reverse one-to-one relation from User to the profile
+ROLE_RELATIONS = {role: model._meta.get_field('user').remote_field for role, model in ROLE_MODELS.items()}
+
+
+def resolve_role(user):
+    """``(role, profile_id)`` for ``user`` from a single query; ``(None, None)`` if no profile."""
+    if not user.is_authenticated:
+        return None, None
+    accessors = [f"{rel.get_accessor_name()}__id" for rel in ROLE_RELATIONS.values()]
+    # request.user is a SimpleLazyObject, so type(user) is not the model.
+    ids = get_user_model()._default_manager.filter(pk=user.pk).values_list(*accessors).first() or ()
+    for role, profile_id in zip(ROLE_RELATIONS, ids):
+        if profile_id is not None:
+            return role, profile_id
+    return None, None
+
+
+def remember_role(request, user):
+    """Resolve and store the role in the session; called on login."""
+    role, profile_id = resolve_role(user)
+    request.session[SESSION_ROLE_KEY] = [str(user.pk), role, profile_id]
+    return role, profile_id
+
+
+def forget_role(request):
+    request.session.pop(SESSION_ROLE_KEY, None)
+
+
+def _prime_user(user, role, profile):
+    for other, rel in ROLE_RELATIONS.items():
+        if not rel.is_cached(user):
+            rel.set_cached_value(user, profile if other == role else None)
+
+
+def _profile_loader(request, user, role, profile_id):
+    def load():
+        rel = ROLE_RELATIONS[role]
+        profile = ROLE_MODELS[role].objects.filter(pk=profile_id).first()
+        if profile is None:
+            # Deleted since login; resolve again next request.
+            forget_role(request)
+            return None
+        # Swap the lazy placeholder on the user for the real instance.
+        profile.user = user
+        rel.set_cached_value(user, profile)
+        return profile
+    return load
+
+
+class RoleMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.process_request(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # The session, request.user and the role lookup all load through the sync ORM.
+        await sync_to_async(self.process_request)(request)
+        return await self.get_response(request)
+
+    def process_request(self, request):
+        request.role = None
+        request.profile = None
+        request.profile_id = None
+        user = request.user
+        if not user.is_authenticated:
+            # Logged out, or deactivated (e.g. soft-deleted) with a session left over.
+            forget_role(request)
+            return
+
+        stored = request.session.get(SESSION_ROLE_KEY)
+        if stored and stored[0] == str(user.pk):
+            role, profile_id = stored[1], stored[2]
+        else:
+            # Session predates this middleware (or belongs to another user).
+            role, profile_id = remember_role(request, user)
+        if role is None:
+            _prime_user(user, None, None)
+            return
+
+        request.role = role
+        request.profile_id = profile_id
+        request.profile = SimpleLazyObject(_profile_loader(request, user, role, profile_id))
+        _prime_user(user, role, request.profile)
+
+
+def get_role(request):
+    """
+    ``request.role``, resolving it (one query) when RoleMiddleware is not
+    installed, so the decorators below work either way.
+    """
+    if not hasattr(request, 'role'):
+        request.role, request.profile_id = resolve_role(request.user)
+    return request.role
+
+
+def get_profile_id(request):
+    """The profile primary key for ``request.role``, without loading the profile."""
+    get_role(request)
+    return request.profile_id
+
+
+def role_required(*roles, redirect_to='dashboard', message="You don't have permission to view this page."):
+    """
+    Let the view run only for users whose ``request.role`` is one of
+    ``roles``; anyone else gets ``message`` and a redirect. Costs no queries.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if get_role(request) not in roles:
+                messages.error(request, message)
+                return redirect(redirect_to)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def api_role_required(*roles):
+    """``role_required`` for JSON endpoints: answers 403 instead of redirecting."""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if get_role(request) not in roles:
+                return JsonResponse({'error': 'Forbidden.'}, status=403)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,118 @@
+# dashboard/roster.py
+"""
+Per-doctor patient rosters.
+
+A patient is on a doctor's roster while assigned to the doctor
+(MedicalProfessionalPatient) or while the two share at least one
+appointment. Each (doctor, patient) pair is one ``RosterEntry`` row. The
+row records the assignment and counts the shared appointments, so the
+roster is already deduplicated and can be read from a single index.
+
+Signals in signals.py keep the rows current as appointments and
+assignments change. Each doctor's summary (patient ids plus counts) is
+cached through dashboard_cache, under the same per-doctor generation that
+roster changes bump. ``rebuild()`` recomputes everything after bulk loads
+that skip signals.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q
+
+from .models import RosterEntry, Patient, Appointment, MedicalProfessionalPatient
+from . import dashboard_cache
+
+
+def _invalidate(doctor_id):
+    transaction.on_commit(lambda: dashboard_cache.invalidate('doctor', doctor_id))
+
+
+def _adjust(doctor_id, patient_id, appointments=0, assigned=None):
+    entry = RosterEntry.objects.filter(medical_professional_id=doctor_id, patient_id=patient_id)
+    updates = {}
+    if appointments:
+        updates['appointment_count'] = F('appointment_count') + appointments
+    if assigned is not None:
+        updates['assigned'] = assigned
+    if not updates:
+        return
+
+    target = entry.filter(appointment_count__gt=0) if appointments < 0 else entry
+    if not target.update(**updates) and appointments >= 0 and (appointments or assigned):
+        try:
+            with transaction.atomic():
+                RosterEntry.objects.create(medical_professional_id=doctor_id, patient_id=patient_id,
+                                           appointment_count=appointments, assigned=bool(assigned))
+        except IntegrityError:
+            # Someone else created it between our update and insert.
+            entry.update(**updates)
+    if appointments < 0 or assigned is False:
+        entry.filter(assigned=False, appointment_count=0).delete()
+    _invalidate(doctor_id)
+
+
+def appointment_added(doctor_id, patient_id):
+    _adjust(doctor_id, patient_id, appointments=1)
+
+
+def appointment_removed(doctor_id, patient_id):
+    _adjust(doctor_id, patient_id, appointments=-1)
+
+
+def set_assigned(doctor_id, patient_id, assigned):
+    _adjust(doctor_id, patient_id, assigned=assigned)
+
+
+def _summary(doctor_id):
+    rows = list(RosterEntry.objects.filter(medical_professional_id=doctor_id).values_list(
+        'patient_id', 'assigned', 'appointment_count'))
+    return {
+        'patient_ids': frozenset(patient_id for patient_id, _, _ in rows),
+        'assigned': sum(1 for _, assigned, _ in rows if assigned),
+        'with_appointments': sum(1 for _, _, count in rows if count),
+        'appointments': sum(count for _, _, count in rows),
+    }
+
+
+def summary(doctor_id):
+    """Cached ``{'patient_ids', 'assigned', 'with_appointments', 'appointments'}`` for a doctor."""
+    return dashboard_cache.cached('doctor', doctor_id, 'roster', lambda: _summary(doctor_id))
+
+
+def patient_ids(doctor_id):
+    return summary(doctor_id)['patient_ids']
+
+
+def contains(doctor_id, patient_id):
+    return patient_id in patient_ids(doctor_id)
+
+
+def patients(doctor_id):
+    """The doctor's roster as a Patient queryset (one indexed join when evaluated)."""
+    return Patient.objects.filter(roster_entries__medical_professional_id=doctor_id)
+
+
+def scope(doctor_id, field='patient_id'):
+    """Q restricting ``field`` to the doctor's roster, as a subquery."""
+    return Q(**{f'{field}__in': RosterEntry.objects.filter(
+        medical_professional_id=doctor_id).values('patient_id')})
+
+
+@transaction.atomic
+def rebuild(batch_size=2000):
+    """Recompute every roster from the source tables. Returns the number of entries."""
+    entries = {}
+    for doctor_id, patient_id in MedicalProfessionalPatient.objects.values_list(
+            'medical_professional_id', 'patient_id').iterator(chunk_size=batch_size):
+        entries[doctor_id, patient_id] = RosterEntry(
+            medical_professional_id=doctor_id, patient_id=patient_id, assigned=True)
+    shared = Appointment.objects.values('medical_professional_id', 'patient_id').annotate(n=Count('id'))
+    for row in shared.iterator(chunk_size=batch_size):
+        key = row['medical_professional_id'], row['patient_id']
+        entry = entries.setdefault(key, RosterEntry(medical_professional_id=key[0], patient_id=key[1]))
+        entry.appointment_count = row['n']
+
+    previous = set(RosterEntry.objects.values_list('medical_professional_id', flat=True).distinct())
+    RosterEntry.objects.all().delete()
+    RosterEntry.objects.bulk_create(entries.values(), batch_size=batch_size)
+    for doctor_id in previous | {doctor_id for doctor_id, _ in entries}:
+        _invalidate(doctor_id)
+    return len(entries)
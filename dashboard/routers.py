@@ -0,0 +1,201 @@
+# dashboard/routers.py
+"""
+Read-replica routing.
+
+Reads go to a replica only inside ``@use_replica`` views (or the
+``replica_reads()`` context manager). Every other read, and every write,
+goes to ``default``. Settings::
+
+    DATABASE_ROUTERS = ['dashboard.routers.ReplicaRouter']
+    REPLICA_DATABASES = ['replica']       # aliases in DATABASES
+    REPLICA_STICKY_SECONDS = 5            # read-your-writes window
+    REPLICA_RETRY_SECONDS = 30            # how long a failed replica is skipped
+    MIDDLEWARE += ['dashboard.routers.ReplicaStickinessMiddleware']
+
+Read-your-writes: once a request writes to the primary, the rest of that
+request reads from the primary. The middleware also sets a short-lived
+cookie, so the same browser keeps reading from the primary for
+``REPLICA_STICKY_SECONDS`` while the replicas catch up.
+
+Fallback: a replica that cannot be reached is skipped for
+``REPLICA_RETRY_SECONDS``. A replica view that fails with a database error
+on the replica runs again against the primary. This is safe because
+these views only read.
+
+For local testing, point a second alias at the same SQLite file or
+PostgreSQL database (or use ``'TEST': {'MIRROR': 'default'}``).
+"""
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+STICKY_COOKIE = 'primary_until'
+DEFAULT_STICKY_SECONDS = 5
+DEFAULT_RETRY_SECONDS = 30
+
+
+class _State:
+    def __init__(self, replica=False):
+        self.replica = replica
+        self.alias = None
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('dashboard_db_routing', default=None)
+_down_until = {}
+
+
+def replica_aliases():
+    return [alias for alias in getattr(settings, 'REPLICA_DATABASES', []) if alias in settings.DATABASES]
+
+
+def mark_down(alias):
+    _down_until[alias] = time.monotonic() + getattr(settings, 'REPLICA_RETRY_SECONDS', DEFAULT_RETRY_SECONDS)
+    logger.warning("Replica %s unavailable; reading from primary", alias)
+
+
+def _healthy(alias):
+    if _down_until.get(alias, 0) > time.monotonic():
+        return False
+    try:
+        connections[alias].ensure_connection()
+    except DatabaseError:
+        mark_down(alias)
+        return False
+    return True
+
+
+def pick_replica():
+    """A reachable replica alias, or None to use the primary."""
+    candidates = replica_aliases()
+    random.shuffle(candidates)
+    for alias in candidates:
+        if _healthy(alias):
+            return alias
+    return None
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.replica or state.wrote:
+            return DEFAULT_DB_ALIAS
+        if state.alias is None:
+            # One replica per request, so its reads see one consistent snapshot.
+            state.alias = pick_replica() or DEFAULT_DB_ALIAS
+        return state.alias
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data, so objects from any alias may be related.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive schema changes through replication.
+        return db not in replica_aliases()
+
+
+@contextmanager
+def replica_reads():
+    """Route reads in the block to a replica (writes still go to the primary)."""
+    token = _state.set(_State(replica=True))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Force reads in the block to the primary, e.g. before caching what was read."""
+    token = _state.set(_State(replica=False))
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def is_sticky(request):
+    try:
+        return float(request.COOKIES.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def use_replica(view_func):
+    """
+    Serve a read-only view from a replica, unless the client wrote recently.
+    Falls back to the primary if the replica fails mid-request.
+    """
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or is_sticky(request) or not replica_aliases():
+            return view_func(request, *args, **kwargs)
+        outer = _state.get()
+        state = _State(replica=True)
+        token = _state.set(state)
+        try:
+            return view_func(request, *args, **kwargs)
+        except DatabaseError:
+            if state.alias in (None, DEFAULT_DB_ALIAS):
+                raise
+            mark_down(state.alias)
+        finally:
+            _state.reset(token)
+            if outer is not None and state.wrote:
+                outer.wrote = True
+        return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """Tracks writes per request and pins the client to the primary for a few seconds after one."""
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = _State()
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response, state)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so ORM calls in its threads share this _State.
+        state = _State()
+        token = _state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _state.reset(token)
+        return self._pin(request, response, state)
+
+    def _pin(self, request, response, state):
+        if state.wrote or request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            seconds = getattr(settings, 'REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+            response.set_cookie(STICKY_COOKIE, f"{time.time() + seconds:.3f}", max_age=seconds,
+                                httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,206 @@
+# dashboard/schedule.py
+"""
+Per-doctor schedule bitmaps.
+
+Each local day is split into fixed slots of ``SCHEDULE_SLOT_MINUTES``
+(default ``AVAILABILITY_GRID_MINUTES``, i.e. 15) starting at midnight. A
+``ScheduleDay`` row stores, for one doctor and one day, a bitset with bit
+``i`` set when an appointment overlaps slot ``i``. Days without
+appointments have no row.
+
+The bitsets are Python ints, so a whole day is handled by one bitwise
+operation: occupancy is a popcount of ``busy & working_hours``, and a run
+of ``k`` free slots is found by AND-ing ``free`` with itself shifted by
+``1 .. k-1``. One indexed query loads the rows for hundreds of doctors and
+a month of days.
+
+Signals in signals.py recompute a doctor's affected days after an
+appointment is booked, moved or cancelled. ``rebuild()`` recomputes
+everything, e.g. after bulk loads or after changing the slot width.
+"""
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import overlapping, _working_hours
+from .models import Appointment, ScheduleDay
+
+DEFAULT_SLOT_MINUTES = 15
+
+
+def slot_minutes():
+    return getattr(settings, 'SCHEDULE_SLOT_MINUTES', getattr(settings, 'AVAILABILITY_GRID_MINUTES',
+                                                              DEFAULT_SLOT_MINUTES))
+
+
+def slots_per_day():
+    # A 25-hour DST day loses its last hour; appointments that late are rare.
+    return 24 * 60 // slot_minutes()
+
+
+def day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def days_between(start, end):
+    """Local dates touched by ``[start, end)``."""
+    day = timezone.localdate(start)
+    last = timezone.localdate(max(start, end - timedelta(microseconds=1)))
+    while day <= last:
+        yield day
+        day += timedelta(days=1)
+
+
+def span(day, start, end, inner=False):
+    """
+    Bits of ``day``'s slots that overlap ``[start, end)``, or with ``inner``
+    only the slots that lie entirely inside it.
+    """
+    step = timedelta(minutes=slot_minutes())
+    origin = day_start(day)
+    if inner:
+        first, last = -((origin - start) // step), (end - origin) // step
+    else:
+        first, last = (start - origin) // step, -((origin - end) // step)
+    first, last = max(first, 0), min(last, slots_per_day())
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def working_hours(day):
+    opening, closing, days = _working_hours()
+    if day.weekday() not in days:
+        return 0
+    return span(day, timezone.make_aware(datetime.combine(day, opening)),
+                timezone.make_aware(datetime.combine(day, closing)), inner=True)
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def encode(bits):
+    return bits.to_bytes((slots_per_day() + 7) // 8, 'little')
+
+
+def decode(data):
+    return int.from_bytes(bytes(data), 'little')
+
+
+def bitmaps(rows):
+    """``{(doctor_id, day): bits}`` from ``(doctor_id, start, end)`` rows."""
+    maps = defaultdict(int)
+    for doctor_id, start, end in rows:
+        for day in days_between(start, end):
+            maps[doctor_id, day] |= span(day, start, end)
+    return maps
+
+
+def refresh(doctor_id, days):
+    """Recompute ``doctor_id``'s bitmaps for ``days`` from their appointments."""
+    for day in sorted(set(days)):
+        start = day_start(day)
+        with transaction.atomic():
+            # Lock the row so concurrent refreshes of one day apply in order.
+            ScheduleDay.objects.get_or_create(medical_professional_id=doctor_id, day=day,
+                                              defaults={'busy': encode(0)})
+            row = ScheduleDay.objects.select_for_update().get(medical_professional_id=doctor_id, day=day)
+            rows = overlapping(start, day_start(day + timedelta(days=1)), doctor=doctor_id).values_list(
+                'medical_professional_id', 'appointment_date', 'appointment_end')
+            bits = bitmaps(rows).get((doctor_id, day), 0)
+            if bits:
+                row.busy = encode(bits)
+                row.save(update_fields=['busy'])
+            else:
+                row.delete()
+
+
+def refresh_later(doctor_id, start, end):
+    """``refresh()`` the days of ``[start, end)`` once the current transaction commits."""
+    refresh_many_later([(doctor_id, start, end)])
+
+
+def refresh_many_later(rows):
+    """``refresh_later()`` for ``(doctor_id, start, end)`` rows, once per doctor and day."""
+    touched = defaultdict(set)
+    for doctor_id, start, end in rows:
+        if doctor_id is not None and start is not None:
+            touched[doctor_id].update(days_between(start, end or start))
+    for doctor_id, days in touched.items():
+        transaction.on_commit(partial(refresh, doctor_id, days))
+
+
+def load(doctor_ids, first_day, last_day):
+    """``{doctor_id: {day: bits}}`` for every day in ``[first_day, last_day]``, in one query."""
+    days = [first_day + timedelta(days=i) for i in range((last_day - first_day).days + 1)]
+    maps = {doctor_id: dict.fromkeys(days, 0) for doctor_id in doctor_ids}
+    rows = ScheduleDay.objects.filter(
+        medical_professional_id__in=list(maps), day__range=(first_day, last_day)
+    ).values_list('medical_professional_id', 'day', 'busy')
+    for doctor_id, day, busy in rows:
+        maps[doctor_id][day] = decode(busy)
+    return maps
+
+
+def occupancy(doctor_ids, first_day, last_day):
+    """
+    ``{doctor_id: [share of working-hour slots booked, per day]}``, with
+    None for days the clinic is closed.
+    """
+    maps = load(doctor_ids, first_day, last_day)
+    hours = {}
+    result = {}
+    for doctor_id, days in maps.items():
+        result[doctor_id] = []
+        for day, busy in days.items():
+            mask = hours.setdefault(day, working_hours(day))
+            result[doctor_id].append(popcount(busy & mask) / popcount(mask) if mask else None)
+    return result
+
+
+def _first_run(free, length):
+    runs = free
+    for shift in range(1, length):
+        runs &= free >> shift
+    return (runs & -runs).bit_length() - 1 if runs else None
+
+
+def first_free(doctor_ids, start, end, duration_minutes=30):
+    """
+    ``{doctor_id: earliest slot start or None}``: the first time in
+    ``[start, end)``, on the slot grid and within working hours, at which
+    each doctor is free for ``duration_minutes``.
+    """
+    step = timedelta(minutes=slot_minutes())
+    length = max(1, -(-duration_minutes // slot_minutes()))
+    days = list(days_between(start, end))
+    maps = load(doctor_ids, days[0], days[-1])
+    windows = {day: working_hours(day) & span(day, start, end, inner=True) for day in days}
+    result = {}
+    for doctor_id, busy_by_day in maps.items():
+        result[doctor_id] = None
+        for day in days:
+            slot = _first_run(windows[day] & ~busy_by_day[day], length)
+            if slot is not None:
+                result[doctor_id] = day_start(day) + slot * step
+                break
+    return result
+
+
+@transaction.atomic
+def rebuild(batch_size=2000):
+    """Recompute every bitmap from the appointments. Returns the number of rows."""
+    rows = Appointment.objects.values_list('medical_professional_id', 'appointment_date', 'appointment_end')
+    maps = bitmaps(rows.iterator(chunk_size=batch_size))
+    ScheduleDay.objects.all().delete()
+    ScheduleDay.objects.bulk_create(
+        [ScheduleDay(medical_professional_id=doctor_id, day=day, busy=encode(bits))
+         for (doctor_id, day), bits in maps.items()],
+        batch_size=batch_size,
+    )
+    return len(maps)
@@ -0,0 +1,179 @@
+# dashboard/search.py
+"""
+Ranked keyword search over reports and test results.
+
+Documents are tokenized in Python into ``SearchPosting`` rows (an inverted
+index that works the same on SQLite and PostgreSQL). Signals keep the
+index current as reports and test results are saved or deleted; the
+``rebuild_search_index`` command rebuilds it from scratch.
+
+A query reads only the postings for its terms, already narrowed to the
+patients the caller may see, and ranks documents by how many query terms
+they contain and then by a TF-IDF score.
+"""
+import math
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Case, Count, F, FloatField, Q, Sum, Value, When
+
+from .models import SearchPosting, Statistic, Report, TestResult
+from . import statistics, roster
+
+MAX_TERM_LENGTH = 64
+DOCUMENT_COUNT_KEY = statistics.count_key('search_document')
+
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have in is it its of on or that the this to was were will with
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9]+(?:\.[0-9]+)?")
+
+# doc_type: (model, {field: weight}). Titles count for more than body text.
+DOCUMENT_TYPES = {
+    'report': (Report, {'title': 3, 'summary': 1}),
+    'test_result': (TestResult, {'description': 3, 'result_data': 1}),
+}
+
+
+def tokenize(text):
+    return [
+        token[:MAX_TERM_LENGTH] for token in _TOKEN.findall((text or '').casefold())
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+def doc_type_for(instance):
+    for doc_type, (model, _) in DOCUMENT_TYPES.items():
+        if isinstance(instance, model):
+            return doc_type
+    raise ValueError(f"{type(instance).__name__} is not searchable")
+
+
+def build_postings(doc_type, instance):
+    _, weights = DOCUMENT_TYPES[doc_type]
+    frequencies = Counter()
+    for field, weight in weights.items():
+        for token in tokenize(getattr(instance, field)):
+            frequencies[token] += weight
+    return [
+        SearchPosting(term=term, doc_type=doc_type, doc_id=instance.pk, patient_id=instance.patient_id,
+                      medical_professional_id=instance.medical_professional_id, frequency=frequency)
+        for term, frequency in frequencies.items()
+    ]
+
+
+@transaction.atomic
+def index_document(instance):
+    """(Re)index one report or test result."""
+    doc_type = doc_type_for(instance)
+    existed, _ = SearchPosting.objects.filter(doc_type=doc_type, doc_id=instance.pk).delete()
+    postings = build_postings(doc_type, instance)
+    SearchPosting.objects.bulk_create(postings)
+    if postings and not existed:
+        statistics.bump(DOCUMENT_COUNT_KEY)
+    elif existed and not postings:
+        statistics.bump(DOCUMENT_COUNT_KEY, -1)
+
+
+def index_new_documents(instances):
+    """Index reports or test results that were just bulk-created (so have no postings yet)."""
+    postings = [build_postings(doc_type_for(instance), instance) for instance in instances]
+    SearchPosting.objects.bulk_create([p for doc in postings for p in doc], batch_size=2000)
+    statistics.bump(DOCUMENT_COUNT_KEY, sum(1 for doc in postings if doc))
+
+
+def unindex_document(doc_type, doc_id):
+    existed, _ = SearchPosting.objects.filter(doc_type=doc_type, doc_id=doc_id).delete()
+    if existed:
+        statistics.bump(DOCUMENT_COUNT_KEY, -1)
+
+
+@transaction.atomic
+def rebuild(batch_size=2000):
+    """Drop and rebuild the whole index. Returns the number of documents indexed."""
+    SearchPosting.objects.all().delete()
+    documents = 0
+    for doc_type, (model, weights) in DOCUMENT_TYPES.items():
+        fields = ['pk', 'patient_id', 'medical_professional_id', *weights]
+        pending = []
+        for instance in model.objects.only(*fields).order_by('pk').iterator(chunk_size=batch_size):
+            postings = build_postings(doc_type, instance)
+            documents += bool(postings)
+            pending.extend(postings)
+            if len(pending) >= batch_size:
+                SearchPosting.objects.bulk_create(pending)
+                pending = []
+        SearchPosting.objects.bulk_create(pending)
+    Statistic.objects.update_or_create(name=DOCUMENT_COUNT_KEY, defaults={'value': documents})
+    return documents
+
+
+def visible_scope(user):
+    """
+    Q over SearchPosting limiting results to what ``user`` may see, or None
+    for no access. Patients see their own records; doctors see records of
+    patients on their roster or with an appointment with them, plus anything
+    they wrote; administrators see everything.
+    """
+    if hasattr(user, 'patient'):
+        return Q(patient_id=user.patient.pk)
+    if hasattr(user, 'medicalprofessional'):
+        doctor_id = user.medicalprofessional.pk
+        return Q(medical_professional_id=doctor_id) | roster.scope(doctor_id)
+    if hasattr(user, 'healthcarefacilityadministrator'):
+        return Q()
+    return None
+
+
+class SearchHit:
+    def __init__(self, doc_type, obj, score, matched):
+        self.doc_type = doc_type
+        self.object = obj
+        self.score = score
+        self.matched = matched
+
+
+def search(user, query, page=1, page_size=20):
+    """
+    Ranked, permission-filtered results for ``query``.
+    Returns ``(hits, has_next)`` for the requested 1-based page.
+    """
+    terms = list(dict.fromkeys(tokenize(query)))
+    scope = visible_scope(user)
+    if not terms or scope is None:
+        return [], False
+
+    # Inverse document frequency per term, from one grouped query.
+    total = max(statistics.read(DOCUMENT_COUNT_KEY)[DOCUMENT_COUNT_KEY], 1)
+    document_frequency = dict(
+        SearchPosting.objects.filter(term__in=terms).values_list('term').annotate(n=Count('id'))
+    )
+    terms = [t for t in terms if t in document_frequency]
+    if not terms:
+        return [], False
+    idf = {t: math.log(1 + total / document_frequency[t]) for t in terms}
+
+    # Saturating term frequency (tf / (tf + 1.2)) weighted by idf, summed per document.
+    weight = Case(*[When(term=t, then=Value(idf[t])) for t in terms], output_field=FloatField())
+    offset = (page - 1) * page_size
+    ranked = list(
+        SearchPosting.objects.filter(scope, term__in=terms).values('doc_type', 'doc_id').annotate(
+            matched=Count('id'),
+            score=Sum(weight * F('frequency') / (F('frequency') + 1.2), output_field=FloatField()),
+        ).order_by('-matched', '-score', 'doc_type', '-doc_id')[offset:offset + page_size + 1]
+    )
+    has_next = len(ranked) > page_size
+    ranked = ranked[:page_size]
+
+    objects = {}
+    for doc_type, (model, _) in DOCUMENT_TYPES.items():
+        ids = [row['doc_id'] for row in ranked if row['doc_type'] == doc_type]
+        if ids:
+            objects[doc_type] = model.objects.select_related('patient__user').in_bulk(ids)
+    hits = [
+        SearchHit(row['doc_type'], objects[row['doc_type']][row['doc_id']], row['score'], row['matched'])
+        for row in ranked if row['doc_id'] in objects.get(row['doc_type'], {})
+    ]
+    return hits, has_next
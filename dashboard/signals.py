@@ -0,0 +1,268 @@
+# dashboard/signals.py
+from django.db import transaction
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.models.signals import post_save, post_delete, pre_save, m2m_changed
+from django.dispatch import receiver
+
+from .models import Patient, MedicalProfessional, HealthcareFacilityAdministrator, Appointment, Report, TestResult, \
+    Prescription, MedicalProfessionalPatient, Measurement
+from . import statistics, search, dashboard_cache, roles, roster, schedule, reminders, analytes
+
+
+@receiver(post_save, sender=Patient)
+def precompute_patient_geocode(sender, instance, update_fields=None, **kwargs):
+    # Warm the geocode cache so the patient's first pharmacy search is instant.
+    if update_fields is not None and 'address' not in update_fields:
+        return
+    if instance.address:
+        from .geocoding import GeocodingService
+        address = instance.address
+        transaction.on_commit(lambda: GeocodingService().prefetch(address))
+
+
+# --- Dashboard counters ---------------------------------------------------
+
+ROLE_BY_MODEL = {model: kind for kind, model in statistics.ROLE_MODELS.items()}
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_save, sender=MedicalProfessional)
+@receiver(post_save, sender=HealthcareFacilityAdministrator)
+def count_profile_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        statistics.bump(statistics.count_key(ROLE_BY_MODEL[sender]))
+
+
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=MedicalProfessional)
+@receiver(post_delete, sender=HealthcareFacilityAdministrator)
+def count_profile_deleted(sender, instance, **kwargs):
+    # Soft-deleted profiles were already taken off the count by deletion.soft_delete().
+    if getattr(instance, 'deleted_at', None) is None:
+        statistics.bump(statistics.count_key(ROLE_BY_MODEL[sender]), -1)
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_appointment_day(sender, instance, raw=False, **kwargs):
+    # Rescheduling moves the appointment between per-day buckets, and
+    # reassigning it changes whose dashboards it appears on.
+    instance._stats_previous_date = None
+    instance._previous_owners = ()
+    instance._previous_slot = None
+    if instance.pk and not raw:
+        previous = Appointment.objects.filter(pk=instance.pk).values_list(
+            'appointment_date', 'patient_id', 'medical_professional_id', 'appointment_end'
+        ).first()
+        if previous:
+            instance._stats_previous_date = previous[0]
+            instance._previous_owners = previous[1:3]
+            instance._previous_slot = (previous[2], previous[0], previous[3])
+
+
+@receiver(post_save, sender=Appointment)
+def count_appointment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        statistics.bump(statistics.count_key('appointment'))
+        statistics.bump(statistics.appointments_day_key(instance.appointment_date))
+        return
+    previous = getattr(instance, '_stats_previous_date', None)
+    if previous is not None:
+        old_key = statistics.appointments_day_key(previous)
+        new_key = statistics.appointments_day_key(instance.appointment_date)
+        if old_key != new_key:
+            statistics.bump(old_key, -1)
+            statistics.bump(new_key)
+
+
+@receiver(post_delete, sender=Appointment)
+def count_appointment_deleted(sender, instance, **kwargs):
+    statistics.bump(statistics.count_key('appointment'), -1)
+    statistics.bump(statistics.appointments_day_key(instance.appointment_date), -1)
+
+
+@receiver(post_save, sender=Report)
+def count_report_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        statistics.bump(statistics.count_key('report'))
+        statistics.bump(statistics.reports_week_key(instance.date))
+
+
+@receiver(post_delete, sender=Report)
+def count_report_deleted(sender, instance, **kwargs):
+    statistics.bump(statistics.count_key('report'), -1)
+    statistics.bump(statistics.reports_week_key(instance.date), -1)
+
+
+# --- Search index ---------------------------------------------------------
+
+@receiver(post_save, sender=Report)
+@receiver(post_save, sender=TestResult)
+def index_searchable(sender, instance, raw=False, **kwargs):
+    if not raw:
+        search.index_document(instance)
+
+
+@receiver(post_delete, sender=Report)
+@receiver(post_delete, sender=TestResult)
+def unindex_searchable(sender, instance, **kwargs):
+    search.unindex_document(search.doc_type_for(instance), instance.pk)
+
+
+# --- Dashboard cache ------------------------------------------------------
+
+def _invalidate_dashboards(patient_id, doctor_id):
+    # The change counters (ETags for the dashboard API) move in the same
+    # transaction as the write.
+    for role, profile_id in (('patient', patient_id), ('doctor', doctor_id)):
+        if profile_id is not None:
+            statistics.bump(statistics.changes_key(role, profile_id))
+
+    # After commit, so a concurrent request cannot re-cache the old rows.
+    def invalidate():
+        dashboard_cache.invalidate('patient', patient_id)
+        dashboard_cache.invalidate('doctor', doctor_id)
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_save, sender=Prescription)
+@receiver(post_save, sender=Report)
+@receiver(post_save, sender=TestResult)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_delete, sender=Report)
+@receiver(post_delete, sender=TestResult)
+def invalidate_dashboards(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    label = sender._meta.label_lower
+    transaction.on_commit(lambda: dashboard_cache.invalidate_model(label))
+    _invalidate_dashboards(instance.patient_id, instance.medical_professional_id)
+    previous = getattr(instance, '_previous_owners', ())
+    if previous and tuple(previous) != (instance.patient_id, instance.medical_professional_id):
+        _invalidate_dashboards(*previous)
+
+
+# --- Doctor rosters -------------------------------------------------------
+
+@receiver(post_save, sender=Appointment)
+def roster_appointment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.patient_id, instance.medical_professional_id)
+    previous = tuple(getattr(instance, '_previous_owners', ()))
+    if created:
+        roster.appointment_added(instance.medical_professional_id, instance.patient_id)
+    elif previous and previous != current:
+        roster.appointment_removed(previous[1], previous[0])
+        roster.appointment_added(instance.medical_professional_id, instance.patient_id)
+
+
+@receiver(post_delete, sender=Appointment)
+def roster_appointment_deleted(sender, instance, **kwargs):
+    roster.appointment_removed(instance.medical_professional_id, instance.patient_id)
+
+
+@receiver(post_save, sender=MedicalProfessionalPatient)
+def roster_assigned(sender, instance, raw=False, **kwargs):
+    if not raw:
+        roster.set_assigned(instance.medical_professional_id, instance.patient_id, True)
+
+
+@receiver(post_delete, sender=MedicalProfessionalPatient)
+def roster_unassigned(sender, instance, **kwargs):
+    # Also covers doctor.patients.remove()/clear(), which delete through rows.
+    roster.set_assigned(instance.medical_professional_id, instance.patient_id, False)
+
+
+@receiver(m2m_changed, sender=MedicalProfessional.patients.through)
+def roster_assigned_in_bulk(sender, instance, action, reverse, pk_set, **kwargs):
+    # doctor.patients.add() bulk-creates through rows without post_save.
+    if action != 'post_add':
+        return
+    for other_id in pk_set:
+        doctor_id, patient_id = (other_id, instance.pk) if reverse else (instance.pk, other_id)
+        roster.set_assigned(doctor_id, patient_id, True)
+
+
+# --- Schedule bitmaps -----------------------------------------------------
+
+@receiver(post_save, sender=Appointment)
+def schedule_appointment_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    current = (instance.medical_professional_id, instance.appointment_date, instance.appointment_end)
+    previous = getattr(instance, '_previous_slot', None)
+    schedule.refresh_later(*current)
+    if previous and previous != current:
+        schedule.refresh_later(*previous)
+
+
+@receiver(post_delete, sender=Appointment)
+def schedule_appointment_deleted(sender, instance, **kwargs):
+    schedule.refresh_later(instance.medical_professional_id, instance.appointment_date, instance.appointment_end)
+
+
+# --- Reminders ------------------------------------------------------------
+
+@receiver(post_save, sender=Appointment)
+def schedule_reminders(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_stats_previous_date', None)
+    if created or (previous is not None and previous != instance.appointment_date):
+        reminders.schedule(instance)
+
+
+# --- Analyte series -------------------------------------------------------
+
+@receiver(post_save, sender=Measurement)
+def analyte_measurement_saved(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    pairs = {(instance.patient_id, instance.code)}
+    previous = getattr(instance, '_previous_series', None)
+    if previous:
+        pairs.add(previous)
+    analytes.refresh_later(pairs)
+
+
+@receiver(post_delete, sender=Measurement)
+def analyte_measurement_deleted(sender, instance, **kwargs):
+    analytes.refresh_later({(instance.patient_id, instance.code)})
+
+
+@receiver(pre_save, sender=Measurement)
+def remember_measurement_series(sender, instance, raw=False, **kwargs):
+    if raw or instance.pk is None:
+        return
+    instance._previous_series = Measurement.objects.filter(pk=instance.pk).values_list(
+        'patient_id', 'code').first()
+
+
+@receiver(post_save, sender=TestResult)
+def sync_measurements(sender, instance, created, raw=False, **kwargs):
+    # Measurements copy the result's patient and date so a series is one index scan.
+    if raw or created:
+        return
+    stale = Measurement.objects.filter(test_result_id=instance.pk).exclude(
+        patient_id=instance.patient_id, observed_at=instance.test_date)
+    pairs = set(stale.values_list('patient_id', 'code'))
+    if pairs:
+        stale.update(patient_id=instance.patient_id, observed_at=instance.test_date)
+        analytes.refresh_later(pairs | {(instance.patient_id, code) for _, code in pairs})
+
+
+# --- Session role ---------------------------------------------------------
+
+@receiver(user_logged_in)
+def remember_session_role(sender, request, user, **kwargs):
+    roles.remember_role(request, user)
+
+
+@receiver(user_logged_out)
+def forget_session_role(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        roles.forget_role(request)
@@ -1,8 +1,18 @@
 # dashboard/singletons.py
+import asyncio
 import threading
-import requests
+import re
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
 from django.conf import settings
+from django.db import connection
+from django.utils import timezone
 import logging
+from .instrumentation import track_http
+from .caching import LRUCache, SingleFlight, AsyncSingleFlight
+from .transport import CircuitBreaker, CircuitOpenError, build_session, build_async_client, \
+    call_with_retries, acall_with_retries
 
 logger = logging.getLogger(__name__)
 
@@ -15,15 +25,214 @@ class SingletonMeta(type):
                 cls._instances[cls] = super().__call__(*args, **kwargs)
         return cls._instances[cls]
 
+def normalize_medication_name(name: str) -> str:
+    """Cache key for a medication: trimmed, whitespace-collapsed and case-folded."""
+    return re.sub(r"\s+", " ", name).strip().casefold()
+
+
 class GeminiClient(metaclass=SingletonMeta):
     """
     Thread‑safe singleton wrapper around requests to the Gemini API.
+
+    Descriptions are cached in two tiers: an in-process LRU with a TTL in
+    front of the ``MedicationDescription`` table. Concurrent misses for the
+    same medication are coalesced so only one request goes upstream.
+
+    Upstream calls share one pooled keep-alive session, are bounded by
+    connect/read timeouts, retried with jittered backoff, and guarded by a
+    circuit breaker. ``GEMINI_API_URL`` can point the client at a local stub.
     """
     def __init__(self):
-        self.base_url = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent"
+        self.base_url = getattr(
+            settings, 'GEMINI_API_URL',
+            "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent",
+        )
+        self.session = build_session(pool_size=getattr(settings, 'GEMINI_POOL_SIZE', 10))
+        self.timeout = (
+            getattr(settings, 'GEMINI_CONNECT_TIMEOUT', 3.05),
+            getattr(settings, 'GEMINI_READ_TIMEOUT', 10),
+        )
+        self.max_retries = getattr(settings, 'GEMINI_MAX_RETRIES', 2)
+        self.backoff_base = getattr(settings, 'GEMINI_BACKOFF_BASE', 0.25)
+        self.backoff_cap = getattr(settings, 'GEMINI_BACKOFF_MAX', 2.0)
+        self.breaker = CircuitBreaker(
+            failure_threshold=getattr(settings, 'GEMINI_BREAKER_THRESHOLD', 5),
+            reset_timeout=getattr(settings, 'GEMINI_BREAKER_RESET', 30),
+        )
+        self.cache = LRUCache(
+            maxsize=getattr(settings, 'GEMINI_CACHE_SIZE', 1024),
+            ttl=getattr(settings, 'GEMINI_CACHE_TTL', 60 * 60),
+        )
+        self.store_ttl = timedelta(seconds=getattr(settings, 'GEMINI_STORE_TTL', 30 * 24 * 60 * 60))
+        self._inflight = SingleFlight()
+        self._ainflight = AsyncSingleFlight()
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._batch_pool = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'GEMINI_BATCH_WORKERS', 8),
+            thread_name_prefix='gemini-batch',
+        )
+        self._stats_lock = threading.Lock()
+        self.store_hits = 0
+        self.upstream_calls = 0
+
+    @staticmethod
+    def fallback_description(medication_name: str) -> str:
+        return f"{medication_name} is a medication used to treat specific conditions."
 
     def describe_medication(self, medication_name: str) -> str:
-        url = f"{self.base_url}?key={settings.GEMINI_API_KEY}"
+        key = normalize_medication_name(medication_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return self._inflight.do(key, self._load_description, key, medication_name)
+
+    def describe_medications(self, medication_names) -> dict:
+        """
+        Describe several medications at once, returning ``{name: description}``.
+
+        Memory hits are answered directly, the remaining names are looked up in
+        the persistent tier with one query, and only what is still missing is
+        fanned out to Gemini on a bounded worker pool, so the batch takes about
+        as long as its slowest lookup. A failed lookup yields the fallback
+        sentence for that name instead of failing the whole batch.
+        """
+        keys = {}
+        for name in medication_names:
+            keys.setdefault(normalize_medication_name(name), name)
+
+        found = {}
+        for key in keys:
+            cached = self.cache.get(key)
+            if cached is not None:
+                found[key] = cached
+
+        missing = [key for key in keys if key not in found]
+        if missing:
+            stored = self._stored_description().filter(
+                normalized_name__in=missing
+            ).values_list('normalized_name', 'description')
+            for key, description in stored:
+                found[key] = self._record_store_hit(key, description)
+
+        def describe(key):
+            try:
+                return self._inflight.do(key, self._load_description, key, keys[key])
+            except Exception:
+                logger.exception(f"Error describing {keys[key]} in batch.")
+                return self.fallback_description(keys[key])
+            finally:
+                # Pool threads outlive the request, so don't leave their connection open.
+                connection.close()
+
+        missing = [key for key in keys if key not in found]
+        found.update(zip(missing, self._batch_pool.map(describe, missing)))
+
+        return {name: found[normalize_medication_name(name)] for name in medication_names}
+
+    async def adescribe_medication(self, medication_name: str) -> str:
+        """
+        Async counterpart of ``describe_medication`` for ASGI views: same cache
+        tiers and breaker, but the upstream call runs on an ``httpx.AsyncClient``
+        so no thread is held while waiting on Gemini.
+        """
+        key = normalize_medication_name(medication_name)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        return await self._ainflight.do(key, self._aload_description, key, medication_name)
+
+    def cache_stats(self) -> dict:
+        stats = {'memory': self.cache.stats()}
+        with self._stats_lock:
+            stats['store_hits'] = self.store_hits
+            stats['upstream_calls'] = self.upstream_calls
+        stats['coalesced'] = self._inflight.shared + self._ainflight.shared
+        stats['breaker'] = self.breaker.state
+        return stats
+
+    def _stored_description(self):
+        # Imported here so the singleton module stays importable before apps are ready.
+        from .models import MedicationDescription
+        return MedicationDescription.objects.filter(updated_at__gte=timezone.now() - self.store_ttl)
+
+    def _record_store_hit(self, key: str, description: str) -> str:
+        with self._stats_lock:
+            self.store_hits += 1
+        self.cache.set(key, description)
+        return description
+
+    def _load_description(self, key: str, medication_name: str) -> str:
+        from .models import MedicationDescription
+
+        # Another caller may have filled the memory tier while we queued.
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        stored = self._stored_description().filter(
+            normalized_name=key
+        ).values_list('description', flat=True).first()
+        if stored is not None:
+            return self._record_store_hit(key, stored)
+
+        try:
+            generated_text = call_with_retries(
+                lambda: self._fetch_description(medication_name),
+                self.breaker,
+                max_retries=self.max_retries,
+                backoff_base=self.backoff_base,
+                backoff_cap=self.backoff_cap,
+            )
+        except CircuitOpenError:
+            logger.warning("Gemini circuit open; returning fallback description.")
+            return self.fallback_description(medication_name)
+        if not generated_text:
+            logger.warning("No generated text found in the response.")
+            # Not cached, so the next request gets another chance upstream.
+            return self.fallback_description(medication_name)
+
+        MedicationDescription.objects.update_or_create(
+            normalized_name=key, defaults={'description': generated_text}
+        )
+        self.cache.set(key, generated_text)
+        return generated_text
+
+    async def _aload_description(self, key: str, medication_name: str) -> str:
+        from .models import MedicationDescription
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        stored = await self._stored_description().filter(
+            normalized_name=key
+        ).values_list('description', flat=True).afirst()
+        if stored is not None:
+            return self._record_store_hit(key, stored)
+
+        try:
+            generated_text = await acall_with_retries(
+                lambda: self._afetch_description(medication_name),
+                self.breaker,
+                max_retries=self.max_retries,
+                backoff_base=self.backoff_base,
+                backoff_cap=self.backoff_cap,
+            )
+        except CircuitOpenError:
+            logger.warning("Gemini circuit open; returning fallback description.")
+            return self.fallback_description(medication_name)
+        if not generated_text:
+            logger.warning("No generated text found in the response.")
+            return self.fallback_description(medication_name)
+
+        await MedicationDescription.objects.aupdate_or_create(
+            normalized_name=key, defaults={'description': generated_text}
+        )
+        self.cache.set(key, generated_text)
+        return generated_text
+
+    def _build_request(self, medication_name: str):
+        url = f"{self.base_url}?key={getattr(settings, 'GEMINI_API_KEY', '')}"
 
         payload = {
             "contents": [{
@@ -35,11 +244,13 @@ class GeminiClient(metaclass=SingletonMeta):
             "Content-Type": "application/json",
         }
 
-        logger.debug(f"Making request to Gemini API: {url}")
-        resp = requests.post(url, json=payload, headers=headers)
-        resp.raise_for_status()
+        with self._stats_lock:
+            self.upstream_calls += 1
+        logger.debug(f"Making request to Gemini API: {self.base_url}")
+        return url, payload, headers
 
-        data = resp.json()
+    @staticmethod
+    def _parse_response(data: dict) -> str:
         logger.debug(f"Received response from Gemini API: {data}")
 
         # Extract the generated text from the Gemini API response
@@ -52,8 +263,30 @@ class GeminiClient(metaclass=SingletonMeta):
                 # Join all parts' text (if more than one part) or just use the first
                 generated_text = "".join(part.get("text", "") for part in parts).strip()
 
-        if not generated_text:
-            logger.warning("No generated text found in the response.")
-            return f"{medication_name} is a medication used to treat specific conditions."
+        return generated_text
 
-        return generated_text
\ No newline at end of file
+    def _fetch_description(self, medication_name: str) -> str:
+        url, payload, headers = self._build_request(medication_name)
+        with track_http():
+            resp = self.session.post(url, json=payload, headers=headers, timeout=self.timeout)
+        resp.raise_for_status()
+        return self._parse_response(resp.json())
+
+    def _async_client(self):
+        # An httpx.AsyncClient is tied to the event loop it was first used on,
+        # so keep one per running loop.
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = self._async_clients[loop] = build_async_client(
+                pool_size=getattr(settings, 'GEMINI_ASYNC_POOL_SIZE', 100),
+                timeout=self.timeout,
+            )
+        return client
+
+    async def _afetch_description(self, medication_name: str) -> str:
+        url, payload, headers = self._build_request(medication_name)
+        with track_http():
+            resp = await self._async_client().post(url, json=payload, headers=headers)
+        resp.raise_for_status()
+        return self._parse_response(resp.json())
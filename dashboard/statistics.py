@@ -0,0 +1,101 @@
+# dashboard/statistics.py
+"""
+Incrementally maintained counters for the admin dashboard.
+
+Each counter is one ``Statistic`` row, bumped from model signals (see
+signals.py), so reading a total costs one indexed lookup no matter how big
+the underlying tables are. ``reconcile()`` rebuilds every row from scratch.
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.functions import TruncDate, TruncWeek
+from django.utils import timezone
+
+from .models import Statistic, Appointment, Report, SearchPosting
+from .factories import UserProfileFactory
+
+ROLE_MODELS = UserProfileFactory.ROLE_MODELS
+
+
+def count_key(kind):
+    return f"count:{kind}"
+
+
+def appointments_day_key(moment):
+    return f"appointments:day:{timezone.localdate(moment).isoformat()}"
+
+
+def reports_week_key(moment):
+    day = timezone.localdate(moment)
+    return f"reports:week:{(day - timedelta(days=day.weekday())).isoformat()}"
+
+
+def changes_key(role, profile_id):
+    # Per-user change counter behind the dashboard API's ETags; reconcile() keeps these.
+    return f"changes:{role}:{profile_id}"
+
+
+def bump(name, delta=1):
+    """Atomically add ``delta`` to a counter, creating it on first use."""
+    if not delta:
+        return
+    # update() skips auto_now, so updated_at is set explicitly (it is the API's Last-Modified).
+    changes = {'value': F('value') + delta, 'updated_at': timezone.now()}
+    if Statistic.objects.filter(name=name).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            Statistic.objects.create(name=name, value=delta)
+    except IntegrityError:
+        # Someone else created it between our update and insert.
+        Statistic.objects.filter(name=name).update(**changes)
+
+
+def read(*names):
+    """``{name: value}`` for the given counters in one query; missing ones are 0."""
+    values = dict(Statistic.objects.filter(name__in=names).values_list('name', 'value'))
+    return {name: values.get(name, 0) for name in names}
+
+
+def dashboard_counts(now=None):
+    now = now or timezone.now()
+    names = {
+        'total_patients': count_key('patient'),
+        'total_doctors': count_key('doctor'),
+        'total_appointments': count_key('appointment'),
+        'total_reports': count_key('report'),
+        'appointments_today': appointments_day_key(now),
+        'reports_this_week': reports_week_key(now),
+    }
+    values = read(*names.values())
+    return {label: values[name] for label, name in names.items()}
+
+
+@transaction.atomic
+def reconcile():
+    """
+    Recompute every counter from the source tables and replace the stored
+    rows. Per-user change counters are not derived from the tables, so they
+    are left alone. Writes that land while this runs may need another reconcile.
+    Returns the number of counters written.
+    """
+    rows = {count_key(kind): model.objects.count() for kind, model in ROLE_MODELS.items()}
+    rows[count_key('appointment')] = Appointment.objects.count()
+    rows[count_key('report')] = Report.objects.count()
+    rows[count_key('search_document')] = SearchPosting.objects.values('doc_type', 'doc_id').distinct().count()
+
+    per_day = Appointment.objects.annotate(day=TruncDate('appointment_date')).values('day').annotate(n=Count('id'))
+    for row in per_day:
+        rows[f"appointments:day:{row['day'].isoformat()}"] = row['n']
+
+    per_week = Report.objects.annotate(week=TruncWeek('date')).values('week').annotate(n=Count('id'))
+    for row in per_week:
+        rows[reports_week_key(row['week'])] = row['n']
+
+    Statistic.objects.exclude(name__startswith='changes:').delete()
+    Statistic.objects.bulk_create(
+        [Statistic(name=name, value=value) for name, value in rows.items()], batch_size=1000
+    )
+    return len(rows)
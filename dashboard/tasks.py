@@ -0,0 +1,16 @@
+# dashboard/tasks.py
+"""Job types run by the background queue (see jobs.py)."""
+from .jobs import task, report_progress
+from . import deletion
+from .singletons import GeminiClient
+
+
+@task('describe_medications', max_attempts=5)
+def describe_medications(names):
+    return GeminiClient().describe_medications(names)
+
+
+@task('purge_profile', max_attempts=10)
+def purge_profile(role, profile_id):
+    # Resumable: a retry picks up with whatever the last attempt left behind.
+    return deletion.purge(role, profile_id, on_progress=report_progress)
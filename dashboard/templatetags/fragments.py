@@ -0,0 +1,34 @@
+from django import template
+
+from dashboard import dashboard_cache
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        return dashboard_cache.fragment(name, vary_on, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def fragment(parser, token):
+    """
+    Cache the enclosed block until the records it varies on change.
+    Usage: {% fragment "prescriptions" patient %} ... {% endfragment %}
+    Patients and doctors vary by their dashboard generation, "app_label.model"
+    strings by that model's version, and other values by themselves.
+    See dashboard_cache.fragment().
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' takes a fragment name and optional vary-on values.")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(b) for b in bits[2:]])
@@ -0,0 +1,37 @@
+# dashboard/testing.py
+"""Helpers for tests that guard against query regressions."""
+from contextlib import contextmanager
+
+from django.urls import resolve
+
+from .instrumentation import collect_metrics
+
+
+def _budget_failure(label, metrics, budget):
+    lines = [f"{label} ran {metrics.queries} queries, budget is {budget}."]
+    for sql, count in sorted(metrics.duplicates().items(), key=lambda item: -item[1]):
+        lines.append(f"  {count}x {sql}")
+    return '\n'.join(lines)
+
+
+@contextmanager
+def assert_max_queries(budget, label="Block"):
+    """Fail if the enclosed block runs more than ``budget`` queries."""
+    with collect_metrics() as metrics:
+        yield metrics
+    if metrics.queries > budget:
+        raise AssertionError(_budget_failure(label, metrics, budget))
+
+
+def assert_within_query_budget(client, url, method='get', **kwargs):
+    """
+    Request ``url`` with a test client and fail if the view runs more queries
+    than it declared with ``@query_budget``. Returns the response.
+    """
+    view = resolve(url.split('?', 1)[0]).func
+    budget = getattr(view, 'query_budget', None)
+    if budget is None:
+        raise AssertionError(f"{view.__name__} does not declare a @query_budget.")
+    with assert_max_queries(budget, label=view.__name__):
+        response = getattr(client, method)(url, **kwargs)
+    return response
@@ -0,0 +1,54 @@
+# dashboard/tests/base.py
+"""Fixtures shared by the dashboard test modules."""
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+from ..factories import UserProfileFactory
+from ..models import Appointment
+from ..singletons import GeminiClient, SingletonMeta
+
+ROLE_MIDDLEWARE = 'dashboard.roles.RoleMiddleware'
+
+
+def make_profile(role, username, first_name='John', last_name='Smith', **extra):
+    user = User.objects.create_user(username, first_name=first_name, last_name=last_name)
+    if role == 'doctor':
+        extra.setdefault('specialization', 'Cardiology')
+    elif role == 'admin':
+        extra.setdefault('facility_name', 'Facility 1')
+    return UserProfileFactory().create(user, role, **extra)
+
+
+class DashboardTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def login(self, profile):
+        self.client.force_login(profile.user)
+
+    def book(self, doctor, patient, start, minutes=30):
+        return Appointment.objects.create(medical_professional=doctor, patient=patient, appointment_date=start,
+                                          duration_minutes=minutes, reason='Checkup')
+
+
+def next_weekday(days_ahead=7, hour=10):
+    day = timezone.localtime() + timedelta(days=days_ahead)
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day.replace(hour=hour, minute=0, second=0, microsecond=0)
+
+
+def fresh_gemini_client(test):
+    """A GeminiClient built from the current settings, replacing the singleton until ``test`` ends."""
+    patcher = mock.patch.dict(SingletonMeta._instances)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    SingletonMeta._instances.pop(GeminiClient, None)
+    client = GeminiClient()
+    test.addCleanup(client._batch_pool.shutdown)
+    return client
@@ -0,0 +1,99 @@
+import io
+import math
+import random
+from array import array
+from unittest import mock, skipIf
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from .. import analytes
+from ..models import AnalyteSeries
+from .base import DashboardTestCase, make_profile
+
+DAY = 86400
+NAN = float('nan')
+
+
+def make_series(values, lows=None, highs=None, step=DAY):
+    return analytes.Series('GLU', 'mmol/L', array('q', (1_700_000_000 + i * step for i in range(len(values)))),
+                           array('d', values), array('d', lows or [NAN] * len(values)),
+                           array('d', highs or [NAN] * len(values)))
+
+
+class SeriesMathTests(SimpleTestCase):
+    def assert_both_paths(self, check):
+        check()
+        with mock.patch.object(analytes, 'np', None):
+            check()
+
+    def test_trend_is_units_per_day(self):
+        def check():
+            self.assertAlmostEqual(make_series([5.0, 5.5, 6.0, 6.5]).trend(), 0.5)
+            self.assertIsNone(make_series([5.0]).trend())
+            self.assertIsNone(make_series([5.0, 6.0], step=0).trend())
+        self.assert_both_paths(check)
+
+    def test_rolling_mean_is_shorter_at_the_start(self):
+        def check():
+            self.assertEqual(list(make_series([1.0, 2.0, 3.0, 4.0, 5.0]).rolling_mean(3)),
+                             [1.0, 1.5, 2.0, 3.0, 4.0])
+            self.assertEqual(list(make_series([1.0, 2.0]).rolling_mean(5)), [1.0, 1.5])
+        self.assert_both_paths(check)
+
+    def test_missing_bound_never_flags(self):
+        def check():
+            found = make_series([1.0, 5.0, 9.0, 9.0], lows=[2.0, 2.0, 2.0, NAN], highs=[8.0, 8.0, 8.0, NAN])
+            self.assertEqual(found.out_of_range().tolist(), [-1, 0, 1, 0])
+        self.assert_both_paths(check)
+
+    @skipIf(analytes.np is None, "NumPy is not installed.")
+    def test_numpy_matches_pure_python(self):
+        rng = random.Random(7)
+        values = [rng.uniform(50, 150) for _ in range(500)]
+        lows = [rng.choice([70.0, NAN]) for _ in values]
+        highs = [rng.choice([130.0, NAN]) for _ in values]
+        found = make_series(values, lows, highs, step=3600)
+        fast = (found.trend(), found.rolling_mean(7), found.out_of_range())
+        with mock.patch.object(analytes, 'np', None):
+            slow = (found.trend(), found.rolling_mean(7), found.out_of_range())
+        self.assertTrue(math.isclose(fast[0], slow[0], rel_tol=1e-9))
+        self.assertEqual((fast[1].typecode, fast[2].typecode), (slow[1].typecode, slow[2].typecode))
+        for mine, theirs in zip(fast[1], slow[1]):
+            self.assertAlmostEqual(mine, theirs, places=9)
+        self.assertEqual(fast[2], slow[2])
+
+    def test_to_numpy_requires_numpy(self):
+        with mock.patch.object(analytes, 'np', None):
+            with self.assertRaises(ImportError):
+                make_series([1.0]).to_numpy()
+
+
+class AnalyteApiTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_profile('patient', 'pat')
+        feed = "patient,test_date,code,value,unit,reference_low,reference_high\n" + ''.join(
+            f"{self.patient.pk},2024-01-0{day}T08:00:00Z,glu,{value},mmol/L,4,7\n"
+            for day, value in ((1, 5.0), (2, 6.0), (3, 8.0)))
+        with self.captureOnCommitCallbacks(execute=True):
+            analytes.LabFeedImporter().run(io.StringIO(feed), 'csv')
+        self.assertEqual(AnalyteSeries.objects.get().count, 3)
+
+    def test_patient_reads_their_series(self):
+        self.login(self.patient)
+        data = self.client.get(reverse('analyte_series', args=[self.patient.pk, 'glu']), {'window': 2}).json()
+        self.assertAlmostEqual(data['trend_per_day'], 1.5)
+        self.assertEqual([p['rolling_mean'] for p in data['points']], [5.0, 5.5, 7.0])
+        self.assertEqual([p['flag'] for p in data['points']], [0, 0, 1])
+        listing = self.client.get(reverse('patient_analytes', args=[self.patient.pk])).json()['analytes']
+        self.assertEqual(listing, [{'code': 'GLU', 'unit': 'mmol/L', 'count': 3, 'latest': 8.0}])
+
+    def test_errors(self):
+        self.login(self.patient)
+        url = reverse('analyte_series', args=[self.patient.pk, 'glu'])
+        self.assertEqual(self.client.get(url, {'window': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('analyte_series', args=[self.patient.pk, 'hba1c'])).status_code,
+                         404)
+        self.login(make_profile('patient', 'other'))
+        self.assertEqual(self.client.get(url).status_code, 403)
@@ -0,0 +1,44 @@
+from django.urls import reverse
+
+from ..models import Prescription
+from ..testing import assert_max_queries
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class DashboardApiTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.patient = make_profile('patient', 'pat')
+        self.book(self.doctor, self.patient, next_weekday())
+        self.url = reverse('api_patient_dashboard')
+        self.login(self.patient)
+
+    def test_unchanged_dashboard_answers_304(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(len(response.json()['appointments']), 1)
+
+        with assert_max_queries(4):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_change_gives_a_new_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        Prescription.objects.create(patient=self.patient, medical_professional=self.doctor,
+                                    medication_name='Ibuprofen', description='-')
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['prescriptions'][0]['medication'], 'Ibuprofen')
+
+    def test_parameters_are_part_of_the_etag(self):
+        full = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, {'include': 'appointments'}, HTTP_IF_NONE_MATCH=full)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.json()), ['version', 'role', 'changes', 'appointments'])
+
+    def test_other_roles_are_refused(self):
+        self.login(self.doctor)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
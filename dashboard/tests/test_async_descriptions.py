@@ -0,0 +1,47 @@
+import asyncio
+import threading
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..management.commands.gemini_stub import make_server
+from ..models import MedicationDescription
+from .base import fresh_gemini_client
+
+
+class AsyncDescriptionViewTests(TestCase):
+    def setUp(self):
+        server = make_server()
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        host, port = server.server_address[:2]
+        with override_settings(GEMINI_API_URL=f"http://{host}:{port}/", GEMINI_MAX_RETRIES=0):
+            self.gemini = fresh_gemini_client(self)
+        self.url = reverse('generate_drug_description_async')
+
+    async def test_description_comes_from_upstream_then_memory(self):
+        response = await self.async_client.get(self.url, {'medication': 'Ibuprofen'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Ibuprofen', response.json()['description'])
+        await self.async_client.get(self.url, {'medication': ' ibuprofen'})
+        await self.gemini._async_client().aclose()
+
+        stats = self.gemini.cache_stats()
+        self.assertEqual((stats['upstream_calls'], stats['memory']['hits']), (1, 1))
+        self.assertTrue(await MedicationDescription.objects.filter(normalized_name='ibuprofen').aexists())
+
+    async def test_missing_medication_is_a_bad_request(self):
+        with self.assertLogs('dashboard.views', 'ERROR'):
+            response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+
+    def test_http_client_is_shared_within_an_event_loop(self):
+        async def clients():
+            first, second = self.gemini._async_client(), self.gemini._async_client()
+            await first.aclose()
+            return first, second
+
+        first, second = asyncio.run(clients())
+        self.assertIs(first, second)
+        self.assertIsNot(asyncio.run(clients())[0], first)
@@ -0,0 +1,62 @@
+from datetime import timedelta
+
+from ..availability import find_conflict, next_free_slots
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class FindConflictTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.other_doctor = make_profile('doctor', 'doc2')
+        self.patient = make_profile('patient', 'pat')
+        self.other_patient = make_profile('patient', 'pat2')
+        self.start = next_weekday()
+
+    def test_no_conflict(self):
+        self.book(self.doctor, self.patient, self.start - timedelta(minutes=30))
+        self.assertIsNone(find_conflict(self.start, 30, self.doctor, self.patient))
+
+    def test_patient_conflict(self):
+        self.book(self.other_doctor, self.patient, self.start + timedelta(minutes=15))
+        self.assertEqual(find_conflict(self.start, 30, self.doctor, self.patient), 'patient')
+
+    def test_doctor_conflict_wins_over_several_patient_conflicts(self):
+        self.book(self.other_doctor, self.patient, self.start, minutes=60)
+        self.book(self.other_doctor, self.patient, self.start + timedelta(minutes=10))
+        self.book(self.doctor, self.other_patient, self.start + timedelta(minutes=20))
+        self.assertEqual(find_conflict(self.start, 30, self.doctor, self.patient), 'doctor')
+
+    def test_excludes_the_appointment_being_edited(self):
+        appointment = self.book(self.doctor, self.patient, self.start)
+        self.assertEqual(find_conflict(self.start, 30, self.doctor, self.patient), 'doctor')
+        self.assertIsNone(find_conflict(self.start, 30, self.doctor, self.patient, exclude_pk=appointment.pk))
+
+
+class NextFreeSlotsTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.other_doctor = make_profile('doctor', 'doc2')
+        self.patient = make_profile('patient', 'pat')
+        self.opening = next_weekday(hour=9)
+
+    def starts(self, slots):
+        return [(slot['doctor_id'], slot['start'] - self.opening) for slot in slots]
+
+    def test_slots_skip_bookings(self):
+        self.book(self.doctor, self.patient, self.opening + timedelta(hours=1))
+        slots = next_free_slots([self.doctor], count=4, after=self.opening, grid_minutes=15)
+        self.assertEqual(self.starts(slots), [(self.doctor.pk, timedelta(minutes=m)) for m in (0, 15, 30, 90)])
+
+    def test_doctors_are_merged_in_time_order_with_one_query(self):
+        self.book(self.doctor, self.patient, self.opening, minutes=60)
+        with self.assertNumQueries(1):
+            slots = next_free_slots([self.doctor, self.other_doctor.pk], count=4, after=self.opening,
+                                    duration_minutes=60, grid_minutes=30)
+        self.assertEqual(self.starts(slots), [
+            (self.other_doctor.pk, timedelta(0)),
+            (self.other_doctor.pk, timedelta(minutes=30)),
+            (self.doctor.pk, timedelta(hours=1)),
+            (self.other_doctor.pk, timedelta(hours=1)),
+        ])
@@ -0,0 +1,67 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+
+from ..models import Job, MedicationDescription
+from .base import DashboardTestCase, fresh_gemini_client, make_profile
+
+
+class BatchDescriptionTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.gemini = fresh_gemini_client(self)
+        self.patient = make_profile('patient', 'pat')
+        self.url = reverse('generate_drug_descriptions')
+
+    def post(self, payload, query=''):
+        return self.client.post(self.url + query, json.dumps(payload), content_type='application/json')
+
+    def test_anonymous_batches_are_refused(self):
+        response = self.post({'medications': ['Ibuprofen']}, query='?async=1')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Job.objects.exists())
+
+    def test_users_without_a_role_are_refused(self):
+        self.client.force_login(User.objects.create_user('nobody'))
+        self.assertEqual(self.post({'medications': ['Ibuprofen']}).status_code, 403)
+
+    def test_answers_in_request_order(self):
+        self.login(self.patient)
+        descriptions = {'Ibuprofen': 'Pain relief.', 'Amoxicillin': 'An antibiotic.'}
+        with mock.patch.object(self.gemini, 'describe_medications', return_value=descriptions) as describe:
+            response = self.client.get(self.url, {'medication': ['Ibuprofen', ' ', 'Amoxicillin']})
+        describe.assert_called_once_with(['Ibuprofen', 'Amoxicillin'])
+        self.assertEqual(response.json()['descriptions'], [
+            {'medication': 'Ibuprofen', 'description': 'Pain relief.'},
+            {'medication': 'Amoxicillin', 'description': 'An antibiotic.'},
+        ])
+
+    @override_settings(GEMINI_BATCH_MAX=2)
+    def test_oversized_batch_is_a_bad_request(self):
+        self.login(self.patient)
+        self.assertEqual(self.post({'medications': ['a', 'b', 'c']}).status_code, 400)
+        self.assertEqual(self.post({'medications': 'a'}).status_code, 400)
+
+    def test_background_batch_is_visible_to_its_owner_only(self):
+        self.login(self.patient)
+        response = self.post({'medications': ['Ibuprofen']}, query='?async=1')
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.created_by, job.payload), ('describe_medications', self.patient.user,
+                                                                    {'names': ['Ibuprofen']}))
+        self.assertEqual(self.client.get(response.json()['status_url']).json()['status'], Job.QUEUED)
+
+        self.login(make_profile('patient', 'other'))
+        self.assertEqual(self.client.get(response.json()['status_url']).status_code, 404)
+
+    def test_cached_and_stored_names_skip_upstream(self):
+        self.gemini.cache.set('ibuprofen', 'Pain relief.')
+        MedicationDescription.objects.create(normalized_name='amoxicillin', description='An antibiotic.')
+        with mock.patch.object(self.gemini, '_fetch_description') as fetch, self.assertNumQueries(1):
+            found = self.gemini.describe_medications(['IBUPROFEN', 'Amoxicillin', 'ibuprofen'])
+        fetch.assert_not_called()
+        self.assertEqual(found, {'IBUPROFEN': 'Pain relief.', 'Amoxicillin': 'An antibiotic.',
+                                 'ibuprofen': 'Pain relief.'})
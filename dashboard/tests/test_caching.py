@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase
+
+from ..caching import AsyncSingleFlight, LRUCache, SingleFlight
+from ..models import MedicationDescription
+from ..singletons import GeminiClient
+from .base import fresh_gemini_client
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual((cache.get('a'), cache.get('b'), cache.get('c')), (1, None, 3))
+        self.assertEqual(cache.evictions, 1)
+
+    def test_entries_expire_after_ttl(self):
+        clock = FakeClock()
+        cache = LRUCache(ttl=10, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2, ttl=60)
+        clock.now = 10
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('b'), 2)
+        self.assertEqual(len(cache), 1)
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['hit_rate']), (1, 1, 0.5))
+
+
+class SingleFlightTests(SimpleTestCase):
+    def test_concurrent_callers_share_one_call(self):
+        flight = SingleFlight()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def load():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return 'value'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('k', load))) for _ in range(3)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        while flight.shared < 2:
+            threading.Event().wait(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual((len(calls), results), (1, ['value'] * 3))
+
+    def test_async_callers_share_one_call_and_its_error(self):
+        flight = AsyncSingleFlight()
+        calls = []
+
+        async def load(fail):
+            calls.append(1)
+            await asyncio.sleep(0)
+            if fail:
+                raise ValueError("upstream")
+            return 'value'
+
+        async def run(fail):
+            return await asyncio.gather(*(flight.do('k', load, fail) for _ in range(3)), return_exceptions=True)
+
+        self.assertEqual(asyncio.run(run(False)), ['value'] * 3)
+        errors = asyncio.run(run(True))
+        self.assertEqual([type(e) for e in errors], [ValueError] * 3)
+        self.assertEqual((len(calls), flight.shared), (2, 4))
+
+
+class DescriptionTierTests(TestCase):
+    def setUp(self):
+        self.client = fresh_gemini_client(self)
+
+    def test_stored_description_is_served_without_upstream(self):
+        MedicationDescription.objects.create(normalized_name='ibuprofen', description='Pain relief.')
+        with mock.patch.object(self.client, '_fetch_description') as fetch:
+            self.assertEqual(self.client.describe_medication('  IBUPROFEN '), 'Pain relief.')
+            with self.assertNumQueries(0):
+                self.assertEqual(self.client.describe_medication('ibuprofen'), 'Pain relief.')
+        fetch.assert_not_called()
+        self.assertEqual(self.client.cache_stats()['store_hits'], 1)
+
+    def test_upstream_answer_is_stored_for_other_processes(self):
+        with mock.patch.object(self.client, '_fetch_description', return_value='An antibiotic.') as fetch:
+            self.assertEqual(self.client.describe_medication('Amoxicillin'), 'An antibiotic.')
+        fetch.assert_called_once_with('Amoxicillin')
+        self.assertEqual(MedicationDescription.objects.get(normalized_name='amoxicillin').description,
+                         'An antibiotic.')
+
+    def test_empty_upstream_answer_is_not_cached(self):
+        with mock.patch.object(self.client, '_fetch_description', return_value='') as fetch, \
+                self.assertLogs('dashboard.singletons', 'WARNING'):
+            self.assertEqual(self.client.describe_medication('Xyz'), GeminiClient.fallback_description('Xyz'))
+            self.client.describe_medication('Xyz')
+        self.assertEqual(fetch.call_count, 2)
+        self.assertFalse(MedicationDescription.objects.exists())
@@ -0,0 +1,43 @@
+from django.core.cache import cache
+
+from .. import dashboard_cache
+from ..models import Prescription
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class DashboardCacheTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.patient = make_profile('patient', 'pat')
+
+    def test_dashboards_are_cached_until_a_record_changes(self):
+        self.book(self.doctor, self.patient, next_weekday())
+        self.assertEqual(len(dashboard_cache.patient_context(self.patient)['upcoming_appointments']), 1)
+        self.assertEqual(len(dashboard_cache.doctor_context(self.doctor)['upcoming_appointments']), 1)
+        with self.assertNumQueries(0):
+            dashboard_cache.patient_context(self.patient)
+            dashboard_cache.doctor_context(self.doctor)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.doctor, self.patient, next_weekday(days_ahead=8))
+            Prescription.objects.create(patient=self.patient, medical_professional=self.doctor,
+                                        medication_name='Ibuprofen', description='-')
+        context = dashboard_cache.patient_context(self.patient)
+        self.assertEqual((len(context['upcoming_appointments']), len(context['prescriptions'])), (2, 1))
+        self.assertEqual(len(dashboard_cache.doctor_context(self.doctor)['upcoming_appointments']), 2)
+
+    def test_invalidation_is_per_user(self):
+        other = make_profile('patient', 'other')
+        for patient in (self.patient, other):
+            dashboard_cache.cached('patient', patient.pk, 'probe', lambda: 'old')
+        dashboard_cache.invalidate('patient', self.patient.pk)
+        self.assertEqual(dashboard_cache.cached('patient', self.patient.pk, 'probe', lambda: 'new'), 'new')
+        self.assertEqual(dashboard_cache.cached('patient', other.pk, 'probe', lambda: 'new'), 'old')
+
+    def test_evicted_generation_does_not_revive_old_entries(self):
+        first = dashboard_cache.cached('patient', self.patient.pk, 'probe', lambda: 'old')
+        dashboard_cache.invalidate('patient', self.patient.pk)
+        cache.delete(dashboard_cache._generation_key('patient', self.patient.pk))
+        self.assertEqual(first, 'old')
+        self.assertEqual(dashboard_cache.cached('patient', self.patient.pk, 'probe', lambda: 'new'), 'new')
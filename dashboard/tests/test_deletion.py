@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from .. import deletion, statistics
+from ..jobs import run_pending
+from ..models import Appointment, Job, Patient, Report, Statistic
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class PurgeTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.other_doctor = make_profile('doctor', 'doc2')
+        self.patient = make_profile('patient', 'pat')
+        self.keeper = make_profile('patient', 'keeper')
+        start = next_weekday()
+        for i in range(3):
+            self.book(self.doctor, self.patient, start + timedelta(hours=i))
+            self.book(self.other_doctor, self.patient, start + timedelta(days=1, hours=i))
+            Report.objects.create(title=f"Report {i}", summary='-', patient=self.patient,
+                                  medical_professional=self.doctor)
+        self.book(self.doctor, self.keeper, start + timedelta(days=2))
+        Report.objects.create(title='Kept', summary='-', patient=self.keeper, medical_professional=self.doctor)
+
+    def counters(self):
+        # Counters that went to zero may linger as rows; reconcile() just omits them.
+        return dict(Statistic.objects.exclude(name__startswith='changes:').exclude(value=0).values_list(
+            'name', 'value'))
+
+    def changes(self, role, profile):
+        return statistics.read(statistics.changes_key(role, profile.pk))[statistics.changes_key(role, profile.pk)]
+
+    def test_counters_match_reconcile_after_purge(self):
+        deletion.soft_delete(self.patient)
+        deletion.purge('patient', self.patient.pk, batch_size=2)
+        maintained = self.counters()
+        statistics.reconcile()
+        self.assertEqual(maintained, self.counters())
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(list(Report.objects.values_list('title', flat=True)), ['Kept'])
+
+    def test_interrupted_purge_still_bumps_counterparts(self):
+        before = {doctor.pk: self.changes('doctor', doctor) for doctor in (self.doctor, self.other_doctor)}
+        deletion.soft_delete(self.patient)
+
+        def stop_after_first_batch(progress):
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            deletion.purge('patient', self.patient.pk, batch_size=6, on_progress=stop_after_first_batch)
+        # Both doctors' appointments were in the batch that committed.
+        for doctor in (self.doctor, self.other_doctor):
+            self.assertGreater(self.changes('doctor', doctor), before[doctor.pk])
+
+        deletion.purge('patient', self.patient.pk, batch_size=6)
+        maintained = self.counters()
+        statistics.reconcile()
+        self.assertEqual(maintained, self.counters())
+
+    def test_admin_delete_hides_now_and_purges_in_the_background(self):
+        self.login(make_profile('admin', 'admin'))
+        url = reverse('admin_delete_patient', args=[self.patient.pk])
+        self.assertRedirects(self.client.post(url), reverse('admin_patients'))
+        # Already hidden, so a double submit finds nothing to delete.
+        self.assertEqual(self.client.post(url).status_code, 404)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.payload),
+                         ('purge_profile', {'role': 'patient', 'profile_id': self.patient.pk}))
+        self.assertFalse(Patient.objects.filter(pk=self.patient.pk).exists())
+        self.assertEqual(Appointment.objects.count(), 7)
+
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertFalse(Patient.all_objects.filter(pk=self.patient.pk).exists())
+        self.assertFalse(User.objects.filter(pk=self.patient.user_id).exists())
@@ -0,0 +1,58 @@
+import csv
+import io
+import json
+
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import deletion, exports
+from ..models import Prescription, Report, TestResult
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class ExportTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.patient = make_profile('patient', 'pat')
+        self.appointment = self.book(self.doctor, self.patient, next_weekday())
+        self.report = Report.objects.create(title='Checkup', summary='Fine', patient=self.patient,
+                                            medical_professional=self.doctor)
+        self.result = TestResult.objects.create(patient=self.patient, test_date=timezone.now(),
+                                                description='Lipids', result_data='LDL 100')
+
+    def exported(self, **kwargs):
+        return [(r['record_type'], r['id']) for r in exports.iter_records(**kwargs)]
+
+    def test_every_record_type_is_exported(self):
+        prescription = Prescription.objects.create(patient=self.patient, medical_professional=self.doctor,
+                                                   medication_name='Ibuprofen', description='-')
+        with self.assertNumQueries(len(exports.RECORD_SOURCES)):
+            records = self.exported(chunk_size=1)
+        self.assertEqual(records, [
+            ('patient', self.patient.pk), ('appointment', self.appointment.pk),
+            ('prescription', prescription.pk), ('report', self.report.pk), ('test_result', self.result.pk),
+        ])
+
+    def test_soft_deleted_patients_are_left_out(self):
+        other = make_profile('patient', 'other')
+        kept = self.book(self.doctor, other, next_weekday(days_ahead=8))
+        deletion.soft_delete(self.patient)
+        self.assertEqual(self.exported(), [('patient', other.pk), ('appointment', kept.pk)])
+
+    def test_soft_deleted_doctors_records_are_left_out(self):
+        deletion.soft_delete(self.doctor)
+        # The test result has no doctor, so it stays.
+        self.assertEqual(self.exported(), [('patient', self.patient.pk), ('test_result', self.result.pk)])
+
+    def test_facility_export_streams_csv_and_ndjson(self):
+        self.login(make_profile('admin', 'admin'))
+        response = self.client.get(reverse('admin_export_facility'))
+        rows = list(csv.DictReader(io.StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual([row['record_type'] for row in rows], ['patient', 'appointment', 'report', 'test_result'])
+        self.assertEqual(rows[2]['title'], 'Checkup')
+
+        response = self.client.get(reverse('admin_export_facility'), {'format': 'ndjson'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[0])['title'], 'John Smith')
+        self.assertEqual(self.client.get(reverse('admin_export_facility'), {'format': 'xml'}).status_code, 400)
@@ -0,0 +1,69 @@
+from django.test import modify_settings
+from django.urls import reverse
+
+from .. import dashboard_cache
+from ..models import Prescription, Report
+from .base import ROLE_MIDDLEWARE, DashboardTestCase, make_profile
+
+
+@modify_settings(MIDDLEWARE={'append': ROLE_MIDDLEWARE})
+class FragmentCacheTests(DashboardTestCase):
+    """Cached template fragments never show one patient another's records."""
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'house', first_name='Gregory', last_name='House')
+        # Same names, so the two profiles also look the same when printed.
+        self.first = make_profile('patient', 'smith1')
+        self.second = make_profile('patient', 'smith2')
+        for patient, label in ((self.first, 'Alpha'), (self.second, 'Bravo')):
+            Report.objects.create(title=f"{label} report", summary='-', patient=patient,
+                                  medical_professional=self.doctor)
+            Prescription.objects.create(patient=patient, medical_professional=self.doctor,
+                                        medication_name=f"{label}amol", description='-')
+
+    def assert_isolated(self, url, first, second):
+        self.login(self.first)
+        self.assertContains(self.client.get(url), first)
+        self.login(self.second)
+        response = self.client.get(url)
+        self.assertContains(response, second)
+        self.assertNotContains(response, first)
+
+    def test_same_named_patients_see_their_own_reports(self):
+        self.assert_isolated(reverse('patient_view_reports'), 'Alpha report', 'Bravo report')
+
+    def test_same_named_patients_see_their_own_prescriptions(self):
+        self.assert_isolated(reverse('patient_prescriptions'), 'Alphaamol', 'Bravoamol')
+
+    def test_new_record_shows_up_immediately(self):
+        self.login(self.first)
+        url = reverse('patient_view_reports')
+        self.assertNotContains(self.client.get(url), 'Follow-up')
+        with self.captureOnCommitCallbacks(execute=True):
+            Report.objects.create(title='Follow-up', summary='-', patient=self.first,
+                                  medical_professional=self.doctor)
+        self.assertContains(self.client.get(url), 'Follow-up')
+
+
+@modify_settings(MIDDLEWARE={'remove': ROLE_MIDDLEWARE})
+class FragmentCacheWithoutRoleMiddlewareTests(FragmentCacheTests):
+    pass
+
+
+class FragmentVersionTests(DashboardTestCase):
+    def test_model_version_invalidates(self):
+        renders = []
+
+        def render():
+            renders.append(1)
+            return f"render {len(renders)}"
+
+        self.assertEqual(dashboard_cache.fragment('f', ['dashboard.report', 2], render), 'render 1')
+        self.assertEqual(dashboard_cache.fragment('f', ['dashboard.report', 2], render), 'render 1')
+        self.assertEqual(dashboard_cache.fragment('f', ['dashboard.report', 3], render), 'render 2')
+        dashboard_cache.invalidate_model('dashboard.report')
+        self.assertEqual(dashboard_cache.fragment('f', ['dashboard.report', 2], render), 'render 3')
+
+    def test_unsupported_vary_on_value_is_refused(self):
+        with self.assertRaises(TypeError):
+            dashboard_cache.fragment('f', [object()], lambda: '')
@@ -0,0 +1,77 @@
+from unittest import mock
+
+from django.test import override_settings
+from django.urls import reverse
+
+from ..geocoding import GeocodingService, LocalGeocoderBackend
+from ..models import GeocodedAddress
+from ..singletons import SingletonMeta
+from .base import DashboardTestCase, make_profile
+
+
+class CountingBackend(LocalGeocoderBackend):
+    calls = []
+
+    def geocode(self, address):
+        self.calls.append(('geocode', address))
+        if 'nowhere' in address.lower():
+            return None
+        return super().geocode(address)
+
+    def search_pharmacies(self, bbox):
+        self.calls.append(('pharmacies', bbox))
+        return super().search_pharmacies(bbox)
+
+
+@override_settings(GEOCODER_BACKEND='dashboard.tests.test_geocoding.CountingBackend')
+class GeocodingServiceTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(SingletonMeta._instances)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        CountingBackend.calls = []
+        self.service = self.restart()
+
+    def restart(self):
+        # A new process: empty memory tier, same table.
+        SingletonMeta._instances.pop(GeocodingService, None)
+        service = GeocodingService()
+        self.addCleanup(service._prefetch_pool.shutdown)
+        return service
+
+    def backend_calls(self, kind):
+        return [args for call, args in CountingBackend.calls if call == kind]
+
+    def test_address_spellings_share_one_lookup(self):
+        first = self.service.geocode('1 Main St, Springfield')
+        self.assertEqual(self.service.geocode('  1 MAIN st springfield '), first)
+        self.assertEqual(self.restart().geocode('1 Main St Springfield'), first)
+        self.assertEqual(self.backend_calls('geocode'), ['1 Main St, Springfield'])
+
+    def test_unknown_address_is_remembered_as_a_miss(self):
+        self.assertIsNone(self.service.geocode('Nowhere Lane'))
+        self.assertIsNone(self.service.geocode('nowhere lane'))
+        self.assertIsNone(self.restart().geocode('Nowhere Lane'))
+        self.assertEqual(len(self.backend_calls('geocode')), 1)
+        self.assertIsNone(GeocodedAddress.objects.get().latitude)
+
+    def test_nearby_centers_share_a_pharmacy_search(self):
+        first = self.service.find_pharmacies(40.7128, -74.0060)
+        self.assertEqual(self.service.find_pharmacies(40.7131, -74.0059), first)
+        self.assertEqual(self.restart().find_pharmacies(40.7128, -74.0060), first)
+        self.assertNotEqual(self.service.find_pharmacies(40.7528, -74.0060), first)
+        self.assertEqual(len(self.backend_calls('pharmacies')), 2)
+
+    def test_pharmacy_search_view(self):
+        patient = make_profile('patient', 'pat')
+        url = reverse('pharmacy_search')
+        self.login(patient)
+        response = self.client.get(url, {'address': '1 Main St, Springfield'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['pharmacies']), 5)
+        self.assertEqual(self.client.get(url, {'address': 'Nowhere Lane'}).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 400)
+
+        self.login(make_profile('doctor', 'doc'))
+        self.assertEqual(self.client.get(url, {'address': '1 Main St'}).status_code, 403)
@@ -0,0 +1,76 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from django.urls import reverse
+
+from .. import statistics
+from ..importers import PatientImporter, detect_format
+from ..models import Patient
+from ..testing import assert_max_queries
+from .base import DashboardTestCase, make_profile
+
+HEADER = "username,email,first_name,last_name,password,date_of_birth,address,phone_number\n"
+
+
+def csv_rows(count, start=0):
+    return HEADER + ''.join(f"user{i},user{i}@example.com,First{i},Last{i},,1990-01-0{i % 9 + 1},,\n"
+                            for i in range(start, start + count))
+
+
+class PatientImporterTests(DashboardTestCase):
+    def run_import(self, text, fmt='csv', **options):
+        errors = []
+        result = PatientImporter(on_error=lambda line, message: errors.append(line), **options).run(
+            io.StringIO(text), fmt)
+        return result, errors
+
+    def test_bad_rows_are_reported_and_skipped(self):
+        make_profile('patient', 'taken')
+        text = HEADER + (
+            "alice,alice@example.com,Alice,A,,1990-01-01,1 Main St,555\n"
+            "bob,not-an-email,Bob,B,,,,\n"
+            "alice,alice2@example.com,Alice,Again,,,,\n"
+            "taken,,,,,,,\n"
+            "carol,,Carol,C,,1985-13-01,,\n"
+            "dave,,Dave,D,,,,\n"
+        )
+        result, errors = self.run_import(text, batch_size=2)
+        self.assertEqual((result.created, result.failed), (2, 4))
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5, 6])
+        self.assertEqual(errors, [3, 4, 5, 6])
+        alice = Patient.objects.select_related('user').get(user__username='alice')
+        self.assertEqual((alice.user.first_name, alice.address, str(alice.date_of_birth)),
+                         ('Alice', '1 Main St', '1990-01-01'))
+        self.assertFalse(alice.user.has_usable_password())
+        self.assertEqual(statistics.read(statistics.count_key('patient'))[statistics.count_key('patient')], 3)
+
+    def test_json_lines(self):
+        text = '{"username": "erin"}\n\nnot json\n["a list"]\n{"username": "frank", "email": "f@example.com"}\n'
+        result, errors = self.run_import(text, fmt=detect_format('patients.jsonl'))
+        self.assertEqual((result.created, errors), (2, [3, 4]))
+        self.assertEqual(set(User.objects.values_list('username', flat=True)), {'erin', 'frank'})
+
+    def test_queries_grow_with_batches_not_rows(self):
+        make_profile('patient', 'existing')  # so both runs bump an existing counter
+        with assert_max_queries(20) as small:
+            self.run_import(csv_rows(5), batch_size=50)
+        with assert_max_queries(20) as large:
+            self.run_import(csv_rows(40, start=5), batch_size=50)
+        self.assertEqual(small.queries, large.queries)
+        self.assertEqual(Patient.objects.count(), 46)
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+    def test_passwords_are_hashed_on_request(self):
+        text = HEADER + "gina,,,,s3cret-pass,,,\nhank,,,,,,,\n"
+        self.run_import(text, hash_passwords=True, hash_workers=2)
+        self.assertTrue(User.objects.get(username='gina').check_password('s3cret-pass'))
+        self.assertFalse(User.objects.get(username='hank').has_usable_password())
+
+    def test_admin_upload(self):
+        self.login(make_profile('admin', 'admin'))
+        upload = SimpleUploadedFile('patients.csv', csv_rows(3).encode('utf-8-sig'))
+        response = self.client.post(reverse('admin_import_patients'), {'file': upload, 'format': 'auto'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.context['result'].created, response.context['result'].failed), (3, 0))
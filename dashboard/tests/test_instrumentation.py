@@ -0,0 +1,76 @@
+import json
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+
+from django.template import Context, Template
+from django.template.loader_tags import BlockNode
+from django.test import SimpleTestCase, modify_settings, override_settings
+from django.urls import reverse
+
+from .. import instrumentation
+from .base import DashboardTestCase, fresh_gemini_client, make_profile
+
+METRICS_MIDDLEWARE = instrumentation.MIDDLEWARE_PATH
+
+
+class TemplateProfilingTests(SimpleTestCase):
+    def setUp(self):
+        original = Template._render, BlockNode.render
+
+        def restore():
+            Template._render, BlockNode.render = original
+        self.addCleanup(restore)
+
+    def test_enabled_by_the_middleware_or_the_setting(self):
+        with modify_settings(MIDDLEWARE={'remove': METRICS_MIDDLEWARE}):
+            self.assertFalse(instrumentation.template_profiling_enabled())
+            with override_settings(TEMPLATE_PROFILING=True):
+                self.assertTrue(instrumentation.template_profiling_enabled())
+        with modify_settings(MIDDLEWARE={'append': METRICS_MIDDLEWARE}):
+            self.assertTrue(instrumentation.template_profiling_enabled())
+            with override_settings(TEMPLATE_PROFILING=False):
+                self.assertFalse(instrumentation.template_profiling_enabled())
+
+    def test_install_is_idempotent(self):
+        # Installing twice must not time each render twice.
+        instrumentation.install_template_profiling()
+        instrumentation.install_template_profiling()
+        self.assertIs(Template._render, instrumentation._timed_template_render)
+        template = Template("{% block body %}{{ name }}{% endblock %}")
+        with instrumentation.collect_metrics() as metrics:
+            self.assertEqual(template.render(Context({'name': 'x'})), 'x')
+        self.assertEqual(metrics.templates['<string>'][0], 1)
+        self.assertEqual(metrics.blocks['body'][0], 1)
+
+
+@modify_settings(MIDDLEWARE={'append': METRICS_MIDDLEWARE})
+class RequestMetricsMiddlewareTests(DashboardTestCase):
+    @override_settings(DEBUG=True)
+    def test_request_is_logged_with_its_query_count(self):
+        self.login(make_profile('admin', 'admin'))
+        with self.assertLogs('dashboard.instrumentation', 'INFO') as logs:
+            response = self.client.get(reverse('admin_patients'))
+        data = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(data['view'], 'admin_patients')
+        self.assertEqual(response['X-Query-Count'], str(data['queries']))
+        self.assertGreater(data['queries'], 0)
+
+    def test_async_stack_stays_async(self):
+        async def get_response(request):
+            return None
+        self.assertTrue(iscoroutinefunction(instrumentation.RequestMetricsMiddleware(get_response)))
+        self.assertFalse(iscoroutinefunction(instrumentation.RequestMetricsMiddleware(lambda request: None)))
+
+    async def test_async_view_queries_are_counted(self):
+        gemini = fresh_gemini_client(self)
+        fetch = mock.AsyncMock(return_value='Pain relief.')
+        with mock.patch.object(gemini, '_afetch_description', fetch), \
+                self.assertLogs('dashboard.instrumentation', 'INFO') as logs:
+            response = await self.async_client.get(reverse('generate_drug_description_async'),
+                                                   {'medication': 'Ibuprofen'})
+        self.assertEqual(response.json()['description'], 'Pain relief.')
+        data = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(data['view'], 'generate_drug_description_async')
+        # The stored-description lookup and the write-back, both from the async ORM.
+        self.assertGreaterEqual(data['queries'], 2)
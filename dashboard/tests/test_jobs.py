@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from ..jobs import Worker, enqueue, requeue_stale, task
+from ..models import Job
+from .base import DashboardTestCase
+
+
+_flaky_calls = []
+
+
+@task('tests.flaky', max_attempts=2)
+def flaky(fail_times=1):
+    _flaky_calls.append(1)
+    if len(_flaky_calls) <= fail_times:
+        raise RuntimeError("Upstream hiccup")
+    return {'calls': len(_flaky_calls)}
+
+
+class JobQueueTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        _flaky_calls.clear()
+
+    def make_due(self, job):
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+
+    def test_claim_is_exclusive(self):
+        job = enqueue('tests.flaky')
+        first, second = Worker('first'), Worker('second')
+        self.assertTrue(first._take(job.pk, timezone.now()))
+        self.assertFalse(second._take(job.pk, timezone.now()))
+        self.assertIsNone(second.claim())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.attempts), (Job.RUNNING, 'first', 1))
+
+    def test_failure_is_retried_later(self):
+        job = enqueue('tests.flaky')
+        worker = Worker('w')
+        worker.run_one()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Upstream hiccup', job.error)
+        self.assertIsNone(worker.claim(), "A retry must wait for its backoff.")
+
+        self.make_due(job)
+        worker.run_one()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, job.result), (Job.SUCCEEDED, 2, {'calls': 2}))
+
+    def test_gives_up_after_max_attempts(self):
+        job = enqueue('tests.flaky', {'fail_times': 5})
+        worker = Worker('w')
+        worker.run_one()
+        self.make_due(job)
+        worker.run_one()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertIsNotNone(job.finished_at)
+
+    def test_idempotency_key_enqueues_once(self):
+        first = enqueue('tests.flaky', idempotency_key='once')
+        self.assertEqual(enqueue('tests.flaky', idempotency_key='once').pk, first.pk)
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_outcome_is_dropped_when_the_claim_was_lost(self):
+        job = enqueue('tests.flaky', {'fail_times': 0})
+        slow = Worker('slow')
+        self.assertTrue(slow._take(job.pk, timezone.now()))
+        # The lease runs out and another worker takes the job over.
+        self.assertEqual(requeue_stale(timezone.now() + timedelta(days=1)), 1)
+        self.assertTrue(Worker('fast')._take(job.pk, timezone.now()))
+
+        with self.assertLogs('dashboard.jobs', 'WARNING'):
+            slow.execute(Job.objects.get(pk=job.pk))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by, job.result), (Job.RUNNING, 'fast', None))
@@ -0,0 +1,43 @@
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Report
+from ..pagination import InvalidCursor, KeysetPaginator
+from .base import DashboardTestCase, make_profile
+
+
+class KeysetPaginationTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        # Equal dates, so the id tie-breaker decides the order.
+        Report.objects.bulk_create([Report(title=f"Report {i}", summary='-') for i in range(7)])
+        Report.objects.update(date=timezone.now())
+        self.expected = list(Report.objects.order_by('-date', '-id').values_list('id', flat=True))
+
+    def paginator(self):
+        return KeysetPaginator(Report.objects.all(), ('-date', '-id'), page_size=3)
+
+    def test_walks_forward_then_back(self):
+        paginator = self.paginator()
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_cursor))
+        self.assertEqual([r.id for page in pages for r in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous)
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual([r.id for r in back], self.expected[3:6])
+        back = paginator.page(back.previous_cursor)
+        self.assertEqual([r.id for r in back], self.expected[:3])
+        self.assertFalse(back.has_previous)
+
+    def test_rejects_malformed_cursor(self):
+        for cursor in ('not-a-cursor', 'eyJkIjoibiJ9', 'eyJkIjoieCIsInYiOlsxLDJdfQ'):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                self.paginator().page(cursor)
+
+    def test_list_view_falls_back_to_first_page(self):
+        self.client.force_login(make_profile('admin', 'admin').user)
+        response = self.client.get(reverse('admin_reports'), {'cursor': 'garbage', 'page_size': 3})
+        self.assertEqual([r.id for r in response.context['page']], self.expected[:3])
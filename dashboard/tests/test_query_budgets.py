@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.test import modify_settings
+from django.urls import reverse
+
+from ..models import Report
+from ..testing import assert_max_queries, assert_within_query_budget
+from .base import ROLE_MIDDLEWARE, DashboardTestCase, make_profile, next_weekday
+
+
+# The declared budgets assume the role comes from the session, not from a query.
+@modify_settings(MIDDLEWARE={'append': ROLE_MIDDLEWARE})
+class QueryBudgetTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = make_profile('admin', 'admin')
+        doctors = [make_profile('doctor', f"doc{i}", last_name=f"Doc{i}") for i in range(3)]
+        patients = [make_profile('patient', f"pat{i}", last_name=f"Pat{i}") for i in range(5)]
+        start = next_weekday()
+        for i, patient in enumerate(patients):
+            self.book(doctors[i % 3], patient, start + timedelta(hours=i))
+            Report.objects.create(title=f"Report {i}", summary='-', patient=patient, medical_professional=doctors[0])
+        self.doctor, self.patient = doctors[0], patients[0]
+
+    def test_admin_lists_stay_within_budget(self):
+        self.login(self.admin)
+        for name in ('admin_patients', 'admin_doctors', 'admin_appointments', 'admin_reports', 'admin_dashboard'):
+            with self.subTest(view=name):
+                response = assert_within_query_budget(self.client, reverse(name))
+                self.assertEqual(response.status_code, 200)
+
+    def test_budget_does_not_grow_with_rows(self):
+        self.login(self.admin)
+        url = reverse('admin_appointments') + '?page_size=50'
+        with assert_max_queries(10) as small:
+            self.client.get(url)
+        start = next_weekday(days_ahead=14)
+        for i in range(20):
+            self.book(self.doctor, self.patient, start + timedelta(hours=i))
+        with assert_max_queries(10) as large:
+            self.client.get(url)
+        self.assertEqual(small.queries, large.queries)
+
+    def test_role_dashboards_stay_within_budget(self):
+        for profile in (self.patient, self.doctor):
+            with self.subTest(role=type(profile).__name__):
+                self.login(profile)
+                response = assert_within_query_budget(self.client, reverse('dashboard'))
+                self.assertEqual(response.status_code, 200)
@@ -0,0 +1,60 @@
+from datetime import timedelta
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.utils import timezone
+
+from .. import reminders
+from ..models import Reminder
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class _RecordingBackend(reminders.ReminderBackend):
+    def __init__(self):
+        self.sent = []
+
+    def send(self, message):
+        self.sent.append(message.key)
+
+
+class ReminderClaimTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.book(make_profile('doctor', 'doc'), make_profile('patient', 'pat'), next_weekday())
+        Reminder.objects.update(due_at=timezone.now() - timedelta(minutes=1))
+
+    def test_lost_claim_is_not_sent(self):
+        backend = _RecordingBackend()
+        scheduler = reminders.Scheduler('a', backend=backend)
+        scheduler.refill(timezone.now())
+        claimed = scheduler.claim()
+        self.assertTrue(claimed)
+        # The lease ran out and another scheduler took the reminders over.
+        Reminder.objects.update(locked_by='b:other-token')
+        self.assertEqual([scheduler.deliver(r) for r in claimed], [None] * len(claimed))
+        self.assertEqual(backend.sent, [])
+
+    def test_each_reminder_is_sent_once(self):
+        backend = _RecordingBackend()
+        first = reminders.Scheduler('a', backend=backend)
+        second = reminders.Scheduler('b', backend=backend)
+        for scheduler in (first, second):
+            scheduler.refill(timezone.now())
+        for reminder in first.claim() + second.claim():
+            first.deliver(reminder)
+        self.assertEqual(sorted(backend.sent), sorted(f"reminder:{pk}" for pk in Reminder.objects.values_list(
+            'pk', flat=True)))
+        self.assertEqual(set(Reminder.objects.values_list('status', flat=True)), {Reminder.SENT})
+
+
+
+
+class ReminderBackfillTests(DashboardTestCase):
+    def test_backfill_does_not_follow_app_defaults(self):
+        migration = import_module('dashboard.migrations.0013_reminder')
+        self.book(make_profile('doctor', 'doc'), make_profile('patient', 'pat'), next_weekday())
+        Reminder.objects.all().delete()
+        with mock.patch.object(reminders, 'DEFAULT_LEAD_MINUTES', (5,)):
+            migration.schedule_reminders(apps, None)
+        self.assertEqual(sorted(Reminder.objects.values_list('lead_minutes', flat=True)), [60, 24 * 60])
@@ -0,0 +1,42 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.sessions.backends.db import SessionStore
+from django.http import HttpResponse
+from django.test import RequestFactory, modify_settings
+from django.urls import reverse
+
+from .. import deletion
+from ..roles import RoleMiddleware
+from .base import ROLE_MIDDLEWARE, DashboardTestCase, make_profile
+
+
+class RoleMiddlewareTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.patient = make_profile('patient', 'pat')
+
+    def test_deactivated_user_with_a_session_is_logged_out(self):
+        self.login(self.patient)
+        deletion.soft_delete(self.patient)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 302)
+
+    @modify_settings(MIDDLEWARE={'remove': ROLE_MIDDLEWARE})
+    def test_roles_resolve_without_the_middleware(self):
+        self.login(self.patient)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'dashboard/patient_dashboard.html')
+
+    async def test_async_stack_resolves_the_role(self):
+        seen = []
+
+        async def view(request):
+            seen.append((request.role, request.profile_id))
+            return HttpResponse()
+
+        middleware = RoleMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        request = RequestFactory().get('/')
+        request.session, request.user = SessionStore(), self.patient.user
+        await middleware(request)
+        self.assertEqual(seen, [('patient', self.patient.pk)])
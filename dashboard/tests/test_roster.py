@@ -0,0 +1,63 @@
+from datetime import timedelta
+
+from .. import roster
+from ..models import MedicalProfessionalPatient, RosterEntry
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class RosterTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.other_doctor = make_profile('doctor', 'doc2')
+        self.patient = make_profile('patient', 'pat')
+        self.start = next_weekday()
+
+    def entries(self):
+        return set(RosterEntry.objects.values_list('medical_professional_id', 'patient_id', 'assigned',
+                                                   'appointment_count'))
+
+    def test_shared_appointments_put_a_patient_on_the_roster(self):
+        first = self.book(self.doctor, self.patient, self.start)
+        second = self.book(self.doctor, self.patient, self.start + timedelta(days=1))
+        self.assertEqual(self.entries(), {(self.doctor.pk, self.patient.pk, False, 2)})
+        first.delete()
+        self.assertTrue(roster.contains(self.doctor.pk, self.patient.pk))
+        second.delete()
+        self.assertEqual(self.entries(), set())
+
+    def test_reassigned_appointment_moves_between_rosters(self):
+        appointment = self.book(self.doctor, self.patient, self.start)
+        appointment.medical_professional = self.other_doctor
+        appointment.save()
+        self.assertEqual(self.entries(), {(self.other_doctor.pk, self.patient.pk, False, 1)})
+
+    def test_assignment_keeps_the_patient_without_appointments(self):
+        self.doctor.patients.add(self.patient)
+        appointment = self.book(self.doctor, self.patient, self.start)
+        appointment.delete()
+        self.assertEqual(self.entries(), {(self.doctor.pk, self.patient.pk, True, 0)})
+        self.doctor.patients.remove(self.patient)
+        self.assertEqual(self.entries(), set())
+
+    def test_summary_is_cached_until_the_roster_changes(self):
+        self.book(self.doctor, self.patient, self.start)
+        self.assertEqual(roster.summary(self.doctor.pk)['appointments'], 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(roster.patient_ids(self.doctor.pk), {self.patient.pk})
+        other = make_profile('patient', 'other')
+        with self.captureOnCommitCallbacks(execute=True):
+            MedicalProfessionalPatient.objects.create(medical_professional=self.doctor, patient=other)
+        summary = roster.summary(self.doctor.pk)
+        self.assertEqual((summary['patient_ids'], summary['assigned'], summary['with_appointments']),
+                         ({self.patient.pk, other.pk}, 1, 1))
+        self.assertEqual(set(roster.patients(self.doctor.pk)), {self.patient, other})
+
+    def test_rebuild_matches_incremental_rows(self):
+        self.doctor.patients.add(self.patient)
+        for i in range(3):
+            self.book(self.other_doctor, self.patient, self.start + timedelta(days=i))
+        self.book(self.doctor, make_profile('patient', 'other'), self.start)
+        maintained = self.entries()
+        self.assertEqual(roster.rebuild(), 3)
+        self.assertEqual(self.entries(), maintained)
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from .. import routers
+from ..models import Report, Statistic
+
+
+class ReplicaFallbackTests(SimpleTestCase):
+    def setUp(self):
+        routers._down_until.clear()
+        self.addCleanup(routers._down_until.clear)
+
+    def test_unreachable_replica_is_skipped(self):
+        broken = mock.Mock()
+        broken.ensure_connection.side_effect = OperationalError("connection refused")
+        with mock.patch.object(routers, 'replica_aliases', return_value=['replica']), \
+                mock.patch.object(routers, 'connections', {'replica': broken}):
+            self.assertIsNone(routers.pick_replica())
+            self.assertIsNone(routers.pick_replica())
+        broken.ensure_connection.assert_called_once()  # then skipped for REPLICA_RETRY_SECONDS
+
+    def test_view_reruns_on_primary_after_replica_error(self):
+        used = []
+
+        @routers.use_replica
+        def view(request):
+            alias = routers.ReplicaRouter().db_for_read(Report)
+            used.append(alias)
+            if alias == 'replica':
+                raise DatabaseError("replica went away")
+            return alias
+
+        request = mock.Mock(method='GET', COOKIES={})
+        with mock.patch.object(routers, 'replica_aliases', return_value=['replica']), \
+                mock.patch.object(routers, '_healthy', side_effect=lambda alias: alias not in routers._down_until):
+            self.assertEqual(view(request), DEFAULT_DB_ALIAS)
+            self.assertEqual(used, ['replica', DEFAULT_DB_ALIAS])
+            self.assertIn('replica', routers._down_until)
+            # The replica stays marked down, so the next request goes straight to the primary.
+            used.clear()
+            self.assertEqual(view(request), DEFAULT_DB_ALIAS)
+            self.assertEqual(used, [DEFAULT_DB_ALIAS])
+
+    def test_writes_pin_the_rest_of_the_request_to_primary(self):
+        router = routers.ReplicaRouter()
+        with mock.patch.object(routers, 'pick_replica', return_value='replica'), routers.replica_reads():
+            self.assertEqual(router.db_for_read(Report), 'replica')
+            router.db_for_write(Report)
+            self.assertEqual(router.db_for_read(Report), DEFAULT_DB_ALIAS)
+
+
+@override_settings(DATABASE_ROUTERS=['dashboard.routers.ReplicaRouter'])
+class StickinessMiddlewareTests(TestCase):
+    def sticky(self, response):
+        return routers.STICKY_COOKIE in response.cookies
+
+    def test_write_pins_the_client_to_the_primary(self):
+        def view(request):
+            if request.GET.get('write'):
+                Statistic.objects.create(name='probe')
+            return HttpResponse()
+
+        middleware = routers.ReplicaStickinessMiddleware(view)
+        self.assertFalse(self.sticky(middleware(RequestFactory().get('/'))))
+        self.assertTrue(self.sticky(middleware(RequestFactory().get('/', {'write': 1}))))
+        self.assertTrue(self.sticky(middleware(RequestFactory().post('/'))))
+
+    async def test_async_stack_sees_writes_made_in_orm_threads(self):
+        async def view(request):
+            if request.GET.get('write'):
+                await Statistic.objects.acreate(name='probe')
+            return HttpResponse()
+
+        middleware = routers.ReplicaStickinessMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        self.assertFalse(self.sticky(await middleware(RequestFactory().get('/'))))
+        self.assertTrue(self.sticky(await middleware(RequestFactory().get('/', {'write': 1}))))
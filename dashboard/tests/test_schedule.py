@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+from django.urls import reverse
+
+from .. import schedule
+from ..availability import next_free_slots
+from ..models import ScheduleDay
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class BitsetTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.opening = next_weekday(hour=9)
+        self.day = self.opening.date()
+
+    def at(self, hours):
+        return self.opening + timedelta(hours=hours)
+
+    def test_span_covers_overlapping_or_inner_slots(self):
+        # 15-minute slots: 09:00 is slot 36.
+        self.assertEqual(schedule.span(self.day, self.at(1), self.at(1.5)), 0b11 << 40)
+        self.assertEqual(schedule.span(self.day, self.at(1) + timedelta(minutes=10), self.at(1.25)), 1 << 40)
+        self.assertEqual(schedule.span(self.day, self.at(1) + timedelta(minutes=10), self.at(1.75) + timedelta(
+            minutes=5), inner=True), 0b11 << 41)
+        self.assertEqual(schedule.span(self.day, self.at(-10), self.at(-9)), 0)
+        self.assertEqual(schedule.popcount(schedule.working_hours(self.day)), 32)
+        self.assertEqual(schedule.working_hours(self.day + timedelta(days=(5 - self.day.weekday()))), 0)
+
+    def test_encoding_round_trips(self):
+        bits = schedule.span(self.day, self.at(-9), self.at(15))
+        data = schedule.encode(bits)
+        self.assertEqual((len(data), schedule.decode(data)), (12, bits))
+
+    def test_first_run_of_free_slots(self):
+        free = 0b1110110
+        self.assertEqual(schedule._first_run(free, 1), 1)
+        self.assertEqual(schedule._first_run(free, 3), 4)
+        self.assertIsNone(schedule._first_run(free, 4))
+
+
+class ScheduleTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.patient = make_profile('patient', 'pat')
+        self.opening = next_weekday(hour=9)
+        self.day = self.opening.date()
+
+    def book(self, *args, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return super().book(*args, **kwargs)
+
+    def busy(self):
+        return schedule.load([self.doctor.pk], self.day, self.day)[self.doctor.pk][self.day]
+
+    def test_bitmaps_follow_bookings(self):
+        appointment = self.book(self.doctor, self.patient, self.opening, minutes=60)
+        self.assertEqual(self.busy(), 0b1111 << 36)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.appointment_date = self.opening + timedelta(hours=2)
+            appointment.save()
+        self.assertEqual(self.busy(), 0b1111 << 44)
+        self.assertEqual(schedule.rebuild(), 1)
+        self.assertEqual(self.busy(), 0b1111 << 44)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.delete()
+        self.assertFalse(ScheduleDay.objects.exists())
+
+    def test_occupancy_and_first_free(self):
+        self.book(self.doctor, self.patient, self.opening, minutes=120)
+        other = make_profile('doctor', 'doc2')
+        self.assertEqual(schedule.occupancy([self.doctor.pk, other.pk], self.day, self.day),
+                         {self.doctor.pk: [0.25], other.pk: [0.0]})
+        first = schedule.first_free([self.doctor.pk, other.pk], self.opening, self.opening + timedelta(days=1))
+        self.assertEqual(first, {self.doctor.pk: self.opening + timedelta(hours=2), other.pk: self.opening})
+        # Agrees with the interval sweep in availability.py.
+        slot = next_free_slots([self.doctor], count=1, after=self.opening)[0]
+        self.assertEqual(slot['start'], first[self.doctor.pk])
+
+    def test_doctor_availability_and_heatmap_views(self):
+        self.book(self.doctor, self.patient, self.opening, minutes=30)
+        self.login(self.patient)
+        response = self.client.get(reverse('doctor_availability'), {
+            'specialization': 'cardiology', 'after': self.opening.isoformat()})
+        self.assertEqual(response.json()['doctors'][0]['first_free'],
+                         (self.opening + timedelta(minutes=30)).isoformat())
+
+        self.login(make_profile('admin', 'admin'))
+        response = self.client.get(reverse('admin_schedule_heatmap'), {'start': self.day.isoformat()})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['rows']), 1)
+
+
+class AvailabilityApiTests(DashboardTestCase):
+    def test_impossible_after_is_a_bad_request(self):
+        self.login(make_profile('patient', 'pat'))
+        doctor = make_profile('doctor', 'doc')
+        for url, params in ((reverse('doctor_availability'), {'specialization': 'Cardiology'}),
+                            (reverse('appointment_availability'), {'doctor': doctor.pk})):
+            with self.subTest(url=url):
+                response = self.client.get(url, {**params, 'after': '2026-13-45T10:00'})
+                self.assertEqual(response.status_code, 400)
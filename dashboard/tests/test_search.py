@@ -0,0 +1,77 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import search
+from ..models import Report, TestResult
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class SearchTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.patient = make_profile('patient', 'pat')
+        self.other_patient = make_profile('patient', 'other')
+
+    def report(self, title, summary, patient=None, doctor=None):
+        return Report.objects.create(title=title, summary=summary, patient=patient or self.patient,
+                                     medical_professional=doctor or self.doctor)
+
+    def found(self, user, query, **kwargs):
+        hits, _ = search.search(user, query, **kwargs)
+        return [hit.object for hit in hits]
+
+    def test_more_matched_terms_then_title_weight_rank_first(self):
+        body = self.report('Follow-up', 'Patient reports chest tightness.')
+        both = self.report('Knee pain', 'Chest is clear.')
+        title = self.report('Chest X-ray', 'No findings.')
+        self.assertEqual(self.found(self.patient.user, 'chest pain'), [both, title, body])
+
+    def test_stopwords_and_unknown_terms_match_nothing(self):
+        self.report('Chest X-ray', 'No findings.')
+        self.assertEqual(self.found(self.patient.user, 'the and of'), [])
+        self.assertEqual(self.found(self.patient.user, 'zebra'), [])
+
+    def test_results_are_scoped_to_what_the_user_may_see(self):
+        own = self.report('Blood pressure', 'High.')
+        other = self.report('Blood pressure', 'Normal.', patient=self.other_patient)
+        result = TestResult.objects.create(patient=self.other_patient, test_date=timezone.now(),
+                                           description='Blood count', result_data='Normal')
+        stranger = make_profile('doctor', 'doc2')
+        self.book(stranger, self.other_patient, next_weekday())
+
+        self.assertEqual(self.found(self.patient.user, 'blood'), [own])
+        self.assertEqual(set(self.found(self.doctor.user, 'blood')), {own, other})
+        # On the roster through the appointment; did not write the reports.
+        self.assertEqual(set(self.found(stranger.user, 'blood')), {other, result})
+        self.assertEqual(len(self.found(make_profile('admin', 'admin').user, 'blood')), 3)
+        self.assertEqual(self.found(User.objects.create_user('nobody'), 'blood'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        report = self.report('Migraine', 'Severe.')
+        report.title = 'Headache'
+        report.save()
+        self.assertEqual(self.found(self.patient.user, 'migraine'), [])
+        self.assertEqual(self.found(self.patient.user, 'headache'), [report])
+        report.delete()
+        self.assertEqual(self.found(self.patient.user, 'headache'), [])
+
+    def test_pages(self):
+        reports = [self.report(f"Asthma review {i}", '-') for i in range(3)]
+        hits, has_next = search.search(self.patient.user, 'asthma', page_size=2)
+        self.assertEqual((len(hits), has_next), (2, True))
+        hits, has_next = search.search(self.patient.user, 'asthma', page=2, page_size=2)
+        self.assertEqual(([hit.object for hit in hits], has_next), ([reports[0]], False))
+
+    def test_rebuild_matches_incremental_index(self):
+        self.report('Chest X-ray', 'No findings.')
+        self.report('Knee pain', 'Chest is clear.')
+        before = self.found(self.patient.user, 'chest pain')
+        self.assertEqual(search.rebuild(), 2)
+        self.assertEqual(self.found(self.patient.user, 'chest pain'), before)
+
+    def test_search_page(self):
+        self.report('Chest X-ray', 'No findings.')
+        self.login(self.patient)
+        self.assertContains(self.client.get(reverse('search_records'), {'q': 'x-ray'}), 'Chest X-ray')
@@ -0,0 +1,36 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .. import statistics
+from ..models import Report, Statistic
+from .base import DashboardTestCase, make_profile
+
+
+class CounterTests(DashboardTestCase):
+    def counters(self):
+        return dict(Statistic.objects.exclude(name__startswith='changes:').exclude(value=0).values_list(
+            'name', 'value'))
+
+    def test_signals_keep_counters_in_line_with_reconcile(self):
+        doctor = make_profile('doctor', 'doc')
+        patients = [make_profile('patient', f"pat{i}") for i in range(3)]
+        now = timezone.now()
+        for i, patient in enumerate(patients):
+            self.book(doctor, patient, now + timedelta(days=i))
+            Report.objects.create(title=f"Report {i}", summary='-', patient=patient, medical_professional=doctor)
+        patients[0].appointment_set.get().delete()
+        Report.objects.filter(patient=patients[1]).delete()
+
+        counts = statistics.dashboard_counts(now)
+        self.assertEqual((counts['total_patients'], counts['total_doctors'], counts['total_appointments'],
+                          counts['total_reports'], counts['appointments_today']), (3, 1, 2, 2, 0))
+        maintained = self.counters()
+        statistics.reconcile()
+        self.assertEqual(maintained, self.counters())
+
+    def test_bump_creates_then_adds(self):
+        statistics.bump('count:test', 2)
+        statistics.bump('count:test', -1)
+        statistics.bump('count:test', 0)
+        self.assertEqual(statistics.read('count:test', 'count:missing'), {'count:test': 1, 'count:missing': 0})
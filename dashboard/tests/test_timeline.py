@@ -0,0 +1,64 @@
+from datetime import timedelta
+
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Prescription, Report, TestResult
+from ..pagination import InvalidCursor
+from .base import DashboardTestCase, make_profile, next_weekday
+
+
+class TimelineTests(DashboardTestCase):
+    def setUp(self):
+        super().setUp()
+        self.doctor = make_profile('doctor', 'doc')
+        self.patient = make_profile('patient', 'pat')
+        other = make_profile('patient', 'other')
+        start = next_weekday()
+        # Two timestamps shared by every kind, so ties are broken by kind and id.
+        for i in range(4):
+            moment = start - timedelta(days=i % 2)
+            self.book(self.doctor, self.patient, moment)
+            Prescription.objects.create(patient=self.patient, medical_professional=self.doctor,
+                                        medication_name=f"Drug {i}", description='-')
+            Report.objects.create(title=f"Report {i}", summary='-', patient=self.patient,
+                                  medical_professional=self.doctor)
+            TestResult.objects.create(patient=self.patient, test_date=moment, description='-', result_data='-')
+        Prescription.objects.update(created_at=start)
+        Report.objects.update(date=start - timedelta(days=1))
+        Report.objects.create(title='Not theirs', summary='-', patient=other, medical_professional=self.doctor)
+        # Newest first; ties by kind in SOURCES order, then newest id.
+        rows = [(getattr(obj, field), -rank, obj.pk, kind)
+                for rank, (kind, (model, field)) in enumerate(timeline.SOURCES.items())
+                for obj in model.objects.filter(patient=self.patient)]
+        self.expected = [(kind, pk) for _, _, pk, kind in sorted(rows, reverse=True)]
+
+    def keys(self, events):
+        return [(event.kind, event.object.pk) for event in events]
+
+    def test_pages_cover_the_history_once_in_order(self):
+        self.assertEqual(len(self.expected), 16)
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(len(timeline.SOURCES)):
+                page = timeline.page(self.patient.pk, cursor, page_size=3)
+            seen.extend(page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(self.keys(seen), self.expected)
+        dates = [e.date for e in seen]
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_kinds_filter(self):
+        page = timeline.page(self.patient.pk, page_size=10, kinds={'report', 'test_result'})
+        self.assertEqual({e.kind for e in page}, {'report', 'test_result'})
+        self.assertEqual(len(page), 8)
+
+    def test_malformed_cursor(self):
+        with self.assertRaises(InvalidCursor):
+            timeline.page(self.patient.pk, 'garbage')
+        self.login(make_profile('admin', 'admin'))
+        response = self.client.get(reverse('admin_view_patient', args=[self.patient.pk]),
+                                   {'cursor': 'garbage', 'page_size': 5})
+        self.assertEqual(self.keys(response.context['page']), self.expected[:5])
@@ -0,0 +1,36 @@
+from django.test import SimpleTestCase
+
+import requests
+
+from .. import transport
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def failing(self, exc):
+        def call():
+            raise exc
+        return call
+
+    def http_error(self, status):
+        response = requests.Response()
+        response.status_code = status
+        return requests.HTTPError(response=response)
+
+    def test_client_errors_do_not_trip_the_breaker(self):
+        breaker = transport.CircuitBreaker(failure_threshold=2)
+        for _ in range(5):
+            with self.assertRaises(requests.HTTPError):
+                transport.call_with_retries(self.failing(self.http_error(400)), breaker, sleep=lambda s: None)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+
+    def test_retried_call_counts_as_one_failure(self):
+        breaker = transport.CircuitBreaker(failure_threshold=2)
+        call = self.failing(requests.ConnectionError())
+        with self.assertRaises(requests.ConnectionError):
+            transport.call_with_retries(call, breaker, max_retries=2, sleep=lambda s: None)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        with self.assertRaises(requests.ConnectionError):
+            transport.call_with_retries(call, breaker, max_retries=2, sleep=lambda s: None)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        with self.assertRaises(transport.CircuitOpenError):
+            transport.call_with_retries(call, breaker, sleep=lambda s: None)
@@ -0,0 +1,132 @@
+# dashboard/timeline.py
+"""
+One chronological stream of a patient's appointments, prescriptions,
+reports and test results, newest first.
+
+Each record type is read from its own ``(patient, date, id)`` index in
+keyset-ordered chunks, and ``heapq.merge`` combines the four streams lazily.
+A page of N events therefore reads at most about N rows per table,
+however long the patient's history is. ``load older`` works by passing
+the cursor of the last event shown.
+"""
+import base64
+import binascii
+import heapq
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Appointment, Prescription, Report, TestResult
+from .pagination import InvalidCursor, KeysetPage, get_page_size
+
+DEFAULT_PAGE_SIZE = 25
+
+# kind: (model, date field). Dict order breaks ties between events with the
+# same timestamp, so it is part of the cursor contract.
+SOURCES = {
+    'appointment': (Appointment, 'appointment_date'),
+    'prescription': (Prescription, 'created_at'),
+    'report': (Report, 'date'),
+    'test_result': (TestResult, 'test_date'),
+}
+KIND_RANK = {kind: rank for rank, kind in enumerate(SOURCES)}
+
+
+class TimelineEvent:
+    def __init__(self, kind, date, obj):
+        self.kind = kind
+        self.date = date
+        self.object = obj
+
+    @property
+    def sort_key(self):
+        # Newest first; among equal timestamps, by kind and then newest id.
+        return (self.date, -KIND_RANK[self.kind], self.object.pk)
+
+
+class TimelinePage(KeysetPage):
+    """A ``KeysetPage`` that only walks backwards in time; ``is_first`` is the newest page."""
+    def __init__(self, object_list, next_cursor, page_size, is_first):
+        super().__init__(object_list, next_cursor, None, page_size)
+        self.is_first = is_first
+
+
+def encode_cursor(event):
+    raw = json.dumps({'t': event.date.isoformat(), 'k': event.kind, 'i': event.object.pk},
+                     separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        date, kind, pk = parse_datetime(data['t']), data['k'], int(data['i'])
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed timeline cursor.")
+    if date is None or kind not in SOURCES:
+        raise InvalidCursor("Malformed timeline cursor.")
+    return date, kind, pk
+
+
+def _older_than(kind, date_field, cursor):
+    """Rows of ``kind`` that sort strictly after the cursor event."""
+    if cursor is None:
+        return Q()
+    date, cursor_kind, pk = cursor
+    older = Q(**{f'{date_field}__lt': date})
+    if KIND_RANK[kind] > KIND_RANK[cursor_kind]:
+        return older | Q(**{date_field: date})
+    if kind == cursor_kind:
+        return older | Q(**{date_field: date, 'pk__lt': pk})
+    return older
+
+
+def _stream(patient_id, kind, cursor, chunk_size):
+    """Lazily yield one kind's events, newest first, a keyset chunk at a time."""
+    model, date_field = SOURCES[kind]
+    qs = model.objects.filter(patient_id=patient_id).select_related('medical_professional__user')
+    qs = qs.order_by(f'-{date_field}', '-pk')
+    while True:
+        rows = list(qs.filter(_older_than(kind, date_field, cursor))[:chunk_size])
+        for row in rows:
+            yield TimelineEvent(kind, getattr(row, date_field), row)
+        if len(rows) < chunk_size:
+            return
+        last = rows[-1]
+        cursor = (getattr(last, date_field), kind, last.pk)
+
+
+def events(patient_id, cursor=None, kinds=None, chunk_size=DEFAULT_PAGE_SIZE + 1):
+    """Iterator over the patient's merged timeline, after ``cursor`` if given."""
+    streams = [_stream(patient_id, kind, cursor, chunk_size) for kind in SOURCES if not kinds or kind in kinds]
+    return heapq.merge(*streams, key=lambda event: event.sort_key, reverse=True)
+
+
+def page(patient_id, cursor=None, page_size=DEFAULT_PAGE_SIZE, kinds=None):
+    """
+    First ``page_size`` events older than ``cursor`` (an opaque string, or
+    None for the newest). Returns a ``TimelinePage`` whose ``next_cursor`` loads
+    the next older page. Raises ``InvalidCursor`` for a malformed cursor.
+    """
+    decoded = decode_cursor(cursor) if cursor else None
+    stream = events(patient_id, decoded, kinds, chunk_size=page_size + 1)
+    items = []
+    for event in stream:
+        if len(items) == page_size:
+            return TimelinePage(items, encode_cursor(items[-1]), page_size, decoded is None)
+        items.append(event)
+    return TimelinePage(items, None, page_size, decoded is None)
+
+
+def for_request(request, patient_id, kinds=None):
+    """
+    ``page()`` driven by ``?cursor=`` and ``?page_size=``; an invalid cursor
+    falls back to the newest page.
+    """
+    page_size = get_page_size(request)
+    try:
+        return page(patient_id, request.GET.get('cursor'), page_size, kinds)
+    except InvalidCursor:
+        return page(patient_id, page_size=page_size, kinds=kinds)
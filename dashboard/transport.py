@@ -0,0 +1,179 @@
+# dashboard/transport.py
+import asyncio
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling upstream while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the breaker opens and every
+    call is refused for ``reset_timeout`` seconds. Then a single trial call is
+    let through (half-open): success closes the breaker, failure re-opens it.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self):
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+            # Half-open: only one trial call at a time.
+            if self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give up a call without judging upstream health (e.g. it was cancelled)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self._state = self.OPEN
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+def backoff_delay(attempt, base=0.25, cap=2.0):
+    """Full-jitter exponential backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def build_session(pool_size=10):
+    """A keep-alive ``requests.Session`` with a connection pool of ``pool_size``."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def build_async_client(pool_size=100, timeout=(3.05, 10)):
+    """
+    An ``httpx.AsyncClient`` with keep-alive pooling, for use on one event loop.
+    httpx is only needed by the async (ASGI) path, so it is imported lazily.
+    """
+    import httpx
+
+    connect, read = timeout
+    return httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+        timeout=httpx.Timeout(read, connect=connect),
+    )
+
+
+def is_retryable(exc):
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(exc, requests.HTTPError) and exc.response is not None:
+        return exc.response.status_code in RETRYABLE_STATUS
+    try:
+        import httpx
+    except ImportError:
+        return False
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if isinstance(exc, httpx.HTTPStatusError):
+        return exc.response.status_code in RETRYABLE_STATUS
+    return False
+
+
+def _settle_failure(breaker, exc, last_attempt):
+    """
+    Tell ``breaker`` about a failed attempt; returns whether to retry. A
+    logical call counts as at most one failure, and only when it ran out of
+    retries on a transient error: a 4xx means upstream is up.
+    """
+    if is_retryable(exc) and not last_attempt:
+        breaker.release()
+        return True
+    if is_retryable(exc):
+        breaker.record_failure()
+    else:
+        breaker.release()
+    return False
+
+
+def call_with_retries(fn, breaker, max_retries=2, backoff_base=0.25, backoff_cap=2.0, sleep=time.sleep):
+    """
+    Run ``fn()`` guarded by ``breaker``, retrying transient failures up to
+    ``max_retries`` times with jittered backoff. Raises ``CircuitOpenError``
+    without calling ``fn`` when the breaker refuses the call.
+    """
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError("Upstream circuit is open.")
+        try:
+            result = fn()
+        except Exception as e:
+            if not _settle_failure(breaker, e, attempt >= max_retries):
+                raise
+            sleep(backoff_delay(attempt, backoff_base, backoff_cap))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
+
+
+async def acall_with_retries(fn, breaker, max_retries=2, backoff_base=0.25, backoff_cap=2.0):
+    """Async version of ``call_with_retries``; ``fn`` is a coroutine function."""
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError("Upstream circuit is open.")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            breaker.release()
+            raise
+        except Exception as e:
+            if not _settle_failure(breaker, e, attempt >= max_retries):
+                raise
+            await asyncio.sleep(backoff_delay(attempt, backoff_base, backoff_cap))
+            attempt += 1
+            continue
+        breaker.record_success()
+        return result
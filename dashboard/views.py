@@ -1,22 +1,48 @@
 # views.py
+import calendar
+import io
+from datetime import date, timedelta
+import json
 import requests
 from django.contrib.auth import login, authenticate, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib import messages
 from django.utils import timezone
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition, require_safe
 from django.conf import settings
 from django import forms
 from django.shortcuts import get_object_or_404
 from .forms import PatientSignUpForm, MedicalProfessionalSignUpForm, AppointmentForm, AdminSignUpForm, \
     PatientAppointmentForm, DoctorAppointmentForm, PrescriptionForm, ReportForm, PatientBillingForm, \
-    MedicalProfessionalEditForm, PatientEditForm
-from .models import Patient, MedicalProfessional, Appointment, Report, HealthcareFacilityAdministrator
+    MedicalProfessionalEditForm, PatientEditForm, PatientImportForm
+from django.utils.dateparse import parse_datetime
+from .models import Patient, MedicalProfessional, Appointment, Report, HealthcareFacilityAdministrator, \
+    MAX_APPOINTMENT_MINUTES, Job
 import logging
 from .singletons import GeminiClient
 from .factories import UserProfileFactory
+from .pagination import paginate
+from .geocoding import GeocodingService
+from .availability import next_free_slots, doctors_for_specialization
+from . import statistics
+from .instrumentation import query_budget
+from .importers import PatientImporter, detect_format
+from . import exports
+from . import search
+from . import timeline
+from . import dashboard_cache
+from . import roster
+from .roles import get_role, get_profile_id, role_required, api_role_required
+from . import jobs
+from . import deletion
+from . import schedule
+from .routers import use_replica
+from . import api
+from . import analytes
 
 
 
@@ -96,36 +122,26 @@ def user_logout(request):
     return redirect('home')
 
 
+@use_replica
 def patient_dashboard(request):
     user = request.user
     try:
-        # Retrieve upcoming appointments for this patient
-        upcoming_appointments = user.patient.appointment_set.filter(
-            appointment_date__gte=timezone.now()
-        ).order_by('appointment_date')
-        # Retrieve prescriptions for this patient
-        prescriptions = user.patient.prescription_set.all().order_by('-created_at')
+        # Upcoming appointments and prescriptions, cached per patient
+        context = dashboard_cache.patient_context(user.patient)
     except Exception as e:
-        upcoming_appointments = []
-        prescriptions = []
-    context = {
-        'upcoming_appointments': upcoming_appointments,
-        'prescriptions': prescriptions
-    }
+        context = {'upcoming_appointments': [], 'prescriptions': []}
     return render(request, 'dashboard/patient_dashboard.html', context)
 
 
+@use_replica
 def medical_dashboard(request):
     user = request.user
     try:
-        # Retrieve upcoming appointments for this medical professional
-        upcoming_appointments = user.medicalprofessional.appointment_set.filter(
-            appointment_date__gte=timezone.now()
-        ).order_by('appointment_date')
+        # Upcoming appointments, cached per medical professional
+        context = dashboard_cache.doctor_context(user.medicalprofessional)
     except Exception as e:
-        upcoming_appointments = []
+        context = {'upcoming_appointments': []}
         # Optionally log the exception e for debugging
-    context = {'upcoming_appointments': upcoming_appointments}
     return render(request, 'dashboard/medical_dashboard.html', context)
 
 def admin_new_patient(request):
@@ -156,6 +172,29 @@ def admin_new_patient(request):
         form = PatientSignUpForm()
     return render(request, 'dashboard/admin_new_patient.html', {'form': form})
 
+@login_required
+def admin_import_patients(request):
+    # Only admins can bulk-import patients
+    if not hasattr(request.user, 'healthcarefacilityadministrator'):
+        messages.error(request, "Only administrators can import patients.")
+        return redirect('admin_dashboard')
+
+    result = None
+    if request.method == 'POST':
+        form = PatientImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            fmt = form.cleaned_data['format']
+            if fmt == 'auto':
+                fmt = detect_format(upload.name)
+            # Read the upload as a text stream so rows are processed as they arrive.
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            result = PatientImporter(hash_passwords=form.cleaned_data['hash_passwords']).run(stream, fmt)
+            messages.success(request, f"Imported {result.created} patients; rejected {result.failed} rows.")
+    else:
+        form = PatientImportForm()
+    return render(request, 'dashboard/admin_import_patients.html', {'form': form, 'result': result})
+
 def admin_new_doctor(request):
     if request.method == 'POST':
         form = MedicalProfessionalSignUpForm(request.POST)
@@ -181,52 +220,75 @@ def admin_new_appointment(request):
 def admin_settings(request):
     return render(request, 'dashboard/admin_settings.html')
 
+@query_budget(3)
 def admin_patients(request):
-    patients = Patient.objects.all()
-    return render(request, 'dashboard/admin_patients.html', {'patients': patients})
+    patients = Patient.objects.select_related('user').only(
+        'id', 'phone_number', 'user__first_name', 'user__last_name', 'user__email'
+    )
+    page = paginate(request, patients, ('id',))
+    return render(request, 'dashboard/admin_patients.html', {'patients': page.object_list, 'page': page})
 
+@query_budget(3)
 def admin_doctors(request):
-    doctors = MedicalProfessional.objects.all()
-    return render(request, 'dashboard/admin_doctors.html', {'doctors': doctors})
+    doctors = MedicalProfessional.objects.select_related('user').only(
+        'id', 'specialization', 'user__first_name', 'user__last_name', 'user__email'
+    )
+    page = paginate(request, doctors, ('id',))
+    return render(request, 'dashboard/admin_doctors.html', {'doctors': page.object_list, 'page': page})
 
+@query_budget(3)
 def admin_appointments(request):
-    appointments = Appointment.objects.all()
-    return render(request, 'dashboard/admin_appointments.html', {'appointments': appointments})
+    # The template prints both Patient.__str__ and MedicalProfessional.__str__,
+    # which read the related user's name, so join both users in up front.
+    appointments = Appointment.objects.select_related(
+        'patient__user', 'medical_professional__user'
+    ).only(
+        'id', 'appointment_date', 'reason',
+        'patient__user__first_name', 'patient__user__last_name',
+        'medical_professional__user__first_name', 'medical_professional__user__last_name',
+    )
+    page = paginate(request, appointments, ('appointment_date', 'id'))
+    return render(request, 'dashboard/admin_appointments.html', {'appointments': page.object_list, 'page': page})
 
+@use_replica
+@query_budget(3)
 def admin_reports(request):
-    reports = Report.objects.all()
-    return render(request, 'dashboard/admin_reports.html', {'reports': reports})
+    reports = Report.objects.only('id', 'title', 'summary', 'date')
+    page = paginate(request, reports, ('-date', '-id'))
+    return render(request, 'dashboard/admin_reports.html', {'reports': page.object_list, 'page': page})
 
 @login_required
+@query_budget(8)
 def dashboard(request):
-    user = request.user
+    # The role comes from the session (see roles.RoleMiddleware), not from
+    # probing each profile table in turn.
+    role = get_role(request)
     context = {}
-    if hasattr(user, 'patient'):
-        context['appointments'] = user.patient.appointment_set.all()
-        context['test_results'] = user.patient.testresult_set.all()
+    if role == 'patient':
+        profile = request.user.patient
+        context['appointments'] = profile.appointment_set.all()
+        context['test_results'] = profile.testresult_set.all()
         return render(request, 'dashboard/patient_dashboard.html', context)
-    elif hasattr(user, 'medicalprofessional'):
-        context['appointments'] = user.medicalprofessional.appointment_set.all()
-        context['patients'] = [appt.patient for appt in context['appointments']]
+    elif role == 'doctor':
+        profile = request.user.medicalprofessional
+        context['appointments'] = profile.appointment_set.select_related('patient__user')
+        context['patients'] = roster.patients(profile.pk).select_related('user')
         return render(request, 'dashboard/medical_dashboard.html', context)
-    elif hasattr(user, 'healthcarefacilityadministrator'):
+    elif role == 'admin':
         return render(request, 'dashboard/admin_dashboard.html', context)
     else:
         return render(request, 'dashboard/home.html')
 
+@use_replica
+@query_budget(5)
 def admin_dashboard(request):
-    # Example context data—adjust as needed
-    total_patients = Patient.objects.count()
-    total_doctors = MedicalProfessional.objects.count()
-    upcoming_appointments = Appointment.objects.order_by('appointment_date')[:5]
-    reports = Report.objects.order_by('-date')[:5]
-
-    context = {
-        'total_patients': total_patients,
-        'total_doctors': total_doctors,
-        'upcoming_appointments': upcoming_appointments,
-        'reports': reports,
-    }
+    # Totals come from the incrementally maintained Statistic rows rather than
+    # COUNT(*) over the tables; the two lists are short index range scans.
+    context = statistics.dashboard_counts()
+    context['upcoming_appointments'] = Appointment.objects.filter(
+        appointment_date__gte=timezone.now()
+    ).select_related('patient__user', 'medical_professional__user').order_by('appointment_date')[:5]
+    context['reports'] = Report.objects.order_by('-date')[:5]
     return render(request, 'dashboard/admin_dashboard.html', context)
 
 def patient_signup(request):
@@ -420,15 +482,119 @@ def generate_drug_description(request):
         logger.debug(f"Generated description for {medication}: {description}")
         return JsonResponse({'description': description})
     except Exception as e:
-        logger.exception(f"Error calling Gemini API: {str(e)}")
-        fallback_description = f"{medication} is a medication used to treat specific conditions."
+        return _fallback_description_response(medication, e)
 
-        debug_info = {"exception": str(e)}
+async def generate_drug_description_async(request):
+    # Same contract as generate_drug_description, but awaits Gemini on the
+    # event loop instead of blocking a thread; serve it through ASGI.
+    medication = request.GET.get('medication')
+    if not medication:
+        logger.error("No medication provided in request.")
+        return JsonResponse({'error': 'No medication provided.'}, status=400)
 
-        if settings.DEBUG:
-            return JsonResponse({'description': fallback_description, 'debug': debug_info})
-        else:
-            return JsonResponse({'description': fallback_description})
+    try:
+        description = await GeminiClient().adescribe_medication(medication)
+
+        logger.debug(f"Generated description for {medication}: {description}")
+        return JsonResponse({'description': description})
+    except Exception as e:
+        return _fallback_description_response(medication, e)
+
+@login_required
+@api_role_required('patient', 'doctor', 'admin')
+def generate_drug_descriptions(request):
+    # Batch form of generate_drug_description: POST {"medications": [...]}
+    # or GET ?medication=a&medication=b, answered in one response.
+    # Signed-in users only, since each batch can fan out to Gemini.
+    # With async=1 the batch runs as a background job; poll the returned status_url.
+    run_async = request.GET.get('async') == '1'
+    if request.method == 'POST':
+        try:
+            body = json.loads(request.body or b'{}')
+            medications = body.get('medications')
+            run_async = run_async or body.get('async') is True
+        except (ValueError, AttributeError):
+            return JsonResponse({'error': 'Invalid JSON body.'}, status=400)
+    else:
+        medications = request.GET.getlist('medication')
+
+    if not isinstance(medications, list) or not all(isinstance(m, str) for m in medications):
+        return JsonResponse({'error': 'medications must be a list of names.'}, status=400)
+    medications = [m for m in medications if m.strip()]
+    if not medications:
+        logger.error("No medication provided in request.")
+        return JsonResponse({'error': 'No medication provided.'}, status=400)
+    batch_max = getattr(settings, 'GEMINI_BATCH_MAX', 50)
+    if len(medications) > batch_max:
+        return JsonResponse({'error': f'At most {batch_max} medications per request.'}, status=400)
+
+    if run_async:
+        job = jobs.enqueue('describe_medications', {'names': medications}, created_by=request.user)
+        return _job_accepted(job)
+
+    descriptions = GeminiClient().describe_medications(medications)
+    return JsonResponse({
+        'descriptions': [
+            {'medication': name, 'description': descriptions[name]} for name in medications
+        ]
+    })
+
+def _job_accepted(job):
+    return JsonResponse({
+        'job': jobs.status(job),
+        'status_url': reverse('job_status', kwargs={'job_id': job.pk}),
+    }, status=202)
+
+@login_required
+def job_status(request, job_id):
+    # Poll a background job; visible to whoever enqueued it and to admins
+    job = get_object_or_404(Job, id=job_id)
+    if job.created_by_id != request.user.pk and get_role(request) != 'admin':
+        return JsonResponse({'error': 'Job not found.'}, status=404)
+    return JsonResponse(jobs.status(job))
+
+def _fallback_description_response(medication, e):
+    logger.exception(f"Error calling Gemini API: {str(e)}")
+    fallback_description = GeminiClient.fallback_description(medication)
+
+    debug_info = {"exception": str(e)}
+
+    if settings.DEBUG:
+        return JsonResponse({'description': fallback_description, 'debug': debug_info})
+    else:
+        return JsonResponse({'description': fallback_description})
+
+@login_required
+@api_role_required('admin')
+def gemini_cache_stats(request):
+    # Hit/miss counters for sizing the description cache; admins only
+    return JsonResponse(GeminiClient().cache_stats())
+
+@api_role_required('admin')
+def dashboard_cache_stats(request):
+    # Hit rate of the per-user dashboard cache in this process; admins only
+    return JsonResponse(dashboard_cache.stats.as_dict())
+
+def _api_etag(request):
+    return api.version(request, get_role(request), get_profile_id(request)).etag
+
+def _api_last_modified(request):
+    current = api.version(request, get_role(request), get_profile_id(request))
+    return current.last_modified if current.etag else None
+
+@require_safe
+@api_role_required('patient')
+@condition(etag_func=_api_etag, last_modified_func=_api_last_modified)
+def api_patient_dashboard(request):
+    # JSON patient dashboard; 304 from the change counter alone when unchanged
+    return api.response(request, 'patient', get_profile_id(request))
+
+@require_safe
+@api_role_required('doctor')
+@condition(etag_func=_api_etag, last_modified_func=_api_last_modified)
+def api_medical_dashboard(request):
+    # JSON medical dashboard; 304 from the change counter alone when unchanged
+    return api.response(request, 'doctor', get_profile_id(request))
 
 
 # Add these new view functions to the existing views.py file
@@ -441,14 +607,8 @@ def medical_new_report(request):
 
     doctor = request.user.medicalprofessional
 
-    # Debug: Count appointments and patients for this doctor
-    appointments_count = Appointment.objects.filter(
-        medical_professional=doctor
-    ).count()
-
-    patients_count = Patient.objects.filter(
-        appointment__medical_professional=doctor
-    ).distinct().count()
+    # Debug: Count appointments and patients for this doctor (precomputed roster)
+    summary = roster.summary(doctor.pk)
 
     if request.method == 'POST':
         form = ReportForm(request.POST, medical_professional=doctor)
@@ -466,12 +626,13 @@ def medical_new_report(request):
     context = {
         'form': form,
         'debug_info': {
-            'appointments_count': appointments_count,
-            'patients_count': patients_count,
+            'appointments_count': summary['appointments'],
+            'patients_count': summary['with_appointments'],
         }
     }
     return render(request, 'dashboard/medical_new_report.html', context)
 
+@use_replica
 def patient_view_reports(request):
     # Ensure only patients can view their own reports
     if not hasattr(request.user, 'patient'):
@@ -479,11 +640,13 @@ def patient_view_reports(request):
         return redirect('dashboard')
 
     patient = request.user.patient
-    reports = Report.objects.filter(patient=patient).order_by('-date')
+    # Lazy: only evaluated when the cached fragment in the template is stale
+    reports = Report.objects.filter(patient=patient).select_related('medical_professional__user').order_by('-date')
 
-    return render(request, 'dashboard/patient_reports.html', {'reports': reports})
+    return render(request, 'dashboard/patient_reports.html', {'reports': reports, 'patient': patient})
 
 
+@use_replica
 def medical_view_reports(request):
     # Ensure only medical professionals can view reports they've created
     if not hasattr(request.user, 'medicalprofessional'):
@@ -491,9 +654,10 @@ def medical_view_reports(request):
         return redirect('dashboard')
 
     doctor = request.user.medicalprofessional
-    reports = Report.objects.filter(medical_professional=doctor).order_by('-date')
+    # Lazy: only evaluated when the cached fragment in the template is stale
+    reports = Report.objects.filter(medical_professional=doctor).select_related('patient__user').order_by('-date')
 
-    return render(request, 'dashboard/medical_reports.html', {'reports': reports})
+    return render(request, 'dashboard/medical_reports.html', {'reports': reports, 'doctor': doctor})
 
 
 def report_detail(request, report_id):
@@ -533,12 +697,8 @@ def medical_new_report(request):
 
     doctor = request.user.medicalprofessional
 
-    # Debug: Count patients for this doctor
-    appointment_patients = Patient.objects.filter(
-        appointment__medical_professional=doctor
-    ).distinct().count()
-
-    assigned_patients = doctor.patients.count()
+    # Debug: Count patients and appointments for this doctor (precomputed roster)
+    summary = roster.summary(doctor.pk)
 
     if request.method == 'POST':
         form = ReportForm(request.POST, medical_professional=doctor)
@@ -556,8 +716,9 @@ def medical_new_report(request):
     context = {
         'form': form,
         'debug_info': {
-            'appointment_patients': appointment_patients,
-            'assigned_patients': assigned_patients,
+            'appointments_count': summary['appointments'],
+            'patients_count': summary['with_appointments'],
+            'assigned_patients': summary['assigned'],
         }
     }
     return render(request, 'dashboard/medical_new_report.html', context)
@@ -586,13 +747,10 @@ def medical_patient_detail(request, patient_id):
     except Patient.DoesNotExist:
         messages.error(request, "Patient not found or not associated with you.")
         return redirect('medical_patients')
-    # Retrieve the patient’s reports and prescriptions
-    reports = patient.reports.all().order_by('-date')
-    prescriptions = patient.prescription_set.all().order_by('-created_at')
+    # One page of the patient's merged history, newest first
     return render(request, 'dashboard/medical_patient_detail.html', {
         'patient': patient,
-        'reports': reports,
-        'prescriptions': prescriptions,
+        'page': timeline.for_request(request, patient.id),
     })
 
 @login_required
@@ -656,8 +814,10 @@ def patient_prescriptions(request):
         return redirect('dashboard')
 
     patient = request.user.patient
-    prescriptions = patient.prescription_set.all().order_by('-created_at')
-    return render(request, 'dashboard/patient_prescriptions.html', {'prescriptions': prescriptions})
+    # Lazy: only evaluated when the cached fragment in the template is stale
+    prescriptions = patient.prescription_set.select_related('medical_professional__user').order_by('-created_at')
+    return render(request, 'dashboard/patient_prescriptions.html',
+                  {'prescriptions': prescriptions, 'patient': patient})
 
 class PharmacySearchForm(forms.Form):
     address = forms.CharField(
@@ -693,6 +853,167 @@ def find_pharmacy(request):
 
     return render(request, 'dashboard/find_pharmacy.html', {'form': form, 'results': results})
 
+def _availability_after(request):
+    # ?after= as an aware datetime, no earlier than now; None if it does not parse
+    after = timezone.now()
+    if request.GET.get('after'):
+        try:
+            after = parse_datetime(request.GET['after'])
+        except ValueError:
+            # Well-formed but impossible, e.g. month 13
+            return None
+        if after is None:
+            return None
+        if timezone.is_naive(after):
+            after = timezone.make_aware(after)
+        after = max(after, timezone.now())
+    return after
+
+@login_required
+def appointment_availability(request):
+    # Next open slots for one doctor (?doctor=<id>) or every doctor of a
+    # specialization (?specialization=<name>).
+    try:
+        count = max(1, min(int(request.GET.get('count', 5)), 50))
+        duration = max(5, min(int(request.GET.get('duration', 30)), MAX_APPOINTMENT_MINUTES))
+        doctor_id = request.GET.get('doctor')
+        doctor_id = int(doctor_id) if doctor_id else None
+    except ValueError:
+        return JsonResponse({'error': 'count, duration and doctor must be integers.'}, status=400)
+
+    after = _availability_after(request)
+    if after is None:
+        return JsonResponse({'error': 'after must be an ISO 8601 datetime.'}, status=400)
+
+    if doctor_id is not None:
+        doctors = [doctor_id]
+    elif request.GET.get('specialization'):
+        doctors = list(doctors_for_specialization(request.GET['specialization']))
+    else:
+        return JsonResponse({'error': 'Provide a doctor or a specialization.'}, status=400)
+
+    slots = next_free_slots(doctors, count=count, after=after, duration_minutes=duration)
+    return JsonResponse({
+        'slots': [
+            {'doctor_id': slot['doctor_id'], 'start': slot['start'].isoformat(), 'end': slot['end'].isoformat()}
+            for slot in slots
+        ]
+    })
+
+@login_required
+def doctor_availability(request):
+    # Earliest free slot for every doctor of a specialization (?specialization=<name>)
+    # within ?days= days, answered from the schedule bitmaps.
+    specialization = request.GET.get('specialization')
+    if not specialization:
+        return JsonResponse({'error': 'Provide a specialization.'}, status=400)
+    try:
+        duration = max(5, min(int(request.GET.get('duration', 30)), MAX_APPOINTMENT_MINUTES))
+        days = max(1, min(int(request.GET.get('days', 7)), 31))
+    except ValueError:
+        return JsonResponse({'error': 'duration and days must be integers.'}, status=400)
+    after = _availability_after(request)
+    if after is None:
+        return JsonResponse({'error': 'after must be an ISO 8601 datetime.'}, status=400)
+
+    doctors = list(MedicalProfessional.objects.filter(specialization__iexact=specialization).select_related(
+        'user').order_by('user__last_name', 'user__first_name', 'id'))
+    first_free = schedule.first_free([d.pk for d in doctors], after, after + timedelta(days=days), duration)
+    return JsonResponse({
+        'doctors': [
+            {
+                'doctor_id': doctor.pk,
+                'name': f"{doctor.user.first_name} {doctor.user.last_name}",
+                'first_free': first_free[doctor.pk].isoformat() if first_free[doctor.pk] else None,
+            }
+            for doctor in doctors
+        ]
+    })
+
+def _analyte_access(request, patient_id):
+    # A patient sees their own results, a doctor those of patients on their roster, an admin everyone's.
+    role = get_role(request)
+    if role == 'patient':
+        allowed = get_profile_id(request) == patient_id
+    elif role == 'doctor':
+        allowed = roster.contains(get_profile_id(request), patient_id)
+    else:
+        allowed = role == 'admin'
+    if not allowed:
+        return JsonResponse({'error': 'Forbidden.'}, status=403)
+    if not Patient.objects.filter(pk=patient_id).exists():
+        return JsonResponse({'error': 'Patient not found.'}, status=404)
+    return None
+
+@require_safe
+@api_role_required('patient', 'doctor', 'admin')
+def patient_analytes(request, patient_id):
+    # The analytes a patient has measurements for, with their latest values
+    denied = _analyte_access(request, patient_id)
+    if denied:
+        return denied
+    return JsonResponse({'patient_id': patient_id, 'analytes': analytes.codes(patient_id)})
+
+@require_safe
+@api_role_required('patient', 'doctor', 'admin')
+def analyte_series(request, patient_id, code):
+    # One analyte over time (?window= sets the rolling mean width), read from its packed series
+    denied = _analyte_access(request, patient_id)
+    if denied:
+        return denied
+    try:
+        window = max(1, min(int(request.GET.get('window', 3)), 100))
+    except ValueError:
+        return JsonResponse({'error': 'window must be an integer.'}, status=400)
+    found = analytes.series(patient_id, code)
+    if found is None:
+        return JsonResponse({'error': f"No {code} measurements for this patient."}, status=404)
+    return JsonResponse({'patient_id': patient_id, **found.as_dict(window)})
+
+@login_required
+def pharmacy_search(request):
+    # Server-side proxy for the pharmacy map: one cached geocode plus one
+    # cached bounded search, instead of two Nominatim calls from every browser.
+    if not hasattr(request.user, 'patient'):
+        return JsonResponse({'error': 'Only patients can use this feature.'}, status=403)
+
+    address = request.GET.get('address', '').strip()
+    if not address:
+        return JsonResponse({'error': 'No address provided.'}, status=400)
+
+    service = GeocodingService()
+    try:
+        center = service.geocode(address)
+        if center is None:
+            return JsonResponse({'error': 'Address not found'}, status=404)
+        pharmacies = service.find_pharmacies(*center)
+    except Exception as e:
+        logger.exception(f"Error looking up pharmacies: {str(e)}")
+        return JsonResponse({'error': 'Pharmacy lookup is temporarily unavailable.'}, status=502)
+
+    return JsonResponse({
+        'center': {'lat': center[0], 'lon': center[1]},
+        'pharmacies': pharmacies,
+    })
+
+@login_required
+def search_records(request):
+    # Ranked search over reports and test results; search.search() applies
+    # the same patient/doctor/admin visibility rules as the detail pages.
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(1, int(request.GET.get('page', 1)))
+    except ValueError:
+        page = 1
+
+    hits, has_next = search.search(request.user, query, page=page) if query else ([], False)
+    return render(request, 'dashboard/search_results.html', {
+        'query': query,
+        'hits': hits,
+        'page': page,
+        'has_next': has_next,
+    })
+
 def patient_billing(request):
     if not hasattr(request.user, 'patient') and not hasattr(request.user, 'administrator'):
         messages.error(request, "Only patients and admins can update billing information.")
@@ -737,21 +1058,79 @@ def admin_view_patient(request, patient_id):
         messages.error(request, "Only administrators can view patient details.")
         return redirect('admin_dashboard')
 
-    patient = get_object_or_404(Patient, id=patient_id)
-    # Get related data for the patient
-    appointments = patient.appointment_set.all().order_by('-appointment_date')
-    prescriptions = patient.prescription_set.all().order_by('-created_at')
-    reports = patient.reports.all().order_by('-date')
-
+    patient = get_object_or_404(Patient.objects.select_related('user'), id=patient_id)
+    # One page of the patient's merged history, newest first
     context = {
         'patient': patient,
-        'appointments': appointments,
-        'prescriptions': prescriptions,
-        'reports': reports
+        'page': timeline.for_request(request, patient.id),
     }
     return render(request, 'dashboard/admin_view_patient.html', context)
 
 
+def _export_response(request, filename, patient_id=None):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in exports.FORMATS:
+        return JsonResponse({'error': f"format must be one of {', '.join(exports.FORMATS)}."}, status=400)
+    serialize, content_type, extension = exports.FORMATS[fmt]
+    response = StreamingHttpResponse(serialize(exports.iter_records(patient_id=patient_id)),
+                                     content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
+
+@login_required
+@role_required('admin', redirect_to='admin_dashboard', message="Only administrators can export patient records.")
+def admin_export_patient(request, patient_id):
+    # Stream one patient's full record as CSV or NDJSON
+    patient = get_object_or_404(Patient, id=patient_id)
+    return _export_response(request, f"patient-{patient.id}", patient_id=patient.id)
+
+@login_required
+@role_required('admin', redirect_to='admin_dashboard', message="Only administrators can view the schedule.")
+@query_budget(4)
+def admin_schedule_heatmap(request):
+    # Share of each doctor's working-hour slots booked per day, for a week
+    # (default) or a calendar month, from the schedule bitmaps.
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else timezone.localdate()
+    except ValueError:
+        messages.error(request, "start must be a date (YYYY-MM-DD).")
+        start = timezone.localdate()
+    period = 'month' if request.GET.get('period') == 'month' else 'week'
+    if period == 'month':
+        start = start.replace(day=1)
+        end = start.replace(day=calendar.monthrange(start.year, start.month)[1])
+    else:
+        start -= timedelta(days=start.weekday())
+        end = start + timedelta(days=6)
+
+    doctors = MedicalProfessional.objects.select_related('user').order_by('user__last_name', 'user__first_name', 'id')
+    specialization = request.GET.get('specialization', '')
+    if specialization:
+        doctors = doctors.filter(specialization__iexact=specialization)
+    doctors = list(doctors)
+    occupancy = schedule.occupancy([d.pk for d in doctors], start, end)
+    rows = [
+        (doctor, [None if share is None else {'percent': round(share * 100), 'alpha': f"{share:.2f}"}
+                  for share in occupancy[doctor.pk]])
+        for doctor in doctors
+    ]
+    previous = start - timedelta(days=1) if period == 'month' else start - timedelta(days=7)
+    return render(request, 'dashboard/admin_schedule_heatmap.html', {
+        'rows': rows,
+        'days': [start + timedelta(days=i) for i in range((end - start).days + 1)],
+        'period': period,
+        'specialization': specialization,
+        'previous_start': previous,
+        'next_start': end + timedelta(days=1),
+    })
+
+@login_required
+@role_required('admin', redirect_to='admin_dashboard', message="Only administrators can export facility records.")
+def admin_export_facility(request):
+    # Stream every patient record in the facility as CSV or NDJSON
+    return _export_response(request, f"facility-{timezone.now():%Y%m%d}")
+
+
 @login_required
 def admin_edit_patient(request, patient_id):
     # Ensure only admins can access this view
@@ -843,6 +1222,7 @@ def admin_edit_doctor(request, doctor_id):
     return render(request, 'dashboard/admin_edit_doctor.html', context)
 
 
+@use_replica
 @login_required
 def admin_view_doctor(request, doctor_id):
     # Ensure only admins can access this view
@@ -875,11 +1255,12 @@ def admin_delete_patient(request, patient_id):
     patient = get_object_or_404(Patient, id=patient_id)
 
     if request.method == 'POST':
-        # Get the user associated with the patient
-        user = patient.user
-        # Delete the user (this will cascade delete related records based on model setup)
-        user.delete()  # This will also delete the patient due to the CASCADE relationship
-        messages.success(request, "Patient has been deleted successfully.")
+        # Hide the patient now; their records are purged in batches by a
+        # background job. The key makes double-submits harmless.
+        deletion.soft_delete(patient)
+        jobs.enqueue('purge_profile', {'role': 'patient', 'profile_id': patient.id}, priority=10,
+                     idempotency_key=f"purge_profile:patient:{patient.id}", created_by=request.user)
+        messages.success(request, "Patient has been deleted; their records are being purged.")
         return redirect('admin_patients')
 
     return render(request, 'dashboard/admin_confirm_delete_patient.html', {'patient': patient})
@@ -895,11 +1276,11 @@ def admin_delete_doctor(request, doctor_id):
     doctor = get_object_or_404(MedicalProfessional, id=doctor_id)
 
     if request.method == 'POST':
-        # Get the user associated with the doctor
-        user = doctor.user
-        # Delete the user (this will cascade delete the doctor record)
-        user.delete()
-        messages.success(request, "Doctor has been deleted successfully.")
+        # Soft delete now, purge in the background (see admin_delete_patient)
+        deletion.soft_delete(doctor)
+        jobs.enqueue('purge_profile', {'role': 'doctor', 'profile_id': doctor.id}, priority=10,
+                     idempotency_key=f"purge_profile:doctor:{doctor.id}", created_by=request.user)
+        messages.success(request, "Doctor has been deleted; their records are being purged.")
         return redirect('admin_doctors')
 
     return render(request, 'dashboard/admin_confirm_delete_doctor.html', {'doctor': doctor})
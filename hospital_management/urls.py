@@ -9,6 +9,7 @@ urlpatterns = [
     path('admin/appointments/', views.admin_appointments, name='admin_appointments'),
     path('admin/reports/', views.admin_reports, name='admin_reports'),
     path('admin/new_patient/', views.admin_new_patient, name='admin_new_patient'),
+    path('admin/import_patients/', views.admin_import_patients, name='admin_import_patients'),
     path('admin/new_doctor/', views.admin_new_doctor, name='admin_new_doctor'),
     path('admin/new_appointment/', views.admin_new_appointment, name='admin_new_appointment'),
     path('admin/settings/', views.admin_settings, name='admin_settings'),
@@ -33,6 +34,15 @@ urlpatterns = [
     path('dashboard/medical/new_appointment/', views.medical_new_appointment, name='medical_new_appointment'),
     path('dashboard/medical/new_prescription/', views.medical_new_prescription, name='medical_new_prescription'),
     path('dashboard/api/generate-description/', views.generate_drug_description, name='generate_drug_description'),
+    path('dashboard/api/generate-description/async/', views.generate_drug_description_async,
+         name='generate_drug_description_async'),
+    path('dashboard/api/generate-descriptions/', views.generate_drug_descriptions,
+         name='generate_drug_descriptions'),
+    path('dashboard/api/gemini-cache-stats/', views.gemini_cache_stats, name='gemini_cache_stats'),
+    path('dashboard/api/dashboard-cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
+    path('dashboard/api/jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('dashboard/api/v1/patient/', views.api_patient_dashboard, name='api_patient_dashboard'),
+    path('dashboard/api/v1/medical/', views.api_medical_dashboard, name='api_medical_dashboard'),
     path('dashboard/medical/new_patient/', views.medical_new_patient, name='medical_new_patient'),
     path('dashboard/medical/patients/', views.medical_patients, name='medical_patients'),
     path('dashboard/medical/patient/<int:patient_id>/', views.medical_patient_detail, name='medical_patient_detail'),
@@ -41,6 +51,12 @@ urlpatterns = [
     path('dashboard/patient/appointments/<int:appointment_id>/delete/', views.patient_delete_appointment, name='patient_delete_appointment'),
     path('dashboard/patient/prescriptions/', views.patient_prescriptions, name='patient_prescriptions'),
     path('dashboard/patient/find_pharmacy/', views.find_pharmacy, name='find_pharmacy'),
+    path('dashboard/api/availability/', views.appointment_availability, name='appointment_availability'),
+    path('dashboard/api/availability/doctors/', views.doctor_availability, name='doctor_availability'),
+    path('dashboard/api/pharmacies/', views.pharmacy_search, name='pharmacy_search'),
+    path('dashboard/api/analytes/<int:patient_id>/', views.patient_analytes, name='patient_analytes'),
+    path('dashboard/api/analytes/<int:patient_id>/<str:code>/', views.analyte_series, name='analyte_series'),
+    path('dashboard/search/', views.search_records, name='search_records'),
     path('dashboard/medical/new_patient/', views.medical_new_patient, name='medical_new_patient'),
 
     path('signup/patient/', views.patient_signup, name='patient_signup'),
@@ -55,6 +71,9 @@ urlpatterns = [
     path('dashboard/report/<int:report_id>/', views.report_detail, name='report_detail'),
 
     path('facility-admin/patients/<int:patient_id>/view/', views.admin_view_patient, name='admin_view_patient'),
+    path('facility-admin/patients/<int:patient_id>/export/', views.admin_export_patient, name='admin_export_patient'),
+    path('facility-admin/export/', views.admin_export_facility, name='admin_export_facility'),
+    path('facility-admin/schedule/', views.admin_schedule_heatmap, name='admin_schedule_heatmap'),
     path('facility-admin/patients/<int:patient_id>/edit/', views.admin_edit_patient, name='admin_edit_patient'),
     path('facility-admin/patients/<int:patient_id>/delete/', views.admin_delete_patient, name='admin_delete_patient'),
     path('facility-admin/doctors/<int:doctor_id>/view/', views.admin_view_doctor, name='admin_view_doctor'),